@@ -0,0 +1,130 @@
+"""Batch and incremental inference of trends and forecasts of numeric measurements.
+
+The batch inference fits the trend models of all int and float company measurements
+in one pass over a columnar fetch of their values. Afterwards every newly registered
+value only updates the persisted state of its own series.
+"""
+
+import logging
+from datetime import UTC, datetime
+
+import numpy as np
+import polars as pl
+from sqlalchemy.orm import Session
+
+from parma_analytics.analytics.inference.trend_models import (
+    SECONDS_PER_DAY,
+    TrendState,
+    fit,
+    update,
+)
+from parma_analytics.db.prod.engine import get_engine, get_session
+from parma_analytics.db.prod.measurement_trend_query import (
+    fetch_numeric_series,
+    get_trend_state,
+    upsert_trends,
+)
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_MEASUREMENT_TYPES = ("int", "float")
+
+
+def fit_trends(series: pl.DataFrame) -> list[dict]:
+    """Fit the trend models of all series in a columnar frame.
+
+    Args:
+        series: Frame with the columns company_measurement_id, timestamp and value.
+
+    Returns:
+        The columns of the measurement_trend rows, one per company measurement.
+    """
+    if series.is_empty():
+        return []
+    series = series.sort(["company_measurement_id", "timestamp"])
+
+    ids, codes = np.unique(
+        series["company_measurement_id"].to_numpy(), return_inverse=True
+    )
+    timestamps = series["timestamp"].to_numpy().astype("datetime64[us]")
+    values = series["value"].to_numpy().astype(float)
+
+    count = np.bincount(codes, minlength=len(ids))
+    starts = np.cumsum(count) - count
+    origins = timestamps[starts]
+    t = (timestamps - origins[codes]) / np.timedelta64(1, "s") / SECONDS_PER_DAY
+
+    fitted = fit(codes, t, values, len(ids))
+    fitted["origin"] = origins.tolist()
+    fitted["last_timestamp"] = timestamps[starts + count - 1].tolist()
+
+    columns = {key: np.asarray(value).tolist() for key, value in fitted.items()}
+    return [
+        {
+            "company_measurement_id": id,
+            **{key: column[i] for key, column in columns.items()},
+        }
+        for i, id in enumerate(ids.tolist())
+    ]
+
+
+def run_trend_inference(company_measurement_ids: list[int] | None = None) -> int:
+    """Refit and persist the trends of numeric company measurements.
+
+    Args:
+        company_measurement_ids: The company measurements to refit, all if None.
+
+    Returns:
+        The number of fitted company measurements.
+    """
+    series = fetch_numeric_series(get_engine(), company_measurement_ids)
+    trends = fit_trends(series)
+    with get_session() as session:
+        upsert_trends(session, trends)
+        session.commit()
+    logger.info(f"Fitted trends of {len(trends)} company measurements.")
+    return len(trends)
+
+
+def update_trend(
+    session: Session, company_measurement_id: int, timestamp: datetime, value: float
+) -> None:
+    """Add a newly registered value to the persisted trend of its series.
+
+    The persisted state is updated in O(1). Series without a state yet and values
+    older than the last fitted one are refitted from their full history instead.
+    The caller is responsible for committing the session.
+
+    Args:
+        session: The database session.
+        company_measurement_id: The id of the company measurement.
+        timestamp: The timestamp of the new value.
+        value: The new value.
+    """
+    if timestamp.tzinfo is not None:
+        # timestamps are stored without time zone in UTC
+        timestamp = timestamp.astimezone(UTC).replace(tzinfo=None)
+
+    trend = get_trend_state(session, company_measurement_id)
+    if trend is None or timestamp < trend.last_timestamp:
+        series = fetch_numeric_series(get_engine(), [company_measurement_id])
+        upsert_trends(session, fit_trends(series))
+        return
+
+    state = TrendState(
+        origin=trend.origin,
+        count=trend.count,
+        sum_t=trend.sum_t,
+        sum_y=trend.sum_y,
+        sum_tt=trend.sum_tt,
+        sum_ty=trend.sum_ty,
+        last_timestamp=trend.last_timestamp,
+        last_value=trend.last_value,
+        ewma=trend.ewma,
+        level=trend.level,
+        trend=trend.trend,
+    )
+    state = update(state, timestamp, float(value))
+    upsert_trends(
+        session, [{"company_measurement_id": company_measurement_id, **state.as_dict()}]
+    )
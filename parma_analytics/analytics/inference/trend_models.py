@@ -0,0 +1,207 @@
+"""Vectorized trend models for many numeric time series at once.
+
+Series are passed in columnar form: one flat array of series codes, timestamps and
+values, sorted by series and timestamp. Every model keeps its state in a handful of
+running sums or smoothed values, so a fitted state can be updated with a new
+observation in O(1) instead of refitting the whole series:
+
+- least-squares slope of the values over time (from running sums),
+- exponentially weighted moving average (EWMA),
+- Holt's linear exponential smoothing (level and trend per observation).
+"""
+
+import os
+from dataclasses import dataclass, fields
+from datetime import datetime
+
+import numpy as np
+
+SECONDS_PER_DAY = 86_400.0
+
+# denominators below are treated as zero
+EPSILON = 1e-12
+
+# smoothing factors of the EWMA and the level and trend of Holt's linear method
+EWMA_ALPHA = float(os.getenv("TREND_EWMA_ALPHA", "0.3"))
+HOLT_ALPHA = float(os.getenv("TREND_HOLT_ALPHA", "0.5"))
+HOLT_BETA = float(os.getenv("TREND_HOLT_BETA", "0.3"))
+
+# horizon in days of the trend score, the relative change of the least-squares line
+TREND_HORIZON_DAYS = float(os.getenv("TREND_HORIZON_DAYS", "30"))
+
+
+@dataclass
+class TrendState:
+    """Fitted state of the trend models of a single series.
+
+    Timestamps are measured in days since ``origin``, the first timestamp of the
+    series, to keep the running sums numerically stable.
+    """
+
+    origin: datetime
+    count: int
+    sum_t: float
+    sum_y: float
+    sum_tt: float
+    sum_ty: float
+    last_timestamp: datetime
+    last_value: float
+    ewma: float
+    level: float
+    trend: float
+
+    @property
+    def slope(self) -> float:
+        """Least-squares slope of the series in value units per day."""
+        return float(
+            least_squares_slope(
+                np.array([self.count]),
+                np.array([self.sum_t]),
+                np.array([self.sum_y]),
+                np.array([self.sum_tt]),
+                np.array([self.sum_ty]),
+            )[0]
+        )
+
+    @property
+    def forecast(self) -> float:
+        """Holt forecast of the next observation."""
+        return self.level + self.trend
+
+    @property
+    def trend_score(self) -> float:
+        """Relative change of the least-squares line over the trend horizon."""
+        return float(
+            trend_score(np.array([self.slope]), np.array([self.sum_y / self.count]))[0]
+        )
+
+    def as_dict(self) -> dict:
+        """State and derived metrics as a dict, e.g. to persist them."""
+        return {
+            **{field.name: getattr(self, field.name) for field in fields(self)},
+            "slope": self.slope,
+            "forecast": self.forecast,
+            "trend_score": self.trend_score,
+        }
+
+
+def to_days(timestamp: datetime, origin: datetime) -> float:
+    """Time passed since the origin in days."""
+    return (timestamp - origin).total_seconds() / SECONDS_PER_DAY
+
+
+def least_squares_slope(
+    count: np.ndarray,
+    sum_t: np.ndarray,
+    sum_y: np.ndarray,
+    sum_tt: np.ndarray,
+    sum_ty: np.ndarray,
+) -> np.ndarray:
+    """Least-squares slopes from running sums, zero for degenerate series."""
+    denominator = count * sum_tt - sum_t * sum_t
+    numerator = count * sum_ty - sum_t * sum_y
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = numerator / denominator
+    return np.where(np.abs(denominator) > EPSILON, slope, 0.0)
+
+
+def trend_score(slope: np.ndarray, mean: np.ndarray) -> np.ndarray:
+    """Relative change of the least-squares lines over the trend horizon."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = slope * TREND_HORIZON_DAYS / np.abs(mean)
+    return np.where(np.abs(mean) > EPSILON, score, 0.0)
+
+
+def fit(codes: np.ndarray, t: np.ndarray, y: np.ndarray, num_series: int) -> dict:
+    """Fit the trend models of all series at once.
+
+    Args:
+        codes: The series code (0 to ``num_series - 1``) of every observation.
+        t: The time of every observation in days since the origin of its series.
+        y: The value of every observation.
+        num_series: The number of series.
+
+    Observations have to be sorted by series and time.
+
+    Returns:
+        The state arrays and derived metrics of all series indexed by series code,
+        keyed like the fields of ``TrendState.as_dict`` except for the timestamps.
+    """
+    count = np.bincount(codes, minlength=num_series)
+    sums = {
+        "sum_t": np.bincount(codes, weights=t, minlength=num_series),
+        "sum_y": np.bincount(codes, weights=y, minlength=num_series),
+        "sum_tt": np.bincount(codes, weights=t * t, minlength=num_series),
+        "sum_ty": np.bincount(codes, weights=t * y, minlength=num_series),
+    }
+    slope = least_squares_slope(count, **sums)
+
+    # the recursions of EWMA and Holt loop over the positions within the series but
+    # are vectorized over all series that are long enough for the current position
+    starts = np.cumsum(count) - count
+    has_values = count > 0
+    by_length = np.argsort(-count, kind="stable")
+    negative_lengths = -count[by_length]
+
+    ewma = np.zeros(num_series)
+    ewma[has_values] = y[starts[has_values]]
+    level, trend = ewma.copy(), np.zeros(num_series)
+    for step in range(1, int(count.max()) if num_series else 0):
+        active = by_length[: np.searchsorted(negative_lengths, -step, side="left")]
+        value = y[starts[active] + step]
+        previous_level = level[active]
+        new_level = HOLT_ALPHA * value + (1 - HOLT_ALPHA) * (
+            previous_level + trend[active]
+        )
+        trend[active] = (
+            HOLT_BETA * (new_level - previous_level) + (1 - HOLT_BETA) * trend[active]
+        )
+        level[active] = new_level
+        ewma[active] = EWMA_ALPHA * value + (1 - EWMA_ALPHA) * ewma[active]
+
+    mean = np.zeros(num_series)
+    mean[has_values] = sums["sum_y"][has_values] / count[has_values]
+    last = np.zeros(num_series)
+    last[has_values] = y[starts[has_values] + count[has_values] - 1]
+    return {
+        "count": count,
+        **sums,
+        "last_value": last,
+        "ewma": ewma,
+        "level": level,
+        "trend": trend,
+        "slope": slope,
+        "forecast": level + trend,
+        "trend_score": trend_score(slope, mean),
+    }
+
+
+def update(state: TrendState, timestamp: datetime, value: float) -> TrendState:
+    """Update a fitted state with a new observation in O(1).
+
+    Yields the same state as fitting the series including the new observation, as
+    long as the observation is newer than the last one of the state.
+
+    Args:
+        state: The fitted state of the series.
+        timestamp: The timestamp of the new observation.
+        value: The value of the new observation.
+
+    Returns:
+        The updated state.
+    """
+    t = to_days(timestamp, state.origin)
+    level = HOLT_ALPHA * value + (1 - HOLT_ALPHA) * (state.level + state.trend)
+    return TrendState(
+        origin=state.origin,
+        count=state.count + 1,
+        sum_t=state.sum_t + t,
+        sum_y=state.sum_y + value,
+        sum_tt=state.sum_tt + t * t,
+        sum_ty=state.sum_ty + t * value,
+        last_timestamp=timestamp,
+        last_value=value,
+        ewma=EWMA_ALPHA * value + (1 - EWMA_ALPHA) * state.ewma,
+        level=level,
+        trend=HOLT_BETA * (level - state.level) + (1 - HOLT_BETA) * state.trend,
+    )
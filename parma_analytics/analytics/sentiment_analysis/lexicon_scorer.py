@@ -0,0 +1,284 @@
+"""Offline sentiment scoring with a lexicon of unigrams and bigrams.
+
+All comments of a batch are tokenized into one flat token array, so that lexicon
+lookups, bigram matching, negation and intensification are evaluated with NumPy over
+the whole batch at once instead of comment by comment.
+"""
+
+import logging
+import re
+from itertools import chain, repeat
+from pathlib import Path
+
+import numpy as np
+
+from parma_analytics.analytics.sentiment_analysis.scorer import (
+    MAX_SCORE,
+    MIN_SCORE,
+    NEUTRAL_SCORE,
+    SentimentScorer,
+)
+
+logger = logging.getLogger(__name__)
+
+LEXICON_PATH = Path(__file__).parent / "lexicon.tsv"
+
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+NEGATORS = frozenset(
+    [
+        "not",
+        "no",
+        "never",
+        "nothing",
+        "nobody",
+        "neither",
+        "nor",
+        "without",
+        "cannot",
+        "don't",
+        "dont",
+        "doesn't",
+        "doesnt",
+        "didn't",
+        "didnt",
+        "isn't",
+        "isnt",
+        "wasn't",
+        "wasnt",
+        "aren't",
+        "arent",
+        "weren't",
+        "won't",
+        "wont",
+        "can't",
+        "cant",
+        "couldn't",
+        "shouldn't",
+        "wouldn't",
+        "hardly",
+    ]
+)
+
+# relative change of the weight of the following sentiment term
+INTENSIFIERS = {
+    "very": 0.3,
+    "really": 0.3,
+    "so": 0.2,
+    "super": 0.3,
+    "extremely": 0.4,
+    "incredibly": 0.4,
+    "absolutely": 0.3,
+    "totally": 0.3,
+    "completely": 0.3,
+    "highly": 0.3,
+    "truly": 0.3,
+    "most": 0.2,
+    "quite": 0.1,
+    "slightly": -0.3,
+    "somewhat": -0.2,
+    "barely": -0.4,
+    "kinda": -0.2,
+}
+
+# number of preceding tokens a negator affects
+NEGATION_WINDOW = 3
+# factor applied to the weight of negated terms, flips and dampens the sentiment
+NEGATION_FACTOR = -0.74
+# factors applied to the terms before and after a contrastive "but"
+BUT_BEFORE_FACTOR = 0.5
+BUT_AFTER_FACTOR = 1.5
+# emphasis added per exclamation mark and the maximum number of marks counted
+EXCLAMATION_EMPHASIS = 0.29
+MAX_EXCLAMATIONS = 4
+# normalization constant mapping the summed weights into (-1, 1)
+NORMALIZATION_ALPHA = 15.0
+
+
+def load_lexicon(path: Path = LEXICON_PATH) -> dict[str, float]:
+    """Load a lexicon file of tab separated terms and weights.
+
+    Args:
+        path: The path of the lexicon file. Lines starting with ``#`` are ignored.
+
+    Returns:
+        The weights keyed by term, bigrams are separated by a single space.
+    """
+    lexicon: dict[str, float] = {}
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip() or line.startswith("#"):
+                continue
+            term, weight = line.rstrip("\n").split("\t")
+            lexicon[" ".join(term.lower().split())] = float(weight)
+    return lexicon
+
+
+class LexiconSentimentScorer(SentimentScorer):
+    """Sentiment scorer based on a weighted lexicon, vectorized over a batch."""
+
+    name = "lexicon"
+
+    def __init__(self, lexicon: dict[str, float] | None = None):
+        """Compile the lexicon into lookup tables indexed by token id.
+
+        Args:
+            lexicon: The weights keyed by unigram or bigram, defaults to the lexicon
+                shipped with this module.
+        """
+        lexicon = load_lexicon() if lexicon is None else lexicon
+        unigrams = {term: w for term, w in lexicon.items() if " " not in term}
+        bigrams = {
+            tuple(term.split(" ")): w
+            for term, w in lexicon.items()
+            if len(term.split(" ")) == 2  # noqa: PLR2004
+        }
+
+        vocabulary = sorted(
+            set(unigrams)
+            | {token for bigram in bigrams for token in bigram}
+            | NEGATORS
+            | set(INTENSIFIERS)
+            | {"but"}
+        )
+        # id 0 is reserved for tokens that are not part of the vocabulary
+        self._vocabulary = {token: id for id, token in enumerate(vocabulary, start=1)}
+        size = len(vocabulary) + 1
+
+        self._weights = np.zeros(size)
+        self._is_negator = np.zeros(size, dtype=bool)
+        self._boost = np.zeros(size)
+        for token, id in self._vocabulary.items():
+            self._weights[id] = unigrams.get(token, 0.0)
+            self._is_negator[id] = token in NEGATORS
+            self._boost[id] = INTENSIFIERS.get(token, 0.0)
+        self._but_id = self._vocabulary["but"]
+
+        self._size = size
+        keys = np.array(
+            [
+                self._vocabulary[first] * size + self._vocabulary[second]
+                for first, second in bigrams
+            ],
+            dtype=np.int64,
+        )
+        order = np.argsort(keys)
+        self._bigram_keys = keys[order]
+        self._bigram_weights = np.array(list(bigrams.values()), dtype=float)[order]
+
+    async def score(self, comments: dict[int, str]) -> dict[int, int]:
+        """Score the given comments, see ``SentimentScorer.score``."""
+        if not comments:
+            return {}
+        scores = self.score_texts(list(comments.values()))
+        return dict(zip(comments.keys(), scores.tolist()))
+
+    def score_texts(self, texts: list[str]) -> np.ndarray:
+        """Score a batch of texts.
+
+        Args:
+            texts: The texts to be scored.
+
+        Returns:
+            The integer sentiment scores (0 to 10) in the order of the texts.
+        """
+        return (
+            np.rint(NEUTRAL_SCORE + (MAX_SCORE - NEUTRAL_SCORE) * self.polarity(texts))
+            .clip(MIN_SCORE, MAX_SCORE)
+            .astype(int)
+        )
+
+    def polarity(self, texts: list[str]) -> np.ndarray:
+        """Compute the normalized polarity of a batch of texts.
+
+        Args:
+            texts: The texts to be scored.
+
+        Returns:
+            The polarity of every text between -1 (negative) and 1 (positive).
+        """
+        num_texts = len(texts)
+        if not num_texts:
+            return np.zeros(0)
+        lowered = [text.lower() for text in texts]
+        tokens = [TOKEN_PATTERN.findall(text) for text in lowered]
+
+        lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=num_texts)
+        num_tokens = int(lengths.sum())
+        ids = np.fromiter(
+            map(self._vocabulary.get, chain.from_iterable(tokens), repeat(0)),
+            dtype=np.int64,
+            count=num_tokens,
+        )
+        text_index = np.repeat(np.arange(num_texts), lengths)
+        starts = np.cumsum(lengths) - lengths
+        position = np.arange(num_tokens) - starts[text_index]
+
+        def preceding(values: np.ndarray, distance: int, fill=0) -> np.ndarray:
+            """Values of the token `distance` positions before within the same text."""
+            shifted = np.full_like(values, fill)
+            if distance < num_tokens:
+                shifted[distance:] = values[: num_tokens - distance]
+            shifted[position < distance] = fill
+            return shifted
+
+        weights = self._weights[ids]
+
+        # bigrams replace the weights of their two tokens
+        previous_ids = preceding(ids, 1)
+        if len(self._bigram_keys):
+            keys = previous_ids * self._size + ids
+            index = np.searchsorted(self._bigram_keys, keys).clip(
+                max=len(self._bigram_keys) - 1
+            )
+            is_bigram = (self._bigram_keys[index] == keys) & (position > 0)
+            weights = np.where(is_bigram, self._bigram_weights[index], weights)
+            weights[np.flatnonzero(is_bigram) - 1] = 0.0
+        else:
+            is_bigram = np.zeros(num_tokens, dtype=bool)
+
+        # a term is negated by a negator in the preceding window, bigrams are only
+        # negated by negators in front of their first token
+        is_negator = self._is_negator[ids]
+        negated_by = [
+            preceding(is_negator, distance, fill=False)
+            for distance in range(1, NEGATION_WINDOW + 2)
+        ]
+        negated = np.where(
+            is_bigram,
+            np.logical_or.reduce(negated_by[1:]),
+            np.logical_or.reduce(negated_by[:-1]),
+        )
+        weights = np.where(negated, weights * NEGATION_FACTOR, weights)
+
+        # intensifiers scale the following term
+        weights *= (
+            1.0 + self._boost[np.where(is_bigram, preceding(ids, 2), previous_ids)]
+        )
+
+        # a contrastive "but" shifts the emphasis to the part of the text after it
+        is_but = (ids == self._but_id).astype(np.int64)
+        cumulative_buts = np.cumsum(is_but)
+        buts_so_far = cumulative_buts - (cumulative_buts - is_but)[starts[text_index]]
+        has_but = np.bincount(text_index, weights=is_but, minlength=num_texts) > 0
+        weights *= np.where(
+            has_but[text_index],
+            np.where(buts_so_far > 0, BUT_AFTER_FACTOR, BUT_BEFORE_FACTOR),
+            1.0,
+        )
+
+        # bincount of a batch without any tokens is of integer type
+        sums = np.bincount(text_index, weights=weights, minlength=num_texts).astype(
+            float
+        )
+
+        exclamations = np.fromiter(
+            (text.count("!") for text in lowered), dtype=float, count=num_texts
+        )
+        sums += (
+            np.sign(sums)
+            * exclamations.clip(max=MAX_EXCLAMATIONS)
+            * EXCLAMATION_EMPHASIS
+        )
+
+        return sums / np.sqrt(sums * sums + NORMALIZATION_ALPHA)
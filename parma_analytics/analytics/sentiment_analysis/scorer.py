@@ -0,0 +1,33 @@
+"""Common interface of the sentiment scoring backends."""
+
+from abc import ABC, abstractmethod
+from typing import ClassVar
+
+MIN_SCORE = 0
+MAX_SCORE = 10
+NEUTRAL_SCORE = 5
+
+
+class SentimentScorer(ABC):
+    """Backend scoring the sentiment of comments from 0 (negative) to 10 (positive).
+
+    Attributes:
+        name: The name the backend is selected by, see ``SENTIMENT_SCORER``.
+        chunked: Whether the comments have to be split into token-budgeted chunks
+            before scoring, e.g. because every chunk is sent as a single request.
+    """
+
+    name: ClassVar[str]
+    chunked: ClassVar[bool] = False
+
+    @abstractmethod
+    async def score(self, comments: dict[int, str]) -> dict[int, int]:
+        """Score the given comments.
+
+        Args:
+            comments: The comments to be scored keyed by their comment value id.
+
+        Returns:
+            The sentiment scores keyed by comment value id. Comments that could not
+            be scored are omitted.
+        """
@@ -1,25 +1,109 @@
-"""OpenAi API for sentiment analysis."""
+"""Sentiment analysis of comments with a configurable scoring backend.
+
+The backend is selected per deployment with the ``SENTIMENT_SCORER`` environment
+variable: ``lexicon`` (default) scores offline with a NumPy vectorized lexicon model,
+``chatgpt`` asks the OpenAI API and falls back to the lexicon model for comments it
+could not score.
+"""
+import asyncio
 import json
+import logging
 import os
-import time
+import re
 
 import httpx
 from dotenv import load_dotenv
 
+from parma_analytics.analytics.sentiment_analysis.lexicon_scorer import (
+    LexiconSentimentScorer,
+)
+from parma_analytics.analytics.sentiment_analysis.scorer import (
+    MAX_SCORE,
+    MIN_SCORE,
+    SentimentScorer,
+)
+
 # Load environment variables from .env
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 HTTP_TOO_MANY_REQUESTS = 429
 
+# upper bound of response tokens needed per scored comment, e.g. `"12345": 7, `
+RESPONSE_TOKENS_PER_COMMENT = 8
+
+DEFAULT_SCORER = LexiconSentimentScorer.name
+
+
+class ChatGptSentimentScorer(SentimentScorer):
+    """Sentiment scorer asking the OpenAI chat completions API."""
+
+    name = "chatgpt"
+    chunked = True
+
+    async def score(self, comments: dict[int, str]) -> dict[int, int]:
+        """Score the given comments, see ``SentimentScorer.score``."""
+        return await get_chatgpt_sentiment(comments)
+
+
+SCORERS: dict[str, type[SentimentScorer]] = {
+    LexiconSentimentScorer.name: LexiconSentimentScorer,
+    ChatGptSentimentScorer.name: ChatGptSentimentScorer,
+}
 
-async def get_sentiment(text: list) -> list:
-    """Analyze and score the sentiment of a given comment.
+_scorers: dict[str, SentimentScorer] = {}
+
+
+def get_scorer(name: str | None = None) -> SentimentScorer:
+    """Get the sentiment scorer instance of the given backend.
+
+    Instances are created once per process, e.g. to compile the lexicon only once.
 
     Args:
-        text: The comment to be analyzed.
+        name: The name of the backend, defaults to ``SENTIMENT_SCORER``.
 
     Returns:
-        An integer representing the sentiment score of the given comment.
+        The sentiment scorer.
+
+    Raises:
+        ValueError: If no backend with the given name exists.
+    """
+    name = (name or os.getenv("SENTIMENT_SCORER") or DEFAULT_SCORER).strip().lower()
+    if name not in _scorers:
+        if name not in SCORERS:
+            raise ValueError(
+                f"Unknown sentiment scorer '{name}', expected one of {list(SCORERS)}."
+            )
+        _scorers[name] = SCORERS[name]()
+    return _scorers[name]
+
+
+async def get_sentiment(comments: dict[int, str]) -> dict[int, int]:
+    """Analyze and score the sentiment of the given comments.
+
+    Args:
+        comments: The comments to be analyzed keyed by their comment value id.
+
+    Returns:
+        The sentiment scores (0 to 10) keyed by comment value id.
+    """
+    return await get_scorer().score(comments)
+
+
+async def get_chatgpt_sentiment(comments: dict[int, str]) -> dict[int, int]:
+    """Analyze and score the sentiment of the given comments with ChatGPT.
+
+    The comments are sent together with their ids and the model is asked to answer
+    with a JSON object keyed by the same ids, so that every score can be matched to
+    its comment explicitly. Comments without a valid score in the answer are omitted
+    from the result instead of shifting the scores of the remaining comments.
+
+    Args:
+        comments: The comments to be analyzed keyed by their comment value id.
+
+    Returns:
+        The sentiment scores (0 to 10) keyed by comment value id.
     """
 
     # Function to send request to GPT API
@@ -27,11 +111,10 @@ async def get_sentiment(text: list) -> list:
         data = {
             "model": "gpt-3.5-turbo",
             "temperature": 0.5,
-            "max_tokens": 400,  # response
+            "max_tokens": 16 + RESPONSE_TOKENS_PER_COMMENT * len(comments),
             "top_p": 1,
             "frequency_penalty": 0,
             "presence_penalty": 0,
-            "stop": ["\n"],
             "messages": [{"role": "system", "content": prompt}],
         }
         api_key = os.getenv("CHATGPT_API_KEY")
@@ -61,21 +144,65 @@ async def get_sentiment(text: list) -> list:
 
             except httpx.HTTPStatusError as e:
                 if e.response.status_code == HTTP_TOO_MANY_REQUESTS:
-                    # API throttling, apply exponential backoff
+                    # API throttling, apply exponential backoff without blocking
+                    # the other chunks that are scored concurrently
                     delay = min(backoff_factor**attempt, max_delay)
-                    time.sleep(delay)
+                    await asyncio.sleep(delay)
                 else:
                     # If it's not a 429 error, raise the exception
                     raise
         # If all retries fail, raise the last exception
         raise Exception("Max retries reached, unable to make a successful request.")
 
+    if not comments:
+        return {}
+
     primary_sentiment = await send_request(
-        f"Analyze the sentiment of the sentences in the given array,"
-        f"provide the all sentiment scores for each sentence"
-        f"with integer scores ranging from 0 to 10."
-        f"where 0 is the most negative, 10 is the most positive, 5 is neutral"
-        f"\n\n{text}"
+        f"Analyze the sentiment of each comment in the given JSON object, "
+        f"which maps comment ids to comments. "
+        f"Score every comment with an integer ranging from 0 to 10, "
+        f"where 0 is the most negative, 10 is the most positive and 5 is neutral. "
+        f"Answer only with a JSON object mapping each comment id to its score."
+        f"\n\n{json.dumps({str(id): text for id, text in comments.items()})}"
     )
 
-    return primary_sentiment
+    return parse_sentiment_scores(primary_sentiment, comments.keys())
+
+
+def parse_sentiment_scores(response: str, ids) -> dict[int, int]:
+    """Parse the model answer into scores matched to the requested comment ids.
+
+    Args:
+        response: The raw answer of the model, expected to contain a JSON object.
+        ids: The comment value ids that were sent for scoring.
+
+    Returns:
+        The valid scores keyed by comment value id.
+    """
+    match = re.search(r"\{.*\}", response, re.DOTALL)
+    if not match:
+        logger.warning("Sentiment response does not contain a JSON object.")
+        return {}
+    try:
+        raw_scores = json.loads(match.group(0))
+    except json.JSONDecodeError as e:
+        logger.warning(f"Sentiment response is not valid JSON: {e}")
+        return {}
+
+    requested_ids = {str(id): id for id in ids}
+    scores: dict[int, int] = {}
+    for key, score in raw_scores.items():
+        id = requested_ids.get(str(key).strip())
+        if id is None:
+            continue
+        try:
+            int_score = int(score)
+        except (TypeError, ValueError):
+            continue
+        if MIN_SCORE <= int_score <= MAX_SCORE:
+            scores[id] = int_score
+
+    missing = len(requested_ids) - len(scores)
+    if missing:
+        logger.warning(f"No valid sentiment score returned for {missing} comments.")
+    return scores
@@ -1,57 +1,155 @@
-"""Function for updating sentiment analysis score in DB."""
+"""Function for updating sentiment analysis score in DB.
 
+Comments are scored in a chunked pipeline: all comments are loaded with one query,
+scored by the configured backend and the resulting scores are written back with one
+bulk update. Backends sending requests per chunk get the comments split into chunks
+that fit a token budget and score the chunks concurrently.
+"""
+
+import asyncio
 import logging
+import os
 
+from parma_analytics.analytics.sentiment_analysis.scorer import SentimentScorer
 from parma_analytics.analytics.sentiment_analysis.sentiment_analysis import (
-    get_sentiment,
+    DEFAULT_SCORER,
+    get_scorer,
 )
 from parma_analytics.db.prod.engine import get_session
-from parma_analytics.db.prod.measurement_value_query import MeasurementValueCRUD
+from parma_analytics.db.prod.measurement_value_query import (
+    MeasurementValueCRUD,
+    update_sentiment_scores,
+)
 from parma_analytics.db.prod.models.measurement_value_models import (
     MeasurementCommentValue,
 )
 
 logger = logging.getLogger(__name__)
 
+# rough approximation of the tokenizer: one token per four characters
+CHARS_PER_TOKEN = 4
+
+# prompt tokens available for the comments of a single request
+CHUNK_TOKEN_BUDGET = int(os.getenv("SENTIMENT_CHUNK_TOKEN_BUDGET", "2000"))
+
+# maximum number of chunks scored at the same time
+MAX_CONCURRENT_CHUNKS = int(os.getenv("SENTIMENT_MAX_CONCURRENT_CHUNKS", "4"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of prompt tokens of a comment including its id."""
+    return len(text) // CHARS_PER_TOKEN + 8
+
+
+def chunk_comments(
+    comments: dict[int, str], token_budget: int | None = None
+) -> list[dict[int, str]]:
+    """Split comments into chunks whose estimated size fits the token budget.
+
+    A single comment exceeding the budget is put into a chunk of its own.
+
+    Args:
+        comments: The comments keyed by comment value id.
+        token_budget: The maximum estimated number of tokens per chunk, defaults to
+            ``SENTIMENT_CHUNK_TOKEN_BUDGET``.
+
+    Returns:
+        The chunks of comments keyed by comment value id.
+    """
+    token_budget = token_budget or CHUNK_TOKEN_BUDGET
+    chunks: list[dict[int, str]] = []
+    current: dict[int, str] = {}
+    current_tokens = 0
+    for id, text in comments.items():
+        tokens = estimate_tokens(text)
+        if current and current_tokens + tokens > token_budget:
+            chunks.append(current)
+            current, current_tokens = {}, 0
+        current[id] = text
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def score_comments(
+    comments: dict[int, str],
+    max_concurrency: int | None = None,
+    scorer: SentimentScorer | None = None,
+) -> dict[int, int]:
+    """Score comments with a bounded number of concurrent chunks.
+
+    A failing chunk is logged and skipped so that it does not discard the scores of
+    the other chunks. Comments the scorer could not score are scored by the offline
+    default backend instead, if another backend is configured.
 
-async def update_scores(ids: list) -> list | None:
+    Args:
+        comments: The comments keyed by comment value id.
+        max_concurrency: The maximum number of chunks scored at the same time,
+            defaults to ``SENTIMENT_MAX_CONCURRENT_CHUNKS``.
+        scorer: The backend to score with, defaults to ``SENTIMENT_SCORER``.
+
+    Returns:
+        The sentiment scores keyed by comment value id.
+    """
+    scorer = scorer or get_scorer()
+    semaphore = asyncio.Semaphore(max_concurrency or MAX_CONCURRENT_CHUNKS)
+
+    async def score_chunk(chunk: dict[int, str]) -> dict[int, int]:
+        async with semaphore:
+            try:
+                return await scorer.score(chunk)
+            except Exception as e:
+                logger.error(
+                    f"Failed to score chunk of {len(chunk)} comments "
+                    f"with {scorer.name}: {e}"
+                )
+                return {}
+
+    chunks = chunk_comments(comments) if scorer.chunked else [comments]
+    chunk_scores = await asyncio.gather(*(score_chunk(chunk) for chunk in chunks))
+
+    scores: dict[int, int] = {}
+    for chunk_score in chunk_scores:
+        scores.update(chunk_score)
+
+    unscored = {id: text for id, text in comments.items() if id not in scores}
+    if unscored and scorer.name != DEFAULT_SCORER:
+        logger.info(f"Scoring {len(unscored)} comments with {DEFAULT_SCORER}.")
+        scores.update(await get_scorer(DEFAULT_SCORER).score(unscored))
+    return scores
+
+
+async def update_scores(ids: list) -> dict[int, int]:
     """Update sentiment scores of all given comment values in DB.
 
     Args:
         ids: The comment value ids.
 
     Returns:
-        A list of scores representing the score of the given comments.
+        The scores of the updated comments keyed by comment value id.
     """
+    # registering a value returns None or -1 if it could not be stored
+    valid_ids = [id for id in ids if id is not None and id >= 0]
+    if not valid_ids:
+        return {}
+
     comment_value_crud = MeasurementValueCRUD(MeasurementCommentValue)
-    values = []  # all comments
+    with get_session() as db_session:
+        comment_values = comment_value_crud.get_measurement_values(
+            db_session, valid_ids
+        )
+    comments = {
+        comment_value.id: comment_value.value
+        for comment_value in comment_values
+        if comment_value.value
+    }
+
+    scores = await score_comments(comments)
+    logger.debug(f"Scored {len(scores)} of {len(comments)} comments.")
 
     with get_session() as db_session:
-        for id in ids:
-            comment_value = comment_value_crud.get_measurement_value(db_session, id)
-            values.append(comment_value.value)
-        sentiment_score_list = await get_sentiment(values)
-        # Ensure that score[i] is an integer before assigning
-        scores = []
-
-        for item in sentiment_score_list:
-            try:
-                int_item = int(item)
-                scores.append(int_item)
-            except ValueError:
-                continue
-        logger.debug(scores)
-
-        try:
-            for i, id in enumerate(ids):
-                comment_value = comment_value_crud.get_measurement_value(db_session, id)
-                comment_value.sentiment_score = scores[i]
-            # Commit all the changes after the loop
-            db_session.commit()
-
-        except Exception as e:
-            # Rollback in case of error
-            db_session.rollback()
-            raise e  # Reraise the exception to handle it or log it as needed
-
-    return sentiment_score_list
+        update_sentiment_scores(db_session, scores)
+        db_session.commit()
+
+    return scores
@@ -0,0 +1,104 @@
+"""Downsampling of time series to a point budget for charts.
+
+Both methods return the indices of the points to keep, so that the original
+timestamps and values are shown instead of interpolated ones:
+
+- LTTB (largest triangle three buckets) keeps the visual shape of the series,
+- min/max bucketing keeps the extremes of equally long time buckets, e.g. spikes.
+"""
+
+import numpy as np
+
+MIN_POINTS = 3
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Select points with the largest triangle three buckets algorithm.
+
+    The first and last point are always kept. The remaining points are split into
+    ``max_points - 2`` buckets of equal size and from every bucket the point spanning
+    the largest triangle with the previously selected point and the mean of the next
+    bucket is kept.
+
+    Args:
+        x: The x coordinates (e.g. timestamps in seconds), sorted ascending.
+        y: The y coordinates.
+        max_points: The maximum number of points to keep.
+
+    Returns:
+        The sorted indices of the selected points.
+
+    Raises:
+        ValueError: If the budget is smaller than three points.
+    """
+    num_points = len(x)
+    if max_points < MIN_POINTS:
+        raise ValueError(f"LTTB needs a budget of at least {MIN_POINTS} points.")
+    if max_points >= num_points:
+        return np.arange(num_points)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # bucket boundaries of the inner points, the first and last point form own buckets
+    edges = np.linspace(1, num_points - 1, max_points - 1).astype(np.int64)
+    sums_x = np.add.reduceat(x[1:-1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:-1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    # mean of the following bucket, the last bucket is followed by the last point
+    next_x = np.append((sums_x / sizes)[1:], x[-1])
+    next_y = np.append((sums_y / sizes)[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, num_points - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        bucket_x, bucket_y = x[start:end], y[start:end]
+        # doubled triangle areas, the constant factor does not change the maximum
+        areas = np.abs(
+            (x[previous] - next_x[bucket]) * (bucket_y - y[previous])
+            - (x[previous] - bucket_x) * (next_y[bucket] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def min_max(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Select the minimum and maximum of equally long time buckets.
+
+    Args:
+        x: The x coordinates (e.g. timestamps in seconds), sorted ascending.
+        y: The y coordinates.
+        max_points: The maximum number of points to keep, two per bucket.
+
+    Returns:
+        The sorted indices of the selected points.
+
+    Raises:
+        ValueError: If the budget is smaller than two points.
+    """
+    num_points = len(x)
+    num_buckets = max_points // 2
+    if num_buckets < 1:
+        raise ValueError("Min/max bucketing needs a budget of at least 2 points.")
+    if max_points >= num_points:
+        return np.arange(num_points)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    span = x[-1] - x[0]
+    if span > 0:
+        buckets = np.minimum(
+            ((x - x[0]) / span * num_buckets).astype(np.int64), num_buckets - 1
+        )
+    else:
+        buckets = np.arange(num_points) * num_buckets // num_points
+
+    # sorted by bucket and value, the first and last point of every bucket are its
+    # minimum and maximum
+    order = np.lexsort((y, buckets))
+    sorted_buckets = buckets[order]
+    firsts = np.flatnonzero(np.diff(sorted_buckets, prepend=-1))
+    lasts = np.append(firsts[1:] - 1, num_points - 1)
+    return np.unique(np.concatenate([order[firsts], order[lasts]]))
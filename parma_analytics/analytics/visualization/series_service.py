@@ -0,0 +1,136 @@
+"""Downsampled measurement series for charts.
+
+Series are fetched in columnar form, downsampled to the requested point budget and
+cached per company measurement, time range, budget and method. Registering a new
+value invalidates the cached series of its company measurement.
+"""
+
+import itertools
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import polars as pl
+
+from parma_analytics.analytics.visualization.downsampling import lttb, min_max
+from parma_analytics.db.prod.engine import get_engine
+from parma_analytics.db.prod.measurement_trend_query import fetch_numeric_series
+from parma_analytics.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+DOWNSAMPLING_METHODS = {"lttb": lttb, "minmax": min_max}
+
+DEFAULT_MAX_POINTS = 1000
+
+CACHE_TTL_SECONDS = float(os.getenv("VISUALIZATION_CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_SIZE = int(os.getenv("VISUALIZATION_CACHE_MAX_SIZE", "1024"))
+
+_cache: TTLCache = TTLCache(CACHE_TTL_SECONDS, CACHE_MAX_SIZE)
+
+# cache keys contain the generation of their company measurement, invalidating bumps
+# the generation so that stale entries are never hit again and expire by themselves
+_generation_counter = itertools.count(1)
+_generations: dict[int, int] = {}
+
+
+@dataclass
+class DownsampledSeries:
+    """Downsampled series of a company measurement."""
+
+    company_measurement_id: int
+    method: str
+    total_points: int
+    timestamps: list[datetime]
+    values: list[float]
+
+
+def downsample(series: pl.DataFrame, max_points: int, method: str) -> pl.DataFrame:
+    """Downsample a series sorted by timestamp to a point budget.
+
+    Args:
+        series: Frame with the columns timestamp and value.
+        max_points: The maximum number of points to keep.
+        method: The downsampling method, one of ``DOWNSAMPLING_METHODS``.
+
+    Returns:
+        The rows of the selected points.
+    """
+    if len(series) <= max_points:
+        return series
+    seconds = (
+        series["timestamp"].to_numpy().astype("datetime64[us]").astype(np.int64) / 1e6
+    )
+    values = series["value"].to_numpy().astype(float)
+    indices = DOWNSAMPLING_METHODS[method](seconds, values, max_points)
+    return series[indices]
+
+
+def get_downsampled_series(
+    company_measurement_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    max_points: int = DEFAULT_MAX_POINTS,
+    method: str = "lttb",
+) -> DownsampledSeries:
+    """Get the numeric series of a company measurement downsampled for a chart.
+
+    Args:
+        company_measurement_id: The id of the company measurement.
+        start: Only include values at or after this timestamp if given.
+        end: Only include values before this timestamp if given.
+        max_points: The maximum number of points to return.
+        method: The downsampling method, one of ``DOWNSAMPLING_METHODS``.
+
+    Returns:
+        The downsampled series.
+
+    Raises:
+        ValueError: If the downsampling method is unknown.
+    """
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError(
+            f"Unknown downsampling method '{method}', "
+            f"expected one of {list(DOWNSAMPLING_METHODS)}."
+        )
+
+    # read the generation before fetching, so that a value registered meanwhile
+    # invalidates the entry created by this call
+    key = (
+        company_measurement_id,
+        _generations.get(company_measurement_id, 0),
+        start,
+        end,
+        max_points,
+        method,
+    )
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    series = fetch_numeric_series(get_engine(), [company_measurement_id], start, end)
+    points = downsample(series, max_points, method)
+    result = DownsampledSeries(
+        company_measurement_id=company_measurement_id,
+        method=method,
+        total_points=len(series),
+        timestamps=points["timestamp"].to_list() if len(points) else [],
+        values=points["value"].to_list() if len(points) else [],
+    )
+    _cache.set(key, result)
+    logger.debug(
+        f"Downsampled {result.total_points} values of company measurement "
+        f"{company_measurement_id} to {len(result.values)} points."
+    )
+    return result
+
+
+def invalidate_series(company_measurement_id: int) -> None:
+    """Invalidate all cached series of a company measurement.
+
+    Args:
+        company_measurement_id: The id of the company measurement.
+    """
+    _generations[company_measurement_id] = next(_generation_counter)
@@ -10,11 +10,14 @@ from .routes import (
     data_source_handshake_router,
     dummy_router,
     feed_raw_data_router,
+    identifier_refresh_router,
     new_company_router,
     populate_rules_router,
     schedule_router,
     send_reports_router,
     source_measurement_router,
+    trends_router,
+    visualization_router,
 )
 
 env = os.getenv("DEPLOYMENT_ENV", "local")
@@ -70,6 +73,11 @@ app.include_router(
     tags=["schedule_mining_modules"],
 )
 
+app.include_router(
+    identifier_refresh_router,
+    tags=["refresh_identifiers"],
+)
+
 app.include_router(
     send_reports_router,
     tags=["send_reports"],
@@ -79,3 +87,13 @@ app.include_router(
     populate_rules_router,
     tags=["populate_rules"],
 )
+
+app.include_router(
+    trends_router,
+    tags=["trends"],
+)
+
+app.include_router(
+    visualization_router,
+    tags=["visualization"],
+)
@@ -33,9 +33,12 @@ class _ApiCrawlingFinishedOutBase(_ApiCrawlingFinishedBase):
 
 
 class ApiCrawlingFinishedCreateIn(_ApiCrawlingFinishedBase):
-    """Input model for the CrawlingFinished creation endpoint."""
+    """Input model for the CrawlingFinished creation endpoint.
 
-    pass
+    Modules receiving a payload with a shard id report each shard with its id.
+    """
+
+    shard_id: int | None = None
 
 
 class ApiCrawlingFinishedCreateOut(_ApiCrawlingFinishedOutBase):
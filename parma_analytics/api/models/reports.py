@@ -0,0 +1,49 @@
+"""Pydantic REST models for the weekly report endpoints."""
+
+from datetime import date, datetime
+
+from pydantic import BaseModel
+
+# ------------------------------------------------------------------------------------ #
+#                                       Internal                                       #
+# ------------------------------------------------------------------------------------ #
+
+
+class _ApiReportJobBase(BaseModel):
+    """Internal base model for the weekly report endpoints."""
+
+    job_id: int
+
+
+# ------------------------------------------------------------------------------------ #
+#                                      Read Models                                     #
+# ------------------------------------------------------------------------------------ #
+
+
+class ApiReportJobStartOut(_ApiReportJobBase):
+    """Output model for starting the weekly reports."""
+
+    message: str
+
+
+class ApiReportFailureOut(BaseModel):
+    """A user whose weekly report failed."""
+
+    user_id: int
+    error: str | None
+
+
+class ApiReportJobStatusOut(_ApiReportJobBase):
+    """Output model for the progress of the weekly reports."""
+
+    period_start: date
+    status: str
+    total_users: int
+    sent: int
+    failed: int
+    skipped: int
+    pending: int
+    started_at: datetime
+    finished_at: datetime | None
+    users_per_second: float
+    failures: list[ApiReportFailureOut]
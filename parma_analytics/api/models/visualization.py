@@ -0,0 +1,34 @@
+"""Pydantic REST models for the visualization endpoints."""
+
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+# ------------------------------------------------------------------------------------ #
+#                                       Internal                                       #
+# ------------------------------------------------------------------------------------ #
+
+
+class _ApiVisualizationSeriesBase(BaseModel):
+    """Internal base model for the visualization series endpoint."""
+
+    company_measurement_id: int
+    method: Literal["lttb", "minmax"]
+
+
+# ------------------------------------------------------------------------------------ #
+#                                      Read Models                                     #
+# ------------------------------------------------------------------------------------ #
+
+
+class ApiVisualizationSeriesOut(_ApiVisualizationSeriesBase):
+    """Output model for the visualization series endpoint.
+
+    The points are returned in columnar form, the n-th timestamp belongs to the n-th
+    value.
+    """
+
+    total_points: int
+    timestamps: list[datetime]
+    values: list[float]
@@ -4,20 +4,26 @@ from .crawling_finished import router as crawling_finished_router
 from .data_source_handshake import router as data_source_handshake_router
 from .dummy import router as dummy_router
 from .feed_raw_data import router as feed_raw_data_router
+from .identifier_refresh import router as identifier_refresh_router
 from .new_company import router as new_company_router
 from .populate_rules import router as populate_rules_router
 from .schedule import router as schedule_router
 from .send_reports import router as send_reports_router
 from .source_measurement import router as source_measurement_router
+from .trends import router as trends_router
+from .visualization import router as visualization_router
 
 __all__ = [
     "crawling_finished_router",
     "dummy_router",
     "feed_raw_data_router",
+    "identifier_refresh_router",
     "new_company_router",
     "populate_rules_router",
     "schedule_router",
     "source_measurement_router",
     "data_source_handshake_router",
     "send_reports_router",
+    "trends_router",
+    "visualization_router",
 ]
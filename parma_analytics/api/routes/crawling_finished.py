@@ -41,16 +41,24 @@ def crawling_finished(
         A simple receival confirmation message.
     """
     task_id: int = crawling_finished_data.task_id
-    # TODO: When we introduce company level scheduling, this section will be updated
     result_summary: str | None = None
+    company_errors: dict[int, tuple[str, str]] = {}
     if crawling_finished_data.errors is not None:
         errors_dict = {
             k: v.model_dump() for k, v in crawling_finished_data.errors.items()
         }
         result_summary = json.dumps(errors_dict, default=pydantic_encoder)
+        # errors are reported by company id, failed companies are retried
+        company_errors = {
+            int(k): (v.error_type, v.error_description)
+            for k, v in crawling_finished_data.errors.items()
+            if k.isdigit()
+        }
 
     try:
-        MiningModuleManager.set_task_status_success_with_id(task_id, result_summary)
+        MiningModuleManager.set_task_status_success_with_id(
+            task_id, result_summary, crawling_finished_data.shard_id, company_errors
+        )
     except Exception as e:
         logger.error(f"Error setting task {task_id} status to success: {str(e)}")
         raise HTTPException(
@@ -4,7 +4,7 @@ import json
 from ast import literal_eval
 from http import HTTPStatus
 
-import requests
+import httpx
 from fastapi import APIRouter, HTTPException, status
 
 from parma_analytics.api.models.data_source_handshake import (
@@ -14,6 +14,7 @@ from parma_analytics.db.mining.service import (
     NormalizationSchemaIn,
     store_normalization_schema,
 )
+from parma_analytics.utils.http_client import request
 from parma_analytics.utils.jwt_handler import JWTHandler
 
 router = APIRouter()
@@ -50,7 +51,8 @@ def perform_handshake(
     token: str = JWTHandler.create_jwt(data_source_id)
     header = {"Authorization": f"Bearer {token}"}
     try:
-        response = requests.get(
+        response = request(
+            "GET",
             f"{invocation_endpoint}/initialize",
             params={"source_id": data_source_id},
             headers=header,
@@ -75,7 +77,7 @@ def perform_handshake(
         store_normalization_schema(data_source, normalization_map_in)
 
         return ApiDataSourceHandshakeOut(frequency=frequency)
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         # Generic exception handler for any other types of exceptions
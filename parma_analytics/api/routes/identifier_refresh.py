@@ -0,0 +1,34 @@
+"""FastAPI routes for refreshing the discovered identifiers of companies."""
+
+import logging
+
+from fastapi import APIRouter, BackgroundTasks, Response, status
+
+from parma_analytics.sourcing.discovery.identifier_refresher import (
+    refresh_expiring_identifiers,
+)
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get(
+    "/refresh-identifiers",
+    status_code=status.HTTP_200_OK,
+    description="Endpoint to rediscover the identifiers that expire soon.",
+)
+async def refresh_identifiers(background_tasks: BackgroundTasks) -> Response:
+    """Trigger a background task to rediscover the identifiers that expire soon.
+
+    Args:
+        background_tasks: The background tasks to schedule set up by fastapi.
+
+    Returns:
+        HTTP acknowledgement.
+    """
+    logger.info(
+        "/refresh-identifiers endpoint called. "
+        "Refreshing identifiers will start in the background."
+    )
+    background_tasks.add_task(refresh_expiring_identifiers)
+    return Response(status_code=status.HTTP_200_OK)
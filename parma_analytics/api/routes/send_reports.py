@@ -2,9 +2,18 @@
 
 import logging
 
-from fastapi import APIRouter, Response, status
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status
 
-from parma_analytics.reporting.send_reports import send_reports
+from parma_analytics.api.models.reports import (
+    ApiReportFailureOut,
+    ApiReportJobStartOut,
+    ApiReportJobStatusOut,
+)
+from parma_analytics.reporting.report_job import (
+    create_report_job,
+    get_report_job_progress,
+    run_report_job,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -12,21 +21,69 @@ logger = logging.getLogger(__name__)
 
 @router.get(
     "/weekly-reports",
-    status_code=status.HTTP_200_OK,
+    status_code=status.HTTP_202_ACCEPTED,
     description="Endpoint to generate weekly reports and send it to user.",
 )
-async def weeky_reports() -> Response:
-    """Retrieve the reports from news entity and send it via email and slack."""
-    try:
-        send_reports()
+async def weeky_reports(background_tasks: BackgroundTasks) -> ApiReportJobStartOut:
+    """Start sending the weekly reports in the background.
 
-        return Response(
-            content="Weekly reports sent successfully", status_code=status.HTTP_200_OK
-        )
-    except Exception as e:
-        logger.error(f"Error generating and sending weekly reports: {str(e)}")
+    Calling the endpoint again for the same week resumes the run, users whose report
+    was already sent or who have no news are skipped.
+
+    Args:
+        background_tasks: The background tasks to schedule set up by fastapi.
 
-        return Response(
-            content="Internal Server Error",
+    Returns:
+        The id of the run to query its progress.
+    """
+    try:
+        job_id = create_report_job()
+    except Exception as e:
+        logger.error(f"Error creating the weekly report job: {str(e)}")
+        raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal Server Error",
+        )
+
+    background_tasks.add_task(run_report_job, job_id)
+    return ApiReportJobStartOut(
+        job_id=job_id, message="Weekly reports are sent in the background"
+    )
+
+
+@router.get(
+    "/weekly-reports/status",
+    status_code=status.HTTP_200_OK,
+    description="Endpoint to get the progress of the weekly reports.",
+)
+def weekly_reports_status(job_id: int | None = None) -> ApiReportJobStatusOut:
+    """Get the progress, throughput and failures of a weekly report run.
+
+    Args:
+        job_id: The id of the run, the latest run if not given.
+
+    Returns:
+        The progress of the run.
+    """
+    progress = get_report_job_progress(job_id)
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Report job not found"
         )
+    return ApiReportJobStatusOut(
+        job_id=progress.job_id,
+        period_start=progress.period_start,
+        status=progress.status,
+        total_users=progress.total_users,
+        sent=progress.sent,
+        failed=progress.failed,
+        skipped=progress.skipped,
+        pending=progress.pending,
+        started_at=progress.started_at,
+        finished_at=progress.finished_at,
+        users_per_second=progress.users_per_second,
+        failures=[
+            ApiReportFailureOut(user_id=user_id, error=error)
+            for user_id, error in progress.failures
+        ],
+    )
@@ -0,0 +1,45 @@
+"""FastAPI routes for the trend inference of numeric measurements."""
+
+import logging
+
+from fastapi import APIRouter, BackgroundTasks, Response, status
+
+from parma_analytics.analytics.inference.trend_engine import run_trend_inference
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get(
+    "/trends",
+    status_code=status.HTTP_200_OK,
+    description="Endpoint to refit the trends of all numeric measurements.",
+)
+async def trends(background_tasks: BackgroundTasks) -> Response:
+    """Trigger a background task refitting the trends of all numeric measurements.
+
+    New values update the trends incrementally, a full refit is only needed to
+    backfill the trends of existing values.
+
+    Args:
+        background_tasks: The background tasks to schedule set up by fastapi.
+
+    Returns:
+        HTTP acknowledgement.
+    """
+    logger.info("/trends endpoint called. Trend inference will start in background.")
+    background_tasks.add_task(_run_trend_inference)
+    return Response(status_code=status.HTTP_200_OK)
+
+
+# ------------------------------------------------------------------------------------ #
+#                                       Internal                                       #
+# ------------------------------------------------------------------------------------ #
+
+
+def _run_trend_inference() -> None:
+    """Wrapper function to refit the trends logging errors of the background task."""
+    try:
+        run_trend_inference()
+    except Exception as e:
+        logger.error(f"Error running trend inference: {e}")
@@ -0,0 +1,56 @@
+"""FastAPI routes serving measurement series for the charts of the frontend."""
+
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Query
+from starlette import status
+
+from parma_analytics.analytics.visualization.series_service import (
+    DEFAULT_MAX_POINTS,
+    get_downsampled_series,
+)
+from parma_analytics.api.models.visualization import ApiVisualizationSeriesOut
+
+router = APIRouter()
+
+MAX_POINTS_LIMIT = 10_000
+
+
+@router.get(
+    "/visualization/series/{company_measurement_id}",
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Numeric series of a company measurement downsampled to a point budget."
+    ),
+)
+def read_series(
+    company_measurement_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    max_points: int = Query(DEFAULT_MAX_POINTS, ge=3, le=MAX_POINTS_LIMIT),
+    method: Literal["lttb", "minmax"] = "lttb",
+) -> ApiVisualizationSeriesOut:
+    """Read the downsampled series of a company measurement.
+
+    Args:
+        company_measurement_id: The id of the company measurement.
+        start: Only include values at or after this timestamp if given.
+        end: Only include values before this timestamp if given.
+        max_points: The maximum number of points to return.
+        method: The downsampling method, LTTB keeps the shape of the series while
+            min/max keeps the extremes of equally long time buckets.
+
+    Returns:
+        The downsampled series.
+    """
+    series = get_downsampled_series(
+        company_measurement_id, start, end, max_points, method
+    )
+    return ApiVisualizationSeriesOut(
+        company_measurement_id=series.company_measurement_id,
+        method=method,
+        total_points=series.total_points,
+        timestamps=series.timestamps,
+        values=series.values,
+    )
@@ -1,11 +1,18 @@
 """Business layer logic for company data source identifiers."""
 
+from datetime import datetime
+
 from parma_analytics.db.prod.company_data_source_identifiers_query import (
+    DataSourceIdentifiers,
+    ExpiringCompanyDataSource,
     IdentifierData,
     IdentifierUpdateData,
     create_company_data_source_identifier,
     delete_company_data_source_identifier,
     get_company_data_source_identifiers,
+    get_data_source_identifiers,
+    get_expiring_company_data_sources,
+    replace_discovered_identifiers,
     update_company_data_source_identifier,
 )
 from parma_analytics.db.prod.engine import get_session
@@ -27,6 +34,31 @@ def get_company_data_source_identifiers_bll(
         return get_company_data_source_identifiers(session, company_id, data_source_id)
 
 
+def get_data_source_identifiers_bll(data_source_id: int) -> DataSourceIdentifiers:
+    """Business Logic Layer for fetching the identifiers of a whole data source.
+
+    The result also lists the companies that are missing identifiers or have expired
+    ones, and keeps the expired identifiers as stale identifiers.
+
+    This function calls the ORM query function get_data_source_identifiers.
+    """
+    with get_session() as session:
+        return get_data_source_identifiers(session, data_source_id)
+
+
+def get_expiring_company_data_sources_bll(
+    expires_before: datetime,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+) -> list[ExpiringCompanyDataSource]:
+    """Business Logic Layer for fetching company data sources expiring soon.
+
+    This function calls the ORM query function get_expiring_company_data_sources.
+    """
+    with get_session() as session:
+        return get_expiring_company_data_sources(session, expires_before, limit, after)
+
+
 def create_company_data_source_identifier_bll(
     identifier_data: IdentifierData,
 ) -> CompanyDataSourceIdentifier:
@@ -38,6 +70,17 @@ def create_company_data_source_identifier_bll(
         return create_company_data_source_identifier(session, identifier_data)
 
 
+def replace_discovered_identifiers_bll(
+    company_data_source_ids: list[int], identifiers: list[IdentifierData]
+) -> None:
+    """Business Logic Layer for replacing automatically discovered identifiers.
+
+    This function calls the ORM query function replace_discovered_identifiers.
+    """
+    with get_session() as session:
+        replace_discovered_identifiers(session, company_data_source_ids, identifiers)
+
+
 def update_company_data_source_identifier_bll(
     identifier_id: int,
     update_data: IdentifierUpdateData,
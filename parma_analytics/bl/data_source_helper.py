@@ -1,9 +1,35 @@
 """Helper to adapt the URL schema."""
 import logging
 import os
+from dataclasses import dataclass
+from typing import cast
 
 import httpx
 
+from parma_analytics.db.prod.models.types import DataSource
+
+
+@dataclass(frozen=True)
+class DataSourceSnapshot:
+    """Copy of the fields of a data source needed outside of its session.
+
+    ORM instances are bound to their session, which is not thread-safe and expires
+    them on commit, so threads and event loops get a snapshot instead.
+    """
+
+    id: int
+    source_name: str
+    invocation_endpoint: str
+
+    @classmethod
+    def of(cls, data_source: DataSource) -> "DataSourceSnapshot":
+        """Copy the fields of a data source."""
+        return cls(
+            id=cast(int, data_source.id),
+            source_name=cast(str, data_source.source_name),
+            invocation_endpoint=cast(str, data_source.invocation_endpoint),
+        )
+
 
 def ensure_appropriate_scheme(url: str) -> str | None:
     """Adapt the URL scheme based on the deployment environment."""
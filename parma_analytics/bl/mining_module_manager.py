@@ -1,8 +1,12 @@
 """Manage the interaction with the mining modules."""
 
 import asyncio
+import json
 import logging
+import os
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from datetime import datetime
 from typing import Any, cast
@@ -10,31 +14,53 @@ from typing import Any, cast
 import httpx
 from sqlalchemy.orm import Session
 
-from parma_analytics.bl.company_bll import get_company_id_bll
 from parma_analytics.bl.company_data_source_bll import (
     get_all_by_data_source_id_bll,
 )
 from parma_analytics.bl.company_data_source_identifiers_bll import (
-    get_company_data_source_identifiers_bll,
+    get_data_source_identifiers_bll,
+)
+from parma_analytics.bl.data_source_helper import (
+    DataSourceSnapshot,
+    ensure_appropriate_scheme,
 )
-from parma_analytics.bl.data_source_helper import ensure_appropriate_scheme
 from parma_analytics.bl.scraping_model import ScrapingPayloadModel
-from parma_analytics.db.prod.engine import get_engine
+from parma_analytics.db.prod.engine import get_engine, get_session
 from parma_analytics.db.prod.models.company_data_source import CompanyDataSource
 from parma_analytics.db.prod.models.types import (
     DataSource,
     ScheduledTask,
 )
-from parma_analytics.sourcing.discovery.discovery_manager import (
-    call_discover_endpoint,
-    process_discovery_response,
-    rediscover_identifiers,
+from parma_analytics.db.prod.scheduled_task_company_query import (
+    create_company_retry_task,
+    fail_undispatched_companies,
+    finish_task_companies,
+    get_task_company_statuses,
+    record_task_companies,
+)
+from parma_analytics.db.prod.scheduled_task_shard_query import (
+    create_task_shards,
+    finish_task_shard,
+    get_finished_shard_summaries,
+    get_task_shard_status,
+)
+from parma_analytics.sourcing.discovery.discovery_coordinator import (
+    discover_identifiers,
+)
+from parma_analytics.utils.http_client import (
+    TRIGGER_VERIFY_TLS,
+    async_request,
+    close_async_client,
 )
-from parma_analytics.sourcing.discovery.discovery_model import DiscoveryQueryData
 from parma_analytics.utils.jwt_handler import JWTHandler
 
 logger = logging.getLogger(__name__)
 
+PREPARATION_WORKERS = int(os.getenv("MINING_PREPARATION_WORKERS", "8"))
+PAYLOAD_SHARD_SIZE = int(os.getenv("MINING_PAYLOAD_SHARD_SIZE", "500"))
+SHARD_CONCURRENCY = int(os.getenv("MINING_PAYLOAD_SHARD_CONCURRENCY", "4"))
+COMPANY_RETRIES = int(os.getenv("MINING_COMPANY_RETRIES", "3"))
+
 
 class MiningModuleManager:
     """Manage the interaction with the mining modules."""
@@ -58,16 +84,28 @@ class MiningModuleManager:
     # ------------------------------- Public functions ------------------------------- #
     @staticmethod
     def set_task_status_success_with_id(
-        task_id: int, result_summary: str | None
+        task_id: int,
+        result_summary: str | None,
+        shard_id: int | None = None,
+        company_errors: dict[int, tuple[str, str]] | None = None,
     ) -> None:
         """Set the status of the task with the given task_id to success.
 
+        If the task was sent in shards, only the given shard is finished. The task
+        succeeds when its last shard finished, with the results of all shards.
+        Companies that failed are crawled again by an on demand task, up to
+        ``COMPANY_RETRIES`` times. A repeated callback of a finished task or shard
+        is ignored.
+
         Args:
             task_id: The ID of the task.
             result_summary: A summary of the result, if any.
+            shard_id: The ID of the finished shard if the task was sent in shards.
+            company_errors: The error type and description by id of the companies
+                that failed.
 
         Raises:
-            Exception: If the task can not be found
+            Exception: If the task or shard can not be found
             Exception: If there's an error updating the task.
         """
         with MiningModuleManager._manage_session() as session:
@@ -82,11 +120,54 @@ class MiningModuleManager:
                 if not task:
                     raise Exception("Task not found!")
 
+                if task.status == "SUCCESS":
+                    session.commit()
+                    logger.info(f"Task {task_id} already completed")
+                    return
+                if shard_id is not None:
+                    shard_status = get_task_shard_status(session, task_id, shard_id)
+                    if shard_status is None:
+                        raise Exception("Shard not found!")
+                    if shard_status == "FINISHED":
+                        session.commit()
+                        logger.info(
+                            f"Shard {shard_id} of task {task_id} already completed"
+                        )
+                        return
+
+                finish_task_companies(session, task_id, company_errors or {}, shard_id)
+                if shard_id is not None:
+                    summaries = finish_task_shard(
+                        session, task_id, shard_id, result_summary
+                    )
+                    if summaries is None:
+                        session.commit()
+                        logger.info(f"Shard {shard_id} of task {task_id} completed")
+                        return
+                    result_summary = MiningModuleManager._merge_result_summaries(
+                        summaries
+                    )
+                else:
+                    # shards finished before the task was dispatched again unsharded
+                    summaries = get_finished_shard_summaries(session, task_id)
+                    if summaries:
+                        result_summary = MiningModuleManager._merge_result_summaries(
+                            [*summaries, result_summary]
+                        )
+
                 task.status = "SUCCESS"
                 task.ended_at = datetime.now()
                 task.result_summary = result_summary or ""
+                retry_task_id = create_company_retry_task(
+                    session, task, COMPANY_RETRIES
+                )
                 session.commit()
                 logger.info(f"Task {task.task_id} successfully completed")
+                if retry_task_id is not None:
+                    logger.info(
+                        f"Failed companies of task {task_id} are retried by task "
+                        f"{retry_task_id}"
+                    )
             except Exception as e:
                 session.rollback()
                 raise e
@@ -99,8 +180,14 @@ class MiningModuleManager:
         logger.info(f"Triggering mining modules for task_ids {task_ids}")
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
+        loop.set_default_executor(
+            ThreadPoolExecutor(
+                max_workers=PREPARATION_WORKERS, thread_name_prefix="payload"
+            )
+        )
 
         trigger_tasks = []
+        trigger_source_ids = []
 
         for task_id in task_ids:
             try:
@@ -121,10 +208,13 @@ class MiningModuleManager:
                     logger.error(f"Error scheduling task {task_id}")
                     continue
 
-                data_source = cast(DataSource, task.data_source)
+                # the task is expired by the commits of the next tasks and the session
+                # is not used by the threads preparing the payloads
+                data_source = DataSourceSnapshot.of(cast(DataSource, task.data_source))
 
                 trigger_task = loop.create_task(self._trigger(data_source, task_id))
                 trigger_tasks.append(trigger_task)
+                trigger_source_ids.append(data_source.id)
 
             except Exception as e:
                 logger.error(
@@ -133,10 +223,30 @@ class MiningModuleManager:
                 self.session.rollback()
                 continue
 
-        if len(trigger_tasks) > 0:
-            loop.run_until_complete(asyncio.gather(*trigger_tasks))
-
-        loop.close()
+        try:
+            if len(trigger_tasks) > 0:
+                try:
+                    results = loop.run_until_complete(
+                        asyncio.gather(*trigger_tasks, return_exceptions=True)
+                    )
+                finally:
+                    # the pooled connections are bound to the loop
+                    loop.run_until_complete(close_async_client())
+                    loop.run_until_complete(loop.shutdown_default_executor())
+                for source_id, result in zip(trigger_source_ids, results):
+                    if isinstance(result, BaseException):
+                        logger.error(
+                            f"Error triggering mining module for data source "
+                            f"{source_id}: {result}"
+                        )
+                timings = ", ".join(
+                    f"{source_id}: {result:.2f}s"
+                    for source_id, result in zip(trigger_source_ids, results)
+                    if isinstance(result, float)
+                )
+                logger.info(f"Payload preparation time per data source: {timings}")
+        finally:
+            loop.close()
 
     # ------------------------------ Internal functions ------------------------------ #
 
@@ -157,6 +267,15 @@ class MiningModuleManager:
         finally:
             session.close()
 
+    @staticmethod
+    def _merge_result_summaries(summaries: list[str | None]) -> str:
+        """Merge the errors by company of the result summaries of all shards."""
+        errors: dict[str, Any] = {}
+        for summary in summaries:
+            if summary:
+                errors.update(json.loads(summary))
+        return json.dumps(errors) if errors else ""
+
     def _schedule_task(self, task: ScheduledTask) -> ScheduledTask | None:
         """Schedule the given task before triggering module."""
         try:
@@ -173,79 +292,151 @@ class MiningModuleManager:
 
         return None
 
-    def _fetch_identifiers(
-        self, company_id: int, data_source: DataSource
-    ) -> dict[str, list[str]]:
-        """Fetch identifiers for a given company and data source."""
-        logger.debug(f"Fetching identifiers for company {company_id}.")
-
-        identifiers = get_company_data_source_identifiers_bll(
-            company_id, data_source.id
-        )
-        if identifiers is None:
-            logger.error(
-                f"Error fetching identifiers for company {company_id} "
-                f"and data source {data_source.id}. "
-                f"CompanyDataSource not found."
-            )
-            return {}
-
-        if len(identifiers) == 0:
-            logger.debug(f"No identifiers found for company {company_id}.")
-            rediscover_identifiers(data_source, company_id)
-            return self._fetch_identifiers(company_id, data_source)
-
-        result: dict[str, list[str]] = {}
-        for identifier in identifiers:
-            if identifier.validity and identifier.validity < datetime.now():
-                # rediscover all identifiers for the company if not valid anymore
-                rediscover_identifiers(data_source, company_id)
-                result = self._fetch_identifiers(company_id, data_source)
-                break
-            key = identifier.property
-            if key not in result:
-                result[key] = []
-            result[key].append(identifier.value)
-        return result
-
     def _create_payload(
-        self, task_id: int, companies: list[CompanyDataSource], data_source: DataSource
+        self,
+        task_id: int,
+        companies: list[CompanyDataSource],
+        data_source: DataSourceSnapshot,
     ) -> ScrapingPayloadModel:
         """Create payload for triggering the mining module."""
         if data_source.source_name == "affinity":
             return ScrapingPayloadModel(task_id=task_id, companies=None)
 
-        companies_dict = {}
-        for company in companies:
-            company_id = company.company_id
-            identifiers = self._fetch_identifiers(company_id, data_source)
+        # identifiers of all companies at once instead of two queries per company
+        loaded = get_data_source_identifiers_bll(data_source.id)
+        if loaded.expired:
+            # rediscovered in the background, see identifier_refresher
+            logger.warning(
+                f"Using expired identifiers of {len(loaded.expired)} companies "
+                f"for data source {data_source.id}."
+            )
+
+        # only companies without any identifiers have to be discovered now
+        to_discover = {
+            company.company_id: company.id
+            for company in companies
+            if company.company_id not in loaded.identifiers
+            and company.company_id not in loaded.stale
+        }
+        if to_discover:
+            logger.debug(
+                f"Discovering identifiers of {len(to_discover)} companies "
+                f"for data source {data_source.id}."
+            )
+            if discover_identifiers(data_source, to_discover):
+                loaded = get_data_source_identifiers_bll(data_source.id)
+
+        companies_dict = {
+            str(company.company_id): identifiers
+            for company in companies
+            if (
+                identifiers := loaded.identifiers.get(company.company_id)
+                or loaded.stale.get(company.company_id)
+            )
+        }
 
-            # Do discovery if no identifier is found
-            if not identifiers:
-                company_entity = get_company_id_bll(company_id)
-                if not company_entity:
-                    logger.error(f"Company not found with id: {company_id}")
-                    continue
+        payload = ScrapingPayloadModel(task_id=task_id, companies=companies_dict)
+        return payload
 
-                query_data = [
-                    DiscoveryQueryData(
-                        company_id=str(company_id), name=company_entity.name
-                    )
-                ]
-                process_discovery_response(
-                    call_discover_endpoint(data_source, query_data), company.id
+    def _shard_payload(self, payload: ScrapingPayloadModel) -> list[str]:
+        """Split the companies of a payload into JSON payloads of limited size.
+
+        A payload with at most ``PAYLOAD_SHARD_SIZE`` companies is sent as it is.
+        The companies and shards are recorded before they are sent, so that the task
+        completes only when every shard finished.
+        """
+        companies = payload.companies
+        if companies is None:
+            return [payload.model_dump_json()]
+        if len(companies) <= PAYLOAD_SHARD_SIZE:
+            self._record_dispatch(payload.task_id, [list(companies)], sharded=False)
+            return [payload.model_dump_json()]
+
+        company_ids = list(companies)
+        chunks = [
+            company_ids[start : start + PAYLOAD_SHARD_SIZE]
+            for start in range(0, len(company_ids), PAYLOAD_SHARD_SIZE)
+        ]
+        first_shard_id = self._record_dispatch(payload.task_id, chunks, sharded=True)
+        return [
+            ScrapingPayloadModel(
+                task_id=payload.task_id,
+                shard_id=first_shard_id + index,
+                companies={company_id: companies[company_id] for company_id in chunk},
+            ).model_dump_json()
+            for index, chunk in enumerate(chunks)
+        ]
+
+    @staticmethod
+    def _record_dispatch(task_id: int, chunks: list[list[str]], sharded: bool) -> int:
+        """Record the shards of a task and the companies of every shard.
+
+        Pending companies of the task that are not sent are failed.
+
+        Returns:
+            The id of the first shard.
+        """
+        with get_session() as session:
+            fail_undispatched_companies(
+                session,
+                task_id,
+                [int(company_id) for chunk in chunks for company_id in chunk],
+            )
+            first_shard_id = create_task_shards(
+                session, task_id, [len(chunk) for chunk in chunks] if sharded else []
+            )
+            for index, chunk in enumerate(chunks):
+                record_task_companies(
+                    session,
+                    task_id,
+                    [int(company_id) for company_id in chunk],
+                    first_shard_id + index if sharded else None,
                 )
-                # Get identifiers after they are updated
-                identifiers = self._fetch_identifiers(company_id, data_source)
+        return first_shard_id
 
-            if identifiers:
-                companies_dict[str(company_id)] = identifiers
+    def _prepare_payload(
+        self, data_source: DataSourceSnapshot, task_id: int
+    ) -> list[str]:
+        """Create the JSON payloads of a data source, blocking.
 
-        payload = ScrapingPayloadModel(task_id=task_id, companies=companies_dict)
-        return payload
+        A task that was already dispatched, e.g. a retry of failed companies, only
+        crawls its pending companies.
+        """
+        companies: list[CompanyDataSource] = get_all_by_data_source_id_bll(
+            data_source.id
+        )
+        with get_session() as session:
+            task_companies = get_task_company_statuses(session, task_id)
+        if task_companies:
+            companies = [
+                company
+                for company in companies
+                if task_companies.get(company.company_id) == "PENDING"
+            ]
+
+        logger.debug(
+            f"{len(companies)} companies found for data source {data_source.id}."
+        )
+
+        return self._shard_payload(
+            self._create_payload(task_id, companies, data_source)
+        )
+
+    async def _trigger(
+        self, data_source: DataSourceSnapshot, task_id: int
+    ) -> float | None:
+        """Trigger the given mining module with given task_id.
 
-    async def _trigger(self, data_source: DataSource, task_id: int) -> None:
-        """Trigger the given mining module with given task_id."""
+        The shards of the payload are sent with up to ``SHARD_CONCURRENCY``
+        concurrent requests.
+
+        A data source whose payload cannot be prepared is logged and does not stop
+        the triggers of the others.
+
+        Returns:
+            The time it took to prepare the payload in seconds, None if the data
+            source has no valid invocation endpoint or preparing its payload failed.
+        """
         invocation_endpoint = ensure_appropriate_scheme(data_source.invocation_endpoint)
         if not invocation_endpoint:
             logger.error(
@@ -253,47 +444,71 @@ class MiningModuleManager:
                 f"{data_source.invocation_endpoint} "
                 f"for data source {data_source.id}"
             )
-            return
+            return None
 
         trigger_endpoint = urllib.parse.urljoin(invocation_endpoint, "/companies")
 
         data_source_id: int = data_source.id
 
-        companies: list[CompanyDataSource] = get_all_by_data_source_id_bll(
-            data_source_id
+        # the blocking database and discovery calls run in the thread pool of the
+        # loop, so that the payloads of all data sources are prepared concurrently
+        start = time.perf_counter()
+        try:
+            json_payloads = await asyncio.get_running_loop().run_in_executor(
+                None, self._prepare_payload, data_source, task_id
+            )
+        except Exception as e:
+            logger.error(
+                f"Error preparing the payload of task {task_id} "
+                f"for data source {data_source_id}: {e}"
+            )
+            return None
+        preparation_seconds = time.perf_counter() - start
+        logger.info(
+            f"Prepared payload for data source {data_source_id} "
+            f"in {preparation_seconds:.2f}s."
         )
 
-        logger.debug(
-            f"{len(companies)} companies found for data source {data_source_id}."
-        )
+        semaphore = asyncio.Semaphore(SHARD_CONCURRENCY)
 
-        # Create payload
-        json_payload = self._create_payload(
-            task_id, companies, data_source
-        ).model_dump_json()
+        async def send(json_payload: str | None) -> None:
+            async with semaphore:
+                await self._send_payload(data_source, trigger_endpoint, json_payload)
 
-        logger.debug(f"Payload for data source {data_source.id}: {json_payload}")
+        await asyncio.gather(*(send(json_payload) for json_payload in json_payloads))
+        return preparation_seconds
 
+    async def _send_payload(
+        self,
+        data_source: DataSourceSnapshot,
+        trigger_endpoint: str,
+        json_payload: str | None,
+    ) -> None:
+        """Send a JSON payload to the trigger endpoint of a mining module."""
         try:
             logger.debug(f"Sending request to {trigger_endpoint}")
-            async with httpx.AsyncClient(verify=False) as client:
-                token: str = JWTHandler.create_jwt(data_source.id)
-                headers = {
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {token}",
-                }
-                if json_payload is None:
-                    logger.debug(
-                        f"Missing payload for datasource {data_source.source_name}"
-                    )
-                else:
-                    response = await client.post(
-                        trigger_endpoint,
-                        headers=headers,
-                        content=json_payload,
-                        timeout=None,
-                    )
-                    response.raise_for_status()
+            token: str = JWTHandler.create_jwt(data_source.id)
+            headers = {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {token}",
+            }
+            if json_payload is None:
+                logger.debug(
+                    f"Missing payload for datasource {data_source.source_name}"
+                )
+            else:
+                logger.debug(
+                    f"Payload for data source {data_source.id}: "
+                    f"{len(json_payload.encode())} bytes"
+                )
+                response = await async_request(
+                    "POST",
+                    trigger_endpoint,
+                    verify=TRIGGER_VERIFY_TLS,
+                    headers=headers,
+                    content=json_payload,
+                )
+                response.raise_for_status()
         except httpx.RequestError as exc:
             logger.error(
                 f"An error occurred while requesting {exc.request.url!r}. Err: {exc}"
@@ -8,12 +8,19 @@ from typing import Any
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
+from parma_analytics.analytics.inference.trend_engine import (
+    NUMERIC_MEASUREMENT_TYPES,
+    update_trend,
+)
+from parma_analytics.analytics.visualization.series_service import (
+    invalidate_series,
+)
 from parma_analytics.bl.generate_report import GenerateNewsInput, generate_news
 from parma_analytics.db.prod.company_source_measurement_query import (
     create_company_measurement_query,
     get_by_company_and_measurement_ids_query,
 )
-from parma_analytics.db.prod.engine import get_engine, get_session
+from parma_analytics.db.prod.engine import get_session
 from parma_analytics.db.prod.measurement_value_query import MeasurementValueCRUD
 from parma_analytics.db.prod.models.company_source_measurement import CompanyMeasurement
 from parma_analytics.db.prod.models.measurement_value_models import (
@@ -28,15 +35,16 @@ from parma_analytics.db.prod.models.measurement_value_models import (
     MeasurementTextValue,
 )
 from parma_analytics.db.prod.models.news import News
-from parma_analytics.db.prod.reporting import get_users_subscribed_to_company
-from parma_analytics.reporting.gmail.email_service import EmailService
 from parma_analytics.reporting.news_comparison_engine import (
     NewsComparisonEngineReturn,
     check_notification_rules,
     create_news,
     get_source_module_id,
 )
-from parma_analytics.reporting.slack.send_slack_messages import SlackService
+from parma_analytics.reporting.notification_dispatcher import (
+    DeliveryStats,
+    NotificationDispatcher,
+)
 from parma_analytics.sourcing.normalization.normalization_model import NormalizedData
 
 logger = logging.getLogger(__name__)
@@ -78,6 +86,7 @@ def register_values(normalized_measurement: NormalizedData) -> int | None:
             # need to check rules before creating a news
             # and sending a notification
             comparison_engine_result = check_notification_rules(
+                session=session,
                 source_measurement_id=source_measurement_id,
                 value=value,
                 timestamp=timestamp,
@@ -97,6 +106,15 @@ def register_values(normalized_measurement: NormalizedData) -> int | None:
                 company_measurement.company_measurement_id,
             )
 
+            if measurement_type in NUMERIC_MEASUREMENT_TYPES:
+                register_trend_value(
+                    session,
+                    company_measurement.company_measurement_id,
+                    timestamp,
+                    value,
+                )
+                invalidate_series(company_measurement.company_measurement_id)
+
             # TODO: call process_news_data asynchronously in a
             # robust & error tolerant way
 
@@ -115,6 +133,30 @@ def register_values(normalized_measurement: NormalizedData) -> int | None:
         return -1
 
 
+def register_trend_value(
+    session: Session, company_measurement_id: int, timestamp: datetime, value: Any
+) -> None:
+    """Adds a registered numeric value to the trend of its company measurement.
+
+    Failing to update the trend is logged and does not fail the registration.
+
+    Args:
+        session: The database session.
+        company_measurement_id: The ID of the company measurement.
+        timestamp: The timestamp of the value.
+        value: The registered value.
+    """
+    try:
+        update_trend(session, company_measurement_id, timestamp, value)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(
+            f"Error updating trend of company measurement {company_measurement_id}: "
+            f"{e}"
+        )
+
+
 # Determines and calls the create measurement for each measurement type
 def handle_value(
     session: Session,
@@ -215,7 +257,7 @@ async def process_news_data(
         )
 
 
-def send_notifications(company_id: int, text: str):
+def send_notifications(company_id: int, text: str) -> DeliveryStats:
     """Sends notifications to users subscribed to a company.
 
     Args:
@@ -223,13 +265,12 @@ def send_notifications(company_id: int, text: str):
         text (str): The content of the notification.
 
     Returns:
-        None
+        The delivery stats of the notification.
     """
-    # need to find users subscribed to the company
-    user_ids = get_users_subscribed_to_company(get_engine(), company_id)
-    for user in user_ids:
-        user_id = user[0]
-        slack_service = SlackService()
-        email_service = EmailService(user_id)
-        slack_service.send_notification(user_id=user_id, content=text)
-        email_service.send_notification_email(notification_message=text)
+    stats = NotificationDispatcher().dispatch(company_id, text)
+    if stats.failures:
+        logger.error(
+            f"Failed to deliver notification for company {company_id} to "
+            f"{stats.total_failed} destinations."
+        )
+    return stats
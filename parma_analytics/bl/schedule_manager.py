@@ -1,26 +1,24 @@
 """Scheduler for providing scheduling functionality interfacing with the database."""
 import logging
-from datetime import timedelta
-from operator import and_
+import os
+from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 import sqlalchemy as sa
-from sqlalchemy import func, or_
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from parma_analytics.bl.mining_module_manager import MiningModuleManager
-from parma_analytics.db.prod.models.types import (
-    ScheduledTask,
-)
+from parma_analytics.db.prod.queries.loader import read_query_file
 
 logger = logging.getLogger(__name__)
 
 QUERIES_DIR = Path(__file__).parent.parent / "db" / "prod" / "queries"
 
 SCHEDULING_RETRIES = 3
+SCHEDULING_BATCH_SIZE = int(os.getenv("SCHEDULING_BATCH_SIZE", "100"))
 
 
 class ScheduleManager:
@@ -51,7 +49,12 @@ class ScheduleManager:
         This function is multiprocessing safe and can be called as often as needed.
         """
         logger.info("Starting task scheduling...")
+        self.create_pending_tasks()
+        self.dispatch_due_tasks()
+        logger.info("Task scheduling completed.")
 
+    def create_pending_tasks(self) -> None:
+        """Create the scheduled tasks of all active data sources for the next day."""
         # Go through all active data sources and create new scheduled tasks if needed
         try:
             # idempotent creation of tasks for next 24 hours
@@ -62,6 +65,8 @@ class ScheduleManager:
         except Exception as e:
             logger.error(f"Error in updating data source schedules: {e}")
 
+    def dispatch_due_tasks(self) -> None:
+        """Claim the due tasks and trigger their mining modules."""
         # handle PENDING and PROCESSING states by checking for maximum expected run time
         try:
             self._update_overdue_tasks()
@@ -71,7 +76,28 @@ class ScheduleManager:
             logger.error(f"Error in updating overdue tasks: {e}")
             logger.error(f"Error in processing data sources: {e}")
 
-        logger.info("Task scheduling completed.")
+    def upcoming_due_times(self, until: datetime) -> list[datetime]:
+        """Get the points in time tasks become due until a point in time.
+
+        Pending tasks are due at their scheduled time, processing tasks when they
+        exceed their maximum run time.
+
+        Args:
+            until: The end of the time span.
+
+        Returns:
+            The due times, including the ones already passed.
+        """
+        try:
+            rows = self.session.execute(
+                read_query_file(QUERIES_DIR / "upcoming_scheduled_tasks.sql"),
+                {"until": until},
+            ).all()
+            self.session.commit()
+        except SQLAlchemyError:
+            self.session.rollback()
+            raise
+        return [due_at for (due_at,) in rows]
 
     def trigger_mining_module(self, task_ids_to_trigger: list[int]) -> None:
         """Dispatching function to trigger the mining module."""
@@ -81,69 +107,49 @@ class ScheduleManager:
     # ------------------------------ Internal functions ------------------------------ #
 
     def _update_overdue_tasks(self) -> None:
-        logger.info("Updating status of failed tasks...")
-        tasks: list[ScheduledTask] = (
-            self.session.query(ScheduledTask)
-            .with_for_update()
-            .filter(
-                or_(
-                    ScheduledTask.status == "PENDING",
-                    and_(
-                        ScheduledTask.status == "PROCESSING",
-                        (
-                            # timeout exceeded
-                            ScheduledTask.started_at
-                            + ScheduledTask.max_run_seconds * timedelta(seconds=1)
-                            <= func.now()
-                        ),
-                    ),
-                    ScheduledTask.status == "PROCESSING",
-                ),
-                (ScheduledTask.scheduled_at <= func.now()),
-            )
-            .all()
-        )
+        """Claim due tasks batch by batch and trigger the mining modules.
 
-        up_for_scheduling: list[int] = []
-
-        logger.info(f"Found {len(tasks)} failed tasks.")
-
-        for task in tasks:
-            self.session.begin_nested()
-            try:
-                self.session.refresh(task)
-                logger.debug(f"-- Processing task {task.task_id}...")
-                if task.status == "PENDING":
-                    task.status = "PROCESSING"
-                    task.attempts += 1
-                    up_for_scheduling.append(task.task_id)
-                    logger.debug(
-                        f"Task {task.task_id} status set from PENDING to PROCESSING."
-                    )
-                elif task.status == "PROCESSING":
-                    # check if task has exceeded maximum expected run time
-                    if task.attempts < SCHEDULING_RETRIES:
-                        task.attempts += 1
-                        logger.debug(
-                            f"Task {task.task_id} moved from PROCESSING to PENDING."
-                        )
-                        up_for_scheduling.append(task.task_id)
-                        logger.debug(
-                            f"Task {task.task_id} is being rescheduled. "
-                            f"Attempt {task.attempts}."
-                        )
-
-                    else:
-                        task.status = "FAILED"
-                        logger.debug(
-                            f"Task {task.task_id} status set from PROCESSING to FAILED."
-                        )
-
-            except SQLAlchemyError as e:
-                logger.error(f"SQLAlchemyError in updating failed tasks: {e}")
-                self.session.rollback()
-
-        # To release the lock for all the rows that were locked in the previous query
-        self.session.commit()
-
-        self.trigger_mining_module(up_for_scheduling)
+        A batch is claimed with ``FOR UPDATE SKIP LOCKED`` and its status updated in
+        the same statement, so concurrent schedulers claim disjoint batches instead of
+        waiting for each other's row locks.
+        """
+        logger.info("Claiming due tasks...")
+        claimed_count = 0
+        while True:
+            task_ids, failed_ids = self._claim_tasks(SCHEDULING_BATCH_SIZE)
+            if task_ids:
+                claimed_count += len(task_ids)
+                self.trigger_mining_module(task_ids)
+            if failed_ids:
+                logger.debug(f"Tasks {failed_ids} exceeded their attempts and failed.")
+            if len(task_ids) + len(failed_ids) < SCHEDULING_BATCH_SIZE:
+                break
+        logger.info(f"Claimed {claimed_count} tasks.")
+
+    def _claim_tasks(self, batch_size: int) -> tuple[list[int], list[int]]:
+        """Claim a batch of due tasks.
+
+        PENDING tasks and PROCESSING tasks that exceeded their maximum run time are set
+        to PROCESSING with a new attempt, tasks out of attempts are set to FAILED.
+
+        Args:
+            batch_size: The maximum number of tasks to claim.
+
+        Returns:
+            The ids of the claimed tasks and of the failed tasks.
+        """
+        try:
+            rows = self.session.execute(
+                read_query_file(QUERIES_DIR / "claim_scheduled_tasks.sql"),
+                {"batch_size": batch_size, "max_attempts": SCHEDULING_RETRIES},
+            ).all()
+            # release the row locks before the mining modules are triggered
+            self.session.commit()
+        except SQLAlchemyError:
+            self.session.rollback()
+            raise
+
+        return (
+            [task_id for task_id, claimed in rows if claimed],
+            [task_id for task_id, claimed in rows if not claimed],
+        )
@@ -0,0 +1,192 @@
+"""Long-running scheduler, an alternative to calling ``/schedule`` periodically.
+
+Run it with ``python -m parma_analytics.bl.scheduler_daemon``. The daemon keeps a heap
+of the points in time tasks become due and sleeps until the earliest one, so tasks are
+dispatched when they are due instead of on the next call of ``/schedule``. Every
+``SCHEDULER_RECONCILE_SECONDS`` it creates the tasks of the next day and reloads the
+heap from the database, which also picks up tasks created by others, e.g. retries.
+
+Any number of daemons can run, only the one holding the Postgres advisory lock
+``SCHEDULER_ADVISORY_LOCK_KEY`` dispatches. The others check every reconcile interval
+whether they can take over. Tasks are claimed with ``FOR UPDATE SKIP LOCKED``, so the
+daemon can also run alongside the ``/schedule`` endpoint.
+"""
+
+import heapq
+import logging
+import os
+import signal
+import threading
+from datetime import datetime, timedelta
+from types import FrameType
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from parma_analytics.bl.schedule_manager import ScheduleManager
+from parma_analytics.db.prod.engine import get_engine
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_RECONCILE_SECONDS = float(os.getenv("SCHEDULER_RECONCILE_SECONDS", "300"))
+SCHEDULER_ADVISORY_LOCK_KEY = int(os.getenv("SCHEDULER_ADVISORY_LOCK_KEY", "7243115"))
+
+
+class SchedulerDaemon:
+    """Dispatch scheduled tasks when they are due while holding the leader lock."""
+
+    def __init__(
+        self,
+        engine: Engine,
+        reconcile_seconds: float | None = None,
+        lock_key: int | None = None,
+    ):
+        self.engine = engine
+        self.reconcile_interval = timedelta(
+            seconds=reconcile_seconds or SCHEDULER_RECONCILE_SECONDS
+        )
+        self.lock_key = SCHEDULER_ADVISORY_LOCK_KEY if lock_key is None else lock_key
+        self.due_times: list[datetime] = []
+        self.next_reconcile: datetime | None = None
+        self._lock_connection: Connection | None = None
+
+    # ------------------------------- Public functions ------------------------------- #
+
+    def run(self, stop: threading.Event) -> None:
+        """Schedule until the stop event is set.
+
+        Args:
+            stop: Set to stop the daemon, e.g. by a signal handler.
+        """
+        logger.info("Scheduler daemon started.")
+        try:
+            while not stop.is_set():
+                stop.wait(self.run_once(datetime.now()))
+        finally:
+            self._release_leadership()
+            logger.info("Scheduler daemon stopped.")
+
+    def run_once(self, now: datetime) -> float:
+        """Reconcile and dispatch the due tasks if this daemon is the leader.
+
+        Args:
+            now: The current point in time.
+
+        Returns:
+            The seconds to wait until the next run.
+        """
+        if not self._acquire_leadership():
+            self.next_reconcile = None
+            return self.reconcile_interval.total_seconds()
+
+        if self.next_reconcile is None or now >= self.next_reconcile:
+            self.next_reconcile = now + self.reconcile_interval
+            self._reconcile(now)
+
+        if self.due_times and self.due_times[0] <= now:
+            while self.due_times and self.due_times[0] <= now:
+                heapq.heappop(self.due_times)
+            self._dispatch(now)
+
+        wake_at = self.next_reconcile
+        if self.due_times:
+            wake_at = min(wake_at, self.due_times[0])
+        return max((wake_at - now).total_seconds(), 0.0)
+
+    # ------------------------------ Internal functions ------------------------------ #
+
+    def _acquire_leadership(self) -> bool:
+        """Hold the advisory lock on an own connection, returns whether it is held.
+
+        The lock is bound to the connection, so it is released by Postgres if the
+        daemon dies or loses its connection.
+        """
+        try:
+            if self._lock_connection is not None:
+                # the lock is held as long as the connection is alive
+                self._lock_connection.execute(sa.text("SELECT 1"))
+                self._lock_connection.commit()
+                return True
+
+            connection = self.engine.connect()
+            acquired = connection.execute(
+                sa.text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+            ).scalar()
+            connection.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Error checking the scheduler leadership: {e}")
+            self._release_leadership()
+            return False
+
+        if not acquired:
+            connection.close()
+            return False
+
+        logger.info("Scheduler daemon is the leader now.")
+        self._lock_connection = connection
+        return True
+
+    def _release_leadership(self) -> None:
+        connection, self._lock_connection = self._lock_connection, None
+        if connection is None:
+            return
+        try:
+            connection.execute(
+                sa.text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key}
+            )
+            connection.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Error releasing the scheduler lock: {e}")
+        finally:
+            connection.close()
+
+    def _reconcile(self, now: datetime) -> None:
+        """Create the tasks of the next day and reload the due times."""
+        with ScheduleManager(self.engine) as schedule_manager:
+            schedule_manager.create_pending_tasks()
+        self._load_due_times(now)
+
+    def _dispatch(self, now: datetime) -> None:
+        """Claim the due tasks, then reload the due times including their timeouts."""
+        with ScheduleManager(self.engine) as schedule_manager:
+            schedule_manager.dispatch_due_tasks()
+        # tasks still due, e.g. claimed by another scheduler meanwhile, are picked up
+        # on the next reconcile instead of being dispatched again right away
+        self._load_due_times(now, skip_passed=True)
+
+    def _load_due_times(self, now: datetime, skip_passed: bool = False) -> None:
+        try:
+            with ScheduleManager(self.engine) as schedule_manager:
+                due_times = schedule_manager.upcoming_due_times(
+                    now + self.reconcile_interval
+                )
+        except SQLAlchemyError as e:
+            logger.error(f"Error loading the due tasks: {e}")
+            return
+        # due times that already passed are dispatched on the next run
+        self.due_times = [
+            max(due_at, now)
+            for due_at in due_times
+            if not (skip_passed and due_at <= now)
+        ]
+        heapq.heapify(self.due_times)
+        logger.debug(f"{len(self.due_times)} tasks are due until {self.next_reconcile}")
+
+
+def main() -> None:
+    """Run the scheduler daemon until it receives SIGINT or SIGTERM."""
+    logging.basicConfig(level=logging.INFO)
+    stop = threading.Event()
+
+    def handle_signal(signum: int, _: FrameType | None) -> None:
+        logger.info(f"Received signal {signum}, stopping the scheduler daemon.")
+        stop.set()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    SchedulerDaemon(get_engine()).run(stop)
+
+
+if __name__ == "__main__":
+    main()
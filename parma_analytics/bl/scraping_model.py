@@ -3,7 +3,11 @@ from pydantic import BaseModel
 
 
 class ScrapingPayloadModel(BaseModel):
-    """Model for Scraping Payload."""
+    """Model for Scraping Payload.
+
+    The shard id is set if the companies of the task are split into several payloads.
+    """
 
     task_id: int
     companies: dict[str, dict[str, list[str]]] | None
+    shard_id: int | None = None
@@ -18,6 +18,9 @@ class NotificationRule:
     aggregation_method: str
     num_aggregation_entries: int
     notification_message: str
+    rule_type: str | None
+    ewma_alpha: float | None
+    min_observations: int | None
 
 
 def populate_notification_rules():
@@ -43,9 +46,14 @@ def populate_notification_rules():
                             "rule_name": rule["rule_name"],
                             "threshold": rule["threshold"],
                             "source_measurement_id": source_measurement.id,
-                            "aggregation_method": rule["aggregation_method"],
-                            "num_aggregation_entries": rule["num_aggregation_entries"],
-                            "notification_message": rule["notification_message"],
+                            "aggregation_method": rule.get("aggregation_method"),
+                            "num_aggregation_entries": rule.get(
+                                "num_aggregation_entries"
+                            ),
+                            "notification_message": rule.get("notification_message"),
+                            "rule_type": rule.get("rule_type"),
+                            "ewma_alpha": rule.get("ewma_alpha"),
+                            "min_observations": rule.get("min_observations"),
                         }
                         create_notification_rule(get_engine(), rules_param)
                         break
@@ -0,0 +1,54 @@
+"""Queries for the running statistics of the ANOMALY notification rules."""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from parma_analytics.db.prod.models.measurement_anomaly_state import (
+    MeasurementAnomalyState,
+)
+
+
+def get_anomaly_state(
+    session: Session, company_measurement_id: int
+) -> MeasurementAnomalyState | None:
+    """Get the running statistics of a company measurement and lock them.
+
+    Args:
+        session: The database session.
+        company_measurement_id: The id of the company measurement.
+
+    Returns:
+        The running statistics or None if no value has been evaluated yet.
+    """
+    return (
+        session.query(MeasurementAnomalyState)
+        .filter(
+            MeasurementAnomalyState.company_measurement_id == company_measurement_id
+        )
+        .with_for_update()
+        .first()
+    )
+
+
+def upsert_anomaly_state(
+    session: Session, company_measurement_id: int, state: dict
+) -> None:
+    """Insert or replace the running statistics of a company measurement.
+
+    The caller is responsible for committing the session.
+
+    Args:
+        session: The database session.
+        company_measurement_id: The id of the company measurement.
+        state: The count, mean, m2 and ewma_mean columns.
+    """
+    statement = insert(MeasurementAnomalyState).values(
+        company_measurement_id=company_measurement_id, **state
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[MeasurementAnomalyState.company_measurement_id],
+            set_={**state, "modified_at": sa.func.now()},
+        )
+    )
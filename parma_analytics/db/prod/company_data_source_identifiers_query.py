@@ -1,8 +1,9 @@
 """CompanyDataSourceIdentifier DB queries."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 
+import sqlalchemy as sa
 from sqlalchemy.orm.session import Session
 
 from parma_analytics.db.prod.models.company_data_source import CompanyDataSource
@@ -62,6 +63,197 @@ def get_company_data_source_identifiers(
         return identifiers
 
 
+@dataclass
+class DataSourceIdentifiers:
+    """Identifiers of all companies of a data source.
+
+    Companies that have no identifiers are listed as missing, companies with at
+    least one expired identifier as expired. Neither are included in the identifiers,
+    the identifiers of expired companies are kept as stale identifiers instead.
+    """
+
+    identifiers: dict[int, dict[str, list[str]]] = field(default_factory=dict)
+    missing: list[int] = field(default_factory=list)
+    expired: list[int] = field(default_factory=list)
+    stale: dict[int, dict[str, list[str]]] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ExpiringCompanyDataSource:
+    """A company data source whose discovered identifiers expire soon."""
+
+    data_source_id: int
+    company_id: int
+    company_data_source_id: int
+    validity: datetime
+
+
+def get_data_source_identifiers(
+    db_session: Session, data_source_id: int, now: datetime | None = None
+) -> DataSourceIdentifiers:
+    """Fetch the identifiers of all companies of a data source in one query.
+
+    Args:
+        db_session: The database session.
+        data_source_id: The id of the data source.
+        now: The point in time the validity is compared to, defaults to now.
+
+    Returns:
+        The identifiers by company id and property, the companies that are missing
+        identifiers or have expired ones, and the identifiers of the latter.
+    """
+    now = now or datetime.now()
+    query = (
+        sa.select(
+            CompanyDataSource.company_id,
+            CompanyDataSourceIdentifier.property,
+            CompanyDataSourceIdentifier.value,
+            CompanyDataSourceIdentifier.validity,
+        )
+        .select_from(CompanyDataSource)
+        .outerjoin(
+            CompanyDataSourceIdentifier,
+            CompanyDataSourceIdentifier.company_data_source_id == CompanyDataSource.id,
+        )
+        .where(CompanyDataSource.data_source_id == data_source_id)
+        .order_by(CompanyDataSource.company_id, CompanyDataSourceIdentifier.id)
+    )
+
+    result = DataSourceIdentifiers()
+    expired: set[int] = set()
+    with db_session as session:
+        for company_id, property_key, value, validity in session.execute(query):
+            if property_key is None:
+                result.missing.append(company_id)
+                continue
+            if validity is not None and validity < now:
+                expired.add(company_id)
+            properties = result.identifiers.setdefault(company_id, {})
+            properties.setdefault(property_key, []).append(value)
+
+    for company_id in sorted(expired):
+        result.stale[company_id] = result.identifiers.pop(company_id)
+        result.expired.append(company_id)
+    return result
+
+
+def get_expiring_company_data_sources(
+    db_session: Session,
+    expires_before: datetime,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+) -> list[ExpiringCompanyDataSource]:
+    """Fetch the company data sources whose discovered identifiers expire soon.
+
+    The company data sources are ordered by the earliest validity of their
+    automatically discovered identifiers, which is served by the index on the
+    validity. Pages are fetched with a keyset, so a company data source whose
+    rediscovery failed is not returned again by the following pages.
+
+    Args:
+        db_session: The database session.
+        expires_before: Only company data sources with an identifier expiring before
+            this point in time are returned.
+        limit: The maximum number of company data sources.
+        after: The validity and id of the last company data source of the previous
+            page.
+
+    Returns:
+        The company data sources with the earliest validity of their identifiers.
+    """
+    validity = sa.func.min(CompanyDataSourceIdentifier.validity)
+    query = (
+        sa.select(
+            CompanyDataSource.data_source_id,
+            CompanyDataSource.company_id,
+            CompanyDataSource.id,
+            validity,
+        )
+        .join(
+            CompanyDataSourceIdentifier,
+            CompanyDataSourceIdentifier.company_data_source_id == CompanyDataSource.id,
+        )
+        .where(
+            CompanyDataSourceIdentifier.validity < expires_before,
+            CompanyDataSourceIdentifier.identifier_type == "AUTOMATICALLY_DISCOVERED",
+        )
+        .group_by(
+            CompanyDataSource.data_source_id,
+            CompanyDataSource.company_id,
+            CompanyDataSource.id,
+        )
+        .order_by(validity, CompanyDataSource.id)
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.having(sa.tuple_(validity, CompanyDataSource.id) > after)
+
+    with db_session as session:
+        return [
+            ExpiringCompanyDataSource(
+                data_source_id=data_source_id,
+                company_id=company_id,
+                company_data_source_id=company_data_source_id,
+                validity=min_validity,
+            )
+            for data_source_id, company_id, company_data_source_id, min_validity in (
+                session.execute(query)
+            )
+        ]
+
+
+def replace_discovered_identifiers(
+    db_session: Session,
+    company_data_source_ids: list[int],
+    identifiers: list[IdentifierData],
+) -> None:
+    """Replace the automatically discovered identifiers of many companies.
+
+    The company data sources are locked in the order of their ids, so concurrent
+    replacements of the same companies run one after another and cannot deadlock.
+    The old identifiers are deleted and the new ones inserted with multi-row
+    statements in one transaction. Manually added identifiers are kept.
+
+    Args:
+        db_session: The database session.
+        company_data_source_ids: The company data sources whose identifiers are
+            replaced.
+        identifiers: The new identifiers of these company data sources.
+    """
+    with db_session as session:
+        if company_data_source_ids:
+            session.execute(
+                sa.select(CompanyDataSource.id)
+                .where(CompanyDataSource.id.in_(company_data_source_ids))
+                .order_by(CompanyDataSource.id)
+                .with_for_update()
+            )
+            session.execute(
+                sa.delete(CompanyDataSourceIdentifier).where(
+                    CompanyDataSourceIdentifier.company_data_source_id.in_(
+                        company_data_source_ids
+                    ),
+                    CompanyDataSourceIdentifier.identifier_type
+                    == "AUTOMATICALLY_DISCOVERED",
+                )
+            )
+        if identifiers:
+            session.execute(
+                sa.insert(CompanyDataSourceIdentifier),
+                [
+                    {
+                        "company_data_source_id": identifier.company_data_source_id,
+                        "identifier_type": identifier.identifier_type,
+                        "property": identifier.property,
+                        "value": identifier.value,
+                        "validity": identifier.validity,
+                    }
+                    for identifier in identifiers
+                ],
+            )
+        session.commit()
+
+
 def create_company_data_source_identifier(
     db_session: Session, identifier_data: IdentifierData
 ) -> CompanyDataSourceIdentifier:
@@ -1,6 +1,6 @@
 """Company DB queries."""
 
-
+import sqlalchemy as sa
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm.session import Session
 
@@ -89,3 +89,12 @@ def get_company_name(engine: Engine, company_id: int) -> str:
     with Session(engine) as session:
         company = session.query(Company).filter(Company.id == company_id).first()
         return company.name
+
+
+def get_company_names(engine: Engine, company_ids: list[int]) -> dict[int, str]:
+    """Get the names of companies by their id."""
+    with Session(engine) as session:
+        results = session.execute(
+            sa.select(Company.id, Company.name).where(Company.id.in_(company_ids))
+        )
+        return {company_id: name for company_id, name in results}
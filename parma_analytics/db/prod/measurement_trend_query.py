@@ -0,0 +1,107 @@
+"""Queries for numeric measurement series and their fitted trend models."""
+
+from datetime import datetime
+
+import polars as pl
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from parma_analytics.db.prod.models.measurement_trend import MeasurementTrend
+from parma_analytics.db.prod.models.measurement_value_models import (
+    MeasurementFloatValue,
+    MeasurementIntValue,
+)
+
+NUMERIC_VALUE_MODELS = (MeasurementIntValue, MeasurementFloatValue)
+
+# rows per upsert statement, keeps the number of bind parameters well below the limit
+UPSERT_BATCH_SIZE = 1000
+
+
+def fetch_numeric_series(
+    engine: Engine,
+    company_measurement_ids: list[int] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> pl.DataFrame:
+    """Fetch the int and float values of company measurements in columnar form.
+
+    Args:
+        engine: The database engine.
+        company_measurement_ids: The company measurements to fetch, all if None.
+        start: Only fetch values at or after this timestamp if given.
+        end: Only fetch values before this timestamp if given.
+
+    Returns:
+        A DataFrame with the columns company_measurement_id, timestamp and value
+        (as float) sorted by company measurement and timestamp.
+    """
+    selects = []
+    for model in NUMERIC_VALUE_MODELS:
+        select = sa.select(
+            model.company_measurement_id,
+            model.timestamp,
+            sa.cast(model.value, sa.Float).label("value"),
+        ).where(model.value.is_not(None), model.timestamp.is_not(None))
+        if company_measurement_ids is not None:
+            select = select.where(
+                model.company_measurement_id.in_(company_measurement_ids)
+            )
+        if start is not None:
+            select = select.where(model.timestamp >= start)
+        if end is not None:
+            select = select.where(model.timestamp < end)
+        selects.append(select)
+    series = sa.union_all(*selects).subquery()
+    query = sa.select(series).order_by(
+        series.c.company_measurement_id, series.c.timestamp
+    )
+    return pl.read_database(query, connection=engine)
+
+
+def get_trend_state(
+    session: Session, company_measurement_id: int
+) -> MeasurementTrend | None:
+    """Get the fitted trend of a company measurement and lock it for the update.
+
+    Args:
+        session: The database session.
+        company_measurement_id: The id of the company measurement.
+
+    Returns:
+        The fitted trend or None if the company measurement has not been fitted yet.
+    """
+    return (
+        session.query(MeasurementTrend)
+        .filter(MeasurementTrend.company_measurement_id == company_measurement_id)
+        .with_for_update()
+        .first()
+    )
+
+
+def upsert_trends(session: Session, trends: list[dict]) -> None:
+    """Insert or replace the fitted trends of company measurements.
+
+    The caller is responsible for committing the session.
+
+    Args:
+        session: The database session.
+        trends: The columns of the measurement_trend rows.
+    """
+    for start in range(0, len(trends), UPSERT_BATCH_SIZE):
+        statement = insert(MeasurementTrend).values(
+            trends[start : start + UPSERT_BATCH_SIZE]
+        )
+        updated_columns = {
+            column.name: statement.excluded[column.name]
+            for column in MeasurementTrend.__table__.columns
+            if column.name not in ("company_measurement_id", "created_at")
+        }
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[MeasurementTrend.company_measurement_id],
+                set_={**updated_columns, "modified_at": sa.func.now()},
+            )
+        )
@@ -2,9 +2,14 @@
 
 from typing import Any, TypeVar
 
+import sqlalchemy as sa
 from sqlalchemy.ext.declarative import DeclarativeMeta
 from sqlalchemy.orm import Session
 
+from parma_analytics.db.prod.models.measurement_value_models import (
+    MeasurementCommentValue,
+)
+
 # Define a TypeVar that is bound to DeclarativeMeta,
 # which is the base class for SQLAlchemy models
 ModelType = TypeVar("ModelType", bound=DeclarativeMeta)
@@ -28,6 +33,12 @@ class MeasurementValueCRUD:
         """Get a measurement value from the database."""
         return db.query(self.model).filter(self.model.id == id).first()
 
+    def get_measurement_values(self, db: Session, ids: list[int]) -> list:
+        """Get all measurement values with the given ids in a single query."""
+        if not ids:
+            return []
+        return db.query(self.model).filter(self.model.id.in_(ids)).all()
+
     def list_measurement_value(self, db: Session) -> list:
         """List all measurement values from the database."""
         return db.query(self.model).all()
@@ -56,3 +67,30 @@ class MeasurementValueCRUD:
             .order_by(self.model.id.desc())
             .first()
         )
+
+
+def update_sentiment_scores(db: Session, scores: dict[int, int]) -> int:
+    """Set the sentiment scores of many comment values with one bulk statement.
+
+    Issues a single ``UPDATE ... FROM (VALUES ...)`` instead of one update per row.
+    The caller is responsible for committing the session.
+
+    Args:
+        db: Database session.
+        scores: Mapping of comment value id to its sentiment score.
+
+    Returns:
+        The number of updated rows.
+    """
+    if not scores:
+        return 0
+
+    score_values = sa.values(
+        sa.column("id", sa.Integer), sa.column("score", sa.Integer), name="v"
+    ).data(list(scores.items()))
+    statement = (
+        sa.update(MeasurementCommentValue)
+        .where(MeasurementCommentValue.id == score_values.c.id)
+        .values(sentiment_score=score_values.c.score)
+    )
+    return db.execute(statement).rowcount
@@ -13,6 +13,9 @@ class CompanyDataSourceIdentifier(Base):
     """Model for the company_data_source_identifier table in the database."""
 
     __tablename__ = "company_data_source_identifier"
+    __table_args__ = (
+        sa.Index("company_data_source_identifier_validity_idx", "validity"),
+    )
 
     id = sa.Column(sa.Integer, primary_key=True, autoincrement=True)
     company_data_source_id = sa.Column(
@@ -0,0 +1,21 @@
+"""Database ORM model for measurement_anomaly_state table."""
+
+from sqlalchemy import Column, DateTime, Float, Integer, func
+
+from parma_analytics.db.prod.engine import Base
+
+
+class MeasurementAnomalyState(Base):
+    """Running statistics of a company measurement for ANOMALY notification rules."""
+
+    __tablename__ = "measurement_anomaly_state"
+
+    company_measurement_id = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False)
+    mean = Column(Float, nullable=False)
+    m2 = Column(Float, nullable=False)
+    ewma_mean = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+    modified_at = Column(
+        DateTime, nullable=False, default=func.now(), onupdate=func.now()
+    )
@@ -0,0 +1,35 @@
+"""Database ORM model for measurement_trend table."""
+
+from sqlalchemy import Column, DateTime, Float, Integer, func
+
+from parma_analytics.db.prod.engine import Base
+
+
+class MeasurementTrend(Base):
+    """Fitted trend models and forecast of a numeric company measurement.
+
+    Besides the derived metrics (slope, forecast, trend score) the table stores the
+    running state of the models so that new values can be added incrementally.
+    """
+
+    __tablename__ = "measurement_trend"
+
+    company_measurement_id = Column(Integer, primary_key=True)
+    origin = Column(DateTime, nullable=False)
+    count = Column(Integer, nullable=False)
+    sum_t = Column(Float, nullable=False)
+    sum_y = Column(Float, nullable=False)
+    sum_tt = Column(Float, nullable=False)
+    sum_ty = Column(Float, nullable=False)
+    last_timestamp = Column(DateTime, nullable=False)
+    last_value = Column(Float, nullable=False)
+    ewma = Column(Float, nullable=False)
+    level = Column(Float, nullable=False)
+    trend = Column(Float, nullable=False)
+    slope = Column(Float, nullable=False)
+    forecast = Column(Float, nullable=False)
+    trend_score = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+    modified_at = Column(
+        DateTime, nullable=False, default=func.now(), onupdate=func.now()
+    )
@@ -7,7 +7,12 @@ from parma_analytics.db.prod.engine import Base
 
 
 class NotificationRules(Base):
-    """Model for the notification_rules table in the database."""
+    """Model for the notification_rules table in the database.
+
+    Rules of the default THRESHOLD type (``rule_type`` None) compare the percentage
+    change of a value against ``threshold``. Rules of the ANOMALY type compare the
+    z-scores of a value and of its EWMA against ``threshold`` instead.
+    """
 
     __tablename__ = "notification_rules"
 
@@ -18,6 +23,9 @@ class NotificationRules(Base):
     aggregation_method = Column(String, nullable=True)
     num_aggregation_entries = Column(Integer, nullable=True)
     notification_message = Column(String, nullable=True)
+    rule_type = Column(String, nullable=True)
+    ewma_alpha = Column(Float, nullable=True)
+    min_observations = Column(Integer, nullable=True)
     created_at = Column(DateTime, nullable=False, default=func.now())
     modified_at = Column(
         DateTime, nullable=False, default=func.now(), onupdate=func.now()
@@ -0,0 +1,51 @@
+"""Database ORM models for report_job and report_job_user tables."""
+
+from typing import Literal
+
+from sqlalchemy import (
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+
+from parma_analytics.db.prod.engine import Base
+
+ReportJobStatus = Literal["RUNNING", "COMPLETED"]
+ReportUserStatus = Literal["SENT", "FAILED", "SKIPPED"]
+
+
+class ReportJob(Base):
+    """Weekly report run, one per report period."""
+
+    __tablename__ = "report_job"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    period_start = Column(Date, nullable=False, unique=True)
+    status = Column(String, nullable=False)
+    total_users = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, nullable=False, default=func.now())
+    finished_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+    modified_at = Column(
+        DateTime, nullable=False, default=func.now(), onupdate=func.now()
+    )
+
+
+class ReportJobUser(Base):
+    """Checkpoint of the report of a user within a weekly report run."""
+
+    __tablename__ = "report_job_user"
+
+    job_id = Column(Integer, ForeignKey("report_job.id"), primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    status = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=1)
+    error = Column(String, nullable=True)
+    # the emails and slack channels a FAILED report was not delivered to
+    failed_destinations = Column(JSONB, nullable=True)
+    finished_at = Column(DateTime, nullable=False, default=func.now())
@@ -0,0 +1,31 @@
+"""Database ORM model for scheduled_task_company table."""
+
+from typing import Literal
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
+
+from parma_analytics.db.prod.engine import Base
+
+TaskCompanyStatus = Literal["PENDING", "SUCCESS", "FAILED"]
+
+
+class ScheduledTaskCompany(Base):
+    """A company crawled by a scheduled task.
+
+    The companies are recorded when the task is dispatched. The attempts count the
+    tasks that crawled the company, a failed company is retried by an on demand task.
+    """
+
+    __tablename__ = "scheduled_task_company"
+
+    task_id = Column(Integer, ForeignKey("scheduled_task.task_id"), primary_key=True)
+    company_id = Column(Integer, ForeignKey("company.id"), primary_key=True)
+    shard_id = Column(Integer, nullable=True)
+    status = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=1)
+    error_type = Column(String, nullable=True)
+    error_description = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+    modified_at = Column(
+        DateTime, nullable=False, default=func.now(), onupdate=func.now()
+    )
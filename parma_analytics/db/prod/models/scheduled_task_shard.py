@@ -0,0 +1,26 @@
+"""Database ORM model for scheduled_task_shard table."""
+
+from typing import Literal
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
+
+from parma_analytics.db.prod.engine import Base
+
+ShardStatus = Literal["PENDING", "FINISHED"]
+
+
+class ScheduledTaskShard(Base):
+    """A part of the companies of a scheduled task sent in an own request.
+
+    Tasks whose payload fits into one request have no shards.
+    """
+
+    __tablename__ = "scheduled_task_shard"
+
+    task_id = Column(Integer, ForeignKey("scheduled_task.task_id"), primary_key=True)
+    shard_id = Column(Integer, primary_key=True)
+    company_count = Column(Integer, nullable=False)
+    status = Column(String, nullable=False)
+    result_summary = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+    finished_at = Column(DateTime, nullable=True)
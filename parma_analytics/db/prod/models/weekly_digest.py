@@ -0,0 +1,29 @@
+"""Database ORM model for weekly_digest table."""
+
+from sqlalchemy import Boolean, Column, Date, DateTime, Index, Integer, func
+from sqlalchemy.dialects.postgresql import JSONB
+
+from parma_analytics.db.prod.engine import Base
+
+
+class WeeklyDigest(Base):
+    """News of a company in an ISO week, maintained when news are created.
+
+    The messages are a JSON list of objects with the keys news_id, message and
+    source_measurement_id in the order the news were created. Only the first funding
+    round news of a week is kept.
+    """
+
+    __tablename__ = "weekly_digest"
+    __table_args__ = (Index("weekly_digest_period_start_idx", "period_start"),)
+
+    company_id = Column(Integer, primary_key=True)
+    iso_year = Column(Integer, primary_key=True)
+    iso_week = Column(Integer, primary_key=True)
+    period_start = Column(Date, nullable=False)
+    messages = Column(JSONB, nullable=False)
+    has_funding_round = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+    modified_at = Column(
+        DateTime, nullable=False, default=func.now(), onupdate=func.now()
+    )
@@ -35,9 +35,12 @@ def create_notification_rule(engine: Engine, rules_param):
             rule_name=rules_param["rule_name"],
             source_measurement_id=rules_param["source_measurement_id"],
             threshold=rules_param["threshold"],
-            aggregation_method=rules_param["aggregation_method"],
-            num_aggregation_entries=rules_param["num_aggregation_entries"],
-            notification_message=rules_param["notification_message"],
+            aggregation_method=rules_param.get("aggregation_method"),
+            num_aggregation_entries=rules_param.get("num_aggregation_entries"),
+            notification_message=rules_param.get("notification_message"),
+            rule_type=rules_param.get("rule_type"),
+            ewma_alpha=rules_param.get("ewma_alpha"),
+            min_observations=rules_param.get("min_observations"),
         )
         session.add(new_rule)
         session.commit()
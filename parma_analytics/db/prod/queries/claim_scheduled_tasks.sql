@@ -0,0 +1,62 @@
+-- -------------------------------------------------------------------------------------
+--              claim a batch of due tasks, skipping tasks locked by others
+-- -------------------------------------------------------------------------------------
+
+WITH due_tasks (task_id, status, attempts) AS (
+    SELECT
+        st.task_id,
+        st.status,
+        st.attempts
+    FROM scheduled_task AS st
+    WHERE
+        st.scheduled_at <= NOW()
+        AND (
+            st.status = 'PENDING'
+            OR (
+                -- maximum expected run time exceeded
+                st.status = 'PROCESSING'
+                AND (
+                    st.started_at IS NULL
+                    OR st.started_at + st.max_run_seconds * INTERVAL '1 second'
+                    <= NOW()
+                )
+            )
+        )
+    ORDER BY st.scheduled_at, st.task_id
+    LIMIT :batch_size
+    FOR UPDATE SKIP LOCKED
+),
+
+failed_tasks (task_id) AS (
+    UPDATE scheduled_task AS st
+    SET status = 'FAILED'
+    FROM due_tasks AS d
+    WHERE
+        st.task_id = d.task_id
+        AND d.status = 'PROCESSING'
+        AND COALESCE(d.attempts, 0) >= :max_attempts
+    RETURNING st.task_id
+),
+
+claimed_tasks (task_id) AS (
+    UPDATE scheduled_task AS st
+    SET
+        status = 'PROCESSING',
+        attempts = COALESCE(st.attempts, 0) + 1,
+        started_at = NOW()
+    FROM due_tasks AS d
+    WHERE
+        st.task_id = d.task_id
+        AND (d.status = 'PENDING' OR COALESCE(d.attempts, 0) < :max_attempts)
+    RETURNING st.task_id
+)
+
+SELECT
+    task_id,
+    TRUE AS claimed
+FROM claimed_tasks
+UNION ALL
+SELECT
+    task_id,
+    FALSE AS claimed
+FROM failed_tasks
@@ -0,0 +1,20 @@
+-- -------------------------------------------------------------------------------------
+--              points in time scheduled tasks become due until :until
+-- -------------------------------------------------------------------------------------
+
+SELECT due_at
+FROM (
+    SELECT
+        CASE
+            WHEN st.status = 'PENDING' THEN st.scheduled_at
+            -- maximum expected run time exceeded
+            ELSE GREATEST(
+                    st.scheduled_at,
+                    st.started_at + st.max_run_seconds * INTERVAL '1 second'
+                )
+        END AS due_at
+    FROM scheduled_task AS st
+    WHERE st.status IN ('PENDING', 'PROCESSING')
+) AS due_tasks
+WHERE due_at <= :until
+ORDER BY due_at
@@ -0,0 +1,219 @@
+"""Queries for the weekly report runs and their per-user checkpoints."""
+
+from datetime import date, datetime
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from parma_analytics.db.prod.models.report_job import (
+    ReportJob,
+    ReportJobStatus,
+    ReportJobUser,
+    ReportUserStatus,
+)
+
+# first key of the advisory locks of the report runs, the second one is the run id
+REPORT_JOB_LOCK_NAMESPACE = 7243116
+
+
+def try_lock_report_job(connection: Connection, job_id: int) -> bool:
+    """Try to take the advisory lock of a report run on a connection.
+
+    The lock is held until it is released or the connection is closed by Postgres,
+    so a run is executed by at most one process at a time.
+
+    Args:
+        connection: The connection holding the lock.
+        job_id: The id of the run.
+
+    Returns:
+        Whether the lock was taken.
+    """
+    acquired = connection.execute(
+        sa.text("SELECT pg_try_advisory_lock(:namespace, :job_id)"),
+        {"namespace": REPORT_JOB_LOCK_NAMESPACE, "job_id": job_id},
+    ).scalar()
+    connection.commit()
+    return bool(acquired)
+
+
+def unlock_report_job(connection: Connection, job_id: int) -> None:
+    """Release the advisory lock of a report run before the connection is pooled."""
+    connection.execute(
+        sa.text("SELECT pg_advisory_unlock(:namespace, :job_id)"),
+        {"namespace": REPORT_JOB_LOCK_NAMESPACE, "job_id": job_id},
+    )
+    connection.commit()
+
+
+def get_or_create_report_job(session: Session, period_start: date) -> ReportJob:
+    """Get the run of a report period, creating it if it does not exist yet.
+
+    Args:
+        session: The database session.
+        period_start: The first day of the report period.
+
+    Returns:
+        The run of the report period.
+    """
+    session.execute(
+        insert(ReportJob)
+        .values(period_start=period_start, status="RUNNING", total_users=0)
+        .on_conflict_do_nothing(index_elements=[ReportJob.period_start])
+    )
+    session.commit()
+    return session.query(ReportJob).filter(ReportJob.period_start == period_start).one()
+
+
+def get_report_job(session: Session, job_id: int | None = None) -> ReportJob | None:
+    """Get a report run by id or the latest one.
+
+    Args:
+        session: The database session.
+        job_id: The id of the run, the latest run if None.
+
+    Returns:
+        The run or None if it does not exist.
+    """
+    query = session.query(ReportJob)
+    if job_id is not None:
+        return query.filter(ReportJob.id == job_id).first()
+    return query.order_by(ReportJob.period_start.desc()).first()
+
+
+def update_report_job(  # noqa: PLR0913
+    session: Session,
+    job_id: int,
+    status: ReportJobStatus,
+    total_users: int | None = None,
+    finished: bool = False,
+    started: bool = False,
+) -> None:
+    """Update the status of a report run and commit.
+
+    Args:
+        session: The database session.
+        job_id: The id of the run.
+        status: The new status.
+        total_users: The number of users to send a report to, if known.
+        finished: Whether the run finished now.
+        started: Whether the run started now, e.g. when it is resumed.
+    """
+    values: dict = {"status": status, "modified_at": sa.func.now()}
+    if total_users is not None:
+        values["total_users"] = total_users
+    if started:
+        values["started_at"] = sa.func.now()
+    values["finished_at"] = sa.func.now() if finished else None
+    session.execute(sa.update(ReportJob).where(ReportJob.id == job_id).values(values))
+    session.commit()
+
+
+def get_finished_user_ids(session: Session, job_id: int) -> set[int]:
+    """Get the users whose report of a run was already sent or skipped."""
+    results = session.execute(
+        sa.select(ReportJobUser.user_id).where(
+            ReportJobUser.job_id == job_id,
+            ReportJobUser.status.in_(["SENT", "SKIPPED"]),
+        )
+    )
+    return {user_id for (user_id,) in results}
+
+
+def get_failed_destinations(session: Session, job_id: int) -> dict[int, dict | None]:
+    """Get the destinations the failed reports of a run were not delivered to.
+
+    Args:
+        session: The database session.
+        job_id: The id of the run.
+
+    Returns:
+        The failed emails and slack channels by user id, None for reports that
+        failed before they were delivered to any destination.
+    """
+    results = session.execute(
+        sa.select(ReportJobUser.user_id, ReportJobUser.failed_destinations).where(
+            ReportJobUser.job_id == job_id, ReportJobUser.status == "FAILED"
+        )
+    )
+    return {user_id: destinations for user_id, destinations in results}
+
+
+def record_report_user(  # noqa: PLR0913
+    session: Session,
+    job_id: int,
+    user_id: int,
+    status: ReportUserStatus,
+    error: str | None = None,
+    failed_destinations: dict | None = None,
+) -> None:
+    """Checkpoint the report of a user and commit.
+
+    Args:
+        session: The database session.
+        job_id: The id of the run.
+        user_id: The id of the user.
+        status: Whether the report was sent, failed or skipped without news.
+        error: The error if the report failed.
+        failed_destinations: The emails and slack channels the report was not
+            delivered to if it failed.
+    """
+    statement = insert(ReportJobUser).values(
+        job_id=job_id,
+        user_id=user_id,
+        status=status,
+        attempts=1,
+        error=error,
+        failed_destinations=failed_destinations,
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[ReportJobUser.job_id, ReportJobUser.user_id],
+            set_={
+                "status": status,
+                "error": error,
+                "failed_destinations": failed_destinations,
+                "attempts": ReportJobUser.attempts + 1,
+                "finished_at": sa.func.now(),
+            },
+        )
+    )
+    session.commit()
+
+
+def count_report_users(
+    session: Session, job_id: int, since: datetime | None = None
+) -> dict[str, int]:
+    """Count the checkpoints of a run by status.
+
+    Args:
+        session: The database session.
+        job_id: The id of the run.
+        since: Only count the checkpoints written since then, e.g. in the current
+            execution of a resumed run.
+
+    Returns:
+        The number of checkpoints by status.
+    """
+    query = sa.select(ReportJobUser.status, sa.func.count()).where(
+        ReportJobUser.job_id == job_id
+    )
+    if since is not None:
+        query = query.where(ReportJobUser.finished_at >= since)
+    results = session.execute(query.group_by(ReportJobUser.status))
+    return {status: count for status, count in results}
+
+
+def get_report_failures(
+    session: Session, job_id: int, limit: int = 100
+) -> list[tuple[int, str | None]]:
+    """Get the users whose report of a run failed with their errors."""
+    results = session.execute(
+        sa.select(ReportJobUser.user_id, ReportJobUser.error)
+        .where(ReportJobUser.job_id == job_id, ReportJobUser.status == "FAILED")
+        .order_by(ReportJobUser.user_id)
+        .limit(limit)
+    )
+    return [tuple(row) for row in results]
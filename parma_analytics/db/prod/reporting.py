@@ -1,11 +1,19 @@
 """Database queries for the reporting module."""
 
 
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
 import polars as pl
 import sqlalchemy as sa
 from sqlalchemy.engine import Engine
+from sqlalchemy.orm import aliased
 from sqlalchemy.orm.session import Session
 
+from parma_analytics.db.prod.models.company_source_measurement import (
+    CompanyMeasurement,
+)
 from parma_analytics.db.prod.models.company_subscription import CompanySubscription
 from parma_analytics.db.prod.models.measurement_value_models import (
     MeasurementCommentValue,
@@ -23,26 +31,7 @@ from parma_analytics.db.prod.models.notification_channel import NotificationChan
 from parma_analytics.db.prod.models.notification_subscription import (
     NotificationSubscription,
 )
-
-
-def fetch_channel_ids(engine: Engine, user_ids: list[int]) -> list[int]:
-    """Fetch channel ids for a given list of user ids.
-
-    Args:
-        engine: database engine.
-        user_ids: list of user ids.
-
-    Returns:
-        A list of channel ids.
-    """
-    with Session(engine) as session:
-        results = (
-            session.query(NotificationSubscription.channel_id)
-            .where(NotificationSubscription.user_id.in_(user_ids))
-            .limit(50000)
-            .all()
-        )
-        return [channel_id for (channel_id,) in results]
+from parma_analytics.db.prod.models.source_measurement import SourceMeasurement
 
 
 def fetch_company_ids_for_user(db: Session, user_id) -> list:
@@ -64,54 +53,80 @@ def get_users_subscribed_to_company(engine: Engine, company_id: int) -> list:
         )
 
 
-def fetch_notification_destinations(
-    engine: Engine, channel_ids: list[int], service_type: str
-) -> list[str]:
-    """Fetch notification destinations for a given list of channel ids.
+def fetch_user_destinations(
+    engine: Engine,
+    user_ids: list[int] | None = None,
+    company_id: int | None = None,
+) -> list[tuple[int, str, str, str | None]]:
+    """Fetch the notification channels of many users with one joined query.
 
     Args:
         engine: database engine.
-        channel_ids: list of channel ids.
-        service_type: type of the service.
+        user_ids: ids of the users.
+        company_id: id of a company, selects all users subscribed to it.
 
     Returns:
-        A list of notification destinations.
+        A list of (user id, channel type, destination, secret id) tuples.
     """
+    query = sa.select(
+        NotificationSubscription.user_id,
+        NotificationChannel.channel_type,
+        NotificationChannel.destination,
+        NotificationChannel.secret_id,
+    ).join(
+        NotificationChannel,
+        NotificationChannel.id == NotificationSubscription.channel_id,
+    )
+    if user_ids is not None:
+        query = query.where(NotificationSubscription.user_id.in_(user_ids))
+    if company_id is not None:
+        query = query.join(
+            CompanySubscription,
+            CompanySubscription.user_id == NotificationSubscription.user_id,
+        ).where(CompanySubscription.company_id == company_id)
+
     with Session(engine) as session:
-        results = (
-            session.query(NotificationChannel.destination)
-            .where(
-                NotificationChannel.id.in_(channel_ids),
-                NotificationChannel.channel_type == service_type.upper(),
-            )
-            .all()
-        )
-        return [destination for (destination,) in results]
+        return [tuple(row) for row in session.execute(query)]
 
 
-def fetch_slack_destinations(engine: Engine, channel_ids: list[int]):
-    """Fetch slack destinations for a given list of channel ids.
+def fetch_slack_secret_ids(engine: Engine) -> list[str]:
+    """Fetch the ids of the secrets of all Slack notification channels.
 
     Args:
         engine: database engine.
-        channel_ids: list of channel ids.
-        service_type: type of the service.
 
     Returns:
-        A list of slack destinations.
+        The distinct secret ids.
     """
     with Session(engine) as session:
-        results = (
-            session.query(
-                NotificationChannel.destination, NotificationChannel.secret_id
-            )
+        results = session.execute(
+            sa.select(NotificationChannel.secret_id)
             .where(
-                NotificationChannel.id.in_(channel_ids),
                 NotificationChannel.channel_type == "SLACK",
+                NotificationChannel.secret_id.is_not(None),
             )
-            .all()
+            .distinct()
         )
-        return results
+        return [secret_id for (secret_id,) in results]
+
+
+def fetch_all_subscriptions(
+    engine: Engine, user_ids: list[int] | None = None
+) -> list[tuple[int, int]]:
+    """Fetch the company subscriptions of all users, or of the given users.
+
+    Args:
+        engine: database engine.
+        user_ids: ids of the users, all users if None.
+
+    Returns:
+        A list of (user id, company id) tuples.
+    """
+    query = sa.select(CompanySubscription.user_id, CompanySubscription.company_id)
+    if user_ids is not None:
+        query = query.where(CompanySubscription.user_id.in_(user_ids))
+    with Session(engine) as session:
+        return [tuple(row) for row in session.execute(query)]
 
 
 __TableModels: dict[str, type[MeasurementValueModels]] = {
@@ -177,3 +192,91 @@ def fetch_recent_value(
             "value": most_recent_entry.value,
             "timestamp": most_recent_entry.timestamp,
         }
+
+
+_TypedValueModels: dict[str, type[MeasurementValueModels]] = {
+    "int": MeasurementIntValue,
+    "float": MeasurementFloatValue,
+    "text": MeasurementTextValue,
+    "paragraph": MeasurementParagraphValue,
+    "comment": MeasurementCommentValue,
+    "link": MeasurementLinkValue,
+    "image": MeasurementImageValue,
+    "date": MeasurementDateValue,
+    "nested": MeasurementNestedValue,
+}
+
+# the values of all types are selected as text and converted back afterwards
+_TextToValue: dict[str, Callable[[str], Any]] = {
+    "int": int,
+    "float": float,
+    "date": datetime.fromisoformat,
+}
+
+
+def fetch_latest_sibling_values(
+    engine: Engine, company_id: int, source_measurement_id: int
+) -> dict[str, Any]:
+    """Fetch the latest values of all measurements sharing a parent with a company.
+
+    Selects the latest value of every child of the parent of the source measurement
+    from the table of its type, with one ``UNION ALL`` query across all typed value
+    tables.
+
+    Args:
+        engine: database engine.
+        company_id: id of the company.
+        source_measurement_id: id of a child measurement of the parent.
+
+    Returns:
+        The latest values by measurement name in the order of the measurements.
+        Measurements without a value for the company are omitted.
+    """
+    measurement = aliased(SourceMeasurement)
+    parent_id = (
+        sa.select(measurement.parent_measurement_id)
+        .where(measurement.id == source_measurement_id)
+        .scalar_subquery()
+    )
+    latest_values = []
+    for measurement_type, model in _TypedValueModels.items():
+        latest_values.append(
+            sa.select(
+                SourceMeasurement.id.label("source_measurement_id"),
+                SourceMeasurement.measurement_name,
+                SourceMeasurement.type,
+                sa.cast(model.value, sa.String).label("value"),
+            )
+            .join(
+                CompanyMeasurement,
+                CompanyMeasurement.source_measurement_id == SourceMeasurement.id,
+            )
+            .join(
+                model,
+                model.company_measurement_id
+                == CompanyMeasurement.company_measurement_id,
+            )
+            .where(
+                SourceMeasurement.parent_measurement_id == parent_id,
+                sa.func.lower(SourceMeasurement.type) == measurement_type,
+                CompanyMeasurement.company_id == company_id,
+            )
+            .distinct(model.company_measurement_id)
+            .order_by(model.company_measurement_id, model.id.desc())
+            .subquery()
+        )
+    values = sa.union_all(
+        *(sa.select(latest_value) for latest_value in latest_values)
+    ).subquery()
+    query = sa.select(
+        values.c.measurement_name, values.c.type, values.c.value
+    ).order_by(values.c.source_measurement_id)
+
+    with Session(engine) as session:
+        result = {}
+        for measurement_name, measurement_type, value in session.execute(query):
+            to_value = _TextToValue.get(measurement_type.lower())
+            result[measurement_name] = (
+                to_value(value) if to_value and value is not None else value
+            )
+        return result
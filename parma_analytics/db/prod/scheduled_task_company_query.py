@@ -0,0 +1,199 @@
+"""Queries for the companies crawled by the scheduled tasks."""
+
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from parma_analytics.db.prod.models.scheduled_task_company import (
+    ScheduledTaskCompany,
+)
+from parma_analytics.db.prod.models.types import ScheduledTask
+
+
+def get_task_company_statuses(session: Session, task_id: int) -> dict[int, str]:
+    """Get the status of every company recorded for a task.
+
+    Args:
+        session: The database session.
+        task_id: The id of the task.
+
+    Returns:
+        The status by company id, empty if the task was not dispatched yet.
+    """
+    rows = session.execute(
+        sa.select(ScheduledTaskCompany.company_id, ScheduledTaskCompany.status).where(
+            ScheduledTaskCompany.task_id == task_id
+        )
+    )
+    return {company_id: status for company_id, status in rows}
+
+
+def record_task_companies(
+    session: Session,
+    task_id: int,
+    company_ids: list[int],
+    shard_id: int | None = None,
+) -> None:
+    """Record the companies sent by a task and commit.
+
+    Companies already recorded, e.g. by a retry, keep their attempts and are set to
+    PENDING in the given shard.
+
+    Args:
+        session: The database session.
+        task_id: The id of the task.
+        company_ids: The ids of the companies.
+        shard_id: The id of the shard the companies are sent in, if any.
+    """
+    if company_ids:
+        statement = insert(ScheduledTaskCompany).values(
+            [
+                {
+                    "task_id": task_id,
+                    "company_id": company_id,
+                    "shard_id": shard_id,
+                    "status": "PENDING",
+                }
+                for company_id in company_ids
+            ]
+        )
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[
+                    ScheduledTaskCompany.task_id,
+                    ScheduledTaskCompany.company_id,
+                ],
+                set_={
+                    "shard_id": statement.excluded.shard_id,
+                    "status": "PENDING",
+                    "modified_at": sa.func.now(),
+                },
+            )
+        )
+    session.commit()
+
+
+def fail_undispatched_companies(
+    session: Session, task_id: int, company_ids: list[int]
+) -> None:
+    """Fail the pending companies of a task that are not sent and commit.
+
+    A retry task records its companies before it is dispatched. Companies that are
+    left out of its payload, e.g. because they have no identifiers anymore, would
+    never be crawled and are failed instead, so they are retried later.
+
+    Args:
+        session: The database session.
+        task_id: The id of the task.
+        company_ids: The ids of the companies that are sent.
+    """
+    session.execute(
+        sa.update(ScheduledTaskCompany)
+        .where(
+            ScheduledTaskCompany.task_id == task_id,
+            ScheduledTaskCompany.status == "PENDING",
+            ScheduledTaskCompany.company_id.not_in(company_ids),
+        )
+        .values(
+            status="FAILED",
+            error_type="NOT_DISPATCHED",
+            error_description="The company was not sent to the mining module.",
+            modified_at=sa.func.now(),
+        )
+    )
+    session.commit()
+
+
+def finish_task_companies(
+    session: Session,
+    task_id: int,
+    errors: dict[int, tuple[str, str]],
+    shard_id: int | None = None,
+) -> None:
+    """Record the outcome of the companies of a task without committing.
+
+    Companies with an error failed, all other pending companies of the task or shard
+    succeeded.
+
+    Args:
+        session: The database session.
+        task_id: The id of the task.
+        errors: The error type and description by company id.
+        shard_id: The id of the finished shard if the task was sent in shards.
+    """
+    for company_id, (error_type, error_description) in errors.items():
+        session.execute(
+            sa.update(ScheduledTaskCompany)
+            .where(
+                ScheduledTaskCompany.task_id == task_id,
+                ScheduledTaskCompany.company_id == company_id,
+            )
+            .values(
+                status="FAILED",
+                error_type=error_type,
+                error_description=error_description,
+                modified_at=sa.func.now(),
+            )
+        )
+
+    succeeded = sa.update(ScheduledTaskCompany).where(
+        ScheduledTaskCompany.task_id == task_id,
+        ScheduledTaskCompany.status == "PENDING",
+    )
+    if shard_id is not None:
+        succeeded = succeeded.where(ScheduledTaskCompany.shard_id == shard_id)
+    session.execute(succeeded.values(status="SUCCESS", modified_at=sa.func.now()))
+
+
+def create_company_retry_task(
+    session: Session, task: ScheduledTask, max_attempts: int
+) -> int | None:
+    """Create an on demand task crawling the failed companies of a task again.
+
+    Only companies with less than the maximum attempts are retried. Does not commit.
+
+    Args:
+        session: The database session.
+        task: The finished task.
+        max_attempts: The maximum number of tasks crawling a company.
+
+    Returns:
+        The id of the retry task, None if no company is retried.
+    """
+    failed = session.execute(
+        sa.select(ScheduledTaskCompany.company_id, ScheduledTaskCompany.attempts).where(
+            ScheduledTaskCompany.task_id == task.task_id,
+            ScheduledTaskCompany.status == "FAILED",
+            ScheduledTaskCompany.attempts < max_attempts,
+        )
+    ).all()
+    if not failed:
+        return None
+
+    retry_task_id = session.execute(
+        sa.insert(ScheduledTask)
+        .values(
+            data_source_id=task.data_source_id,
+            schedule_type="ON_DEMAND",
+            scheduled_at=datetime.now(),
+            max_run_seconds=task.max_run_seconds,
+            status="PENDING",
+            attempts=0,
+        )
+        .returning(ScheduledTask.task_id)
+    ).scalar_one()
+    session.execute(
+        sa.insert(ScheduledTaskCompany),
+        [
+            {
+                "task_id": retry_task_id,
+                "company_id": company_id,
+                "status": "PENDING",
+                "attempts": attempts + 1,
+            }
+            for company_id, attempts in failed
+        ],
+    )
+    return retry_task_id
@@ -0,0 +1,137 @@
+"""Queries for the shards of the scheduled tasks."""
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from parma_analytics.db.prod.models.scheduled_task_shard import ScheduledTaskShard
+
+
+def create_task_shards(
+    session: Session, task_id: int, company_counts: list[int]
+) -> int:
+    """Replace the unfinished shards of a task and commit.
+
+    Unfinished shards of a previous dispatch of the task, e.g. before it timed out,
+    are removed. Finished shards are kept with their result summaries and the new
+    shards are numbered after them.
+
+    Args:
+        session: The database session.
+        task_id: The id of the task.
+        company_counts: The number of companies of every shard, in shard order.
+
+    Returns:
+        The id of the first new shard.
+    """
+    session.execute(
+        sa.delete(ScheduledTaskShard).where(
+            ScheduledTaskShard.task_id == task_id,
+            ScheduledTaskShard.status != "FINISHED",
+        )
+    )
+    first_shard_id: int = session.execute(
+        sa.select(
+            sa.func.coalesce(sa.func.max(ScheduledTaskShard.shard_id) + 1, 0)
+        ).where(ScheduledTaskShard.task_id == task_id)
+    ).scalar_one()
+    if company_counts:
+        session.execute(
+            sa.insert(ScheduledTaskShard),
+            [
+                {
+                    "task_id": task_id,
+                    "shard_id": first_shard_id + index,
+                    "company_count": company_count,
+                    "status": "PENDING",
+                }
+                for index, company_count in enumerate(company_counts)
+            ],
+        )
+    session.commit()
+    return first_shard_id
+
+
+def get_task_shard_status(session: Session, task_id: int, shard_id: int) -> str | None:
+    """Get the status of a shard of a task.
+
+    Args:
+        session: The database session.
+        task_id: The id of the task.
+        shard_id: The id of the shard.
+
+    Returns:
+        The status of the shard or None if the shard can not be found.
+    """
+    return session.execute(
+        sa.select(ScheduledTaskShard.status).where(
+            ScheduledTaskShard.task_id == task_id,
+            ScheduledTaskShard.shard_id == shard_id,
+        )
+    ).scalar_one_or_none()
+
+
+def finish_task_shard(
+    session: Session, task_id: int, shard_id: int, result_summary: str | None
+) -> list[str | None] | None:
+    """Mark a shard of a task as finished without committing.
+
+    The caller must hold the lock of the task, so that exactly one of concurrently
+    finishing shards sees all shards finished.
+
+    Args:
+        session: The database session.
+        task_id: The id of the task.
+        shard_id: The id of the shard.
+        result_summary: A summary of the result of the shard, if any.
+
+    Returns:
+        The result summaries of all shards if all shards have finished, else None.
+
+    Raises:
+        Exception: If the shard can not be found.
+    """
+    result = session.execute(
+        sa.update(ScheduledTaskShard)
+        .where(
+            ScheduledTaskShard.task_id == task_id,
+            ScheduledTaskShard.shard_id == shard_id,
+        )
+        .values(
+            status="FINISHED",
+            result_summary=result_summary,
+            finished_at=sa.func.now(),
+        )
+    )
+    if result.rowcount == 0:
+        raise Exception("Shard not found!")
+
+    shards = session.execute(
+        sa.select(ScheduledTaskShard.status, ScheduledTaskShard.result_summary)
+        .where(ScheduledTaskShard.task_id == task_id)
+        .order_by(ScheduledTaskShard.shard_id)
+    ).all()
+    if any(status != "FINISHED" for status, _ in shards):
+        return None
+    return [summary for _, summary in shards]
+
+
+def get_finished_shard_summaries(session: Session, task_id: int) -> list[str | None]:
+    """Get the result summaries of the finished shards of a task.
+
+    Args:
+        session: The database session.
+        task_id: The id of the task.
+
+    Returns:
+        The result summaries in shard order, empty if the task has no finished shard.
+    """
+    return list(
+        session.execute(
+            sa.select(ScheduledTaskShard.result_summary)
+            .where(
+                ScheduledTaskShard.task_id == task_id,
+                ScheduledTaskShard.status == "FINISHED",
+            )
+            .order_by(ScheduledTaskShard.shard_id)
+        ).scalars()
+    )
@@ -0,0 +1,177 @@
+"""Queries for the weekly news digests of the companies."""
+
+from datetime import date, datetime, timedelta
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from parma_analytics.db.prod.models.company_subscription import CompanySubscription
+from parma_analytics.db.prod.models.news import News
+from parma_analytics.db.prod.models.weekly_digest import WeeklyDigest
+
+FUNDING_ROUND = "funding round"
+
+
+def is_funding_round(message: str) -> bool:
+    """Whether a news message reports a funding round."""
+    return FUNDING_ROUND in message.lower()
+
+
+def week_start(timestamp: datetime | date) -> date:
+    """Get the first day of the ISO week of a timestamp."""
+    day = timestamp.date() if isinstance(timestamp, datetime) else timestamp
+    return day - timedelta(days=day.weekday())
+
+
+def append_to_digest(session: Session, news: News) -> None:
+    """Append a news to the digest of its company and ISO week.
+
+    A funding round news is dropped if the digest already contains one. The caller
+    is responsible for committing the session.
+
+    Args:
+        session: The database session.
+        news: The news, flushed so that it has an id.
+    """
+    if not news.message:
+        return
+    funding_round = is_funding_round(news.message)
+    timestamp = news.timestamp or datetime.now()
+    iso_year, iso_week, _ = timestamp.isocalendar()
+    entry = {
+        "news_id": news.id,
+        "message": news.message,
+        "source_measurement_id": news.source_measurement_id,
+    }
+    statement = insert(WeeklyDigest).values(
+        company_id=news.company_id,
+        iso_year=iso_year,
+        iso_week=iso_week,
+        period_start=week_start(timestamp),
+        messages=[entry],
+        has_funding_round=funding_round,
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[
+                WeeklyDigest.company_id,
+                WeeklyDigest.iso_year,
+                WeeklyDigest.iso_week,
+            ],
+            set_={
+                "messages": sa.case(
+                    (
+                        sa.and_(
+                            statement.excluded.has_funding_round,
+                            WeeklyDigest.has_funding_round,
+                        ),
+                        WeeklyDigest.messages,
+                    ),
+                    else_=WeeklyDigest.messages.op("||")(statement.excluded.messages),
+                ),
+                "has_funding_round": sa.or_(
+                    WeeklyDigest.has_funding_round,
+                    statement.excluded.has_funding_round,
+                ),
+                "modified_at": sa.func.now(),
+            },
+        )
+    )
+
+
+def fetch_subscribed_digests(
+    engine: Engine, period_start: date
+) -> list[tuple[int, list[dict]]]:
+    """Fetch the digests of a week of all companies with subscribers.
+
+    Args:
+        engine: The database engine.
+        period_start: The first day of the ISO week.
+
+    Returns:
+        A list of (company id, messages) tuples.
+    """
+    subscribed = sa.select(CompanySubscription.company_id).distinct()
+    query = sa.select(WeeklyDigest.company_id, WeeklyDigest.messages).where(
+        WeeklyDigest.period_start == period_start,
+        WeeklyDigest.company_id.in_(subscribed),
+    )
+    with Session(engine) as session:
+        return [tuple(row) for row in session.execute(query)]
+
+
+def rebuild_weekly_digests(session: Session, period_start: date) -> int:
+    """Rebuild the digests of a week from the news, e.g. to backfill them.
+
+    The caller is responsible for committing the session.
+
+    Args:
+        session: The database session.
+        period_start: The first day of the ISO week.
+
+    Returns:
+        The number of news appended to the digests.
+    """
+    start = datetime.combine(period_start, datetime.min.time())
+    session.execute(
+        sa.delete(WeeklyDigest).where(WeeklyDigest.period_start == period_start)
+    )
+    news = (
+        session.query(News)
+        .filter(News.timestamp >= start, News.timestamp < start + timedelta(weeks=1))
+        .order_by(News.timestamp, News.id)
+        .all()
+    )
+    for item in news:
+        append_to_digest(session, item)
+    return len(news)
+
+
+def has_missing_digest_news(session: Session, period_start: date) -> bool:
+    """Whether news of a week are missing in the digests of the week.
+
+    This is the case for news created before the digests were maintained. Funding
+    round news are not considered, a digest keeps only the first one of a week.
+
+    Args:
+        session: The database session.
+        period_start: The first day of the ISO week.
+
+    Returns:
+        Whether a news of the week is not contained in the digest of its company.
+    """
+    start = datetime.combine(period_start, datetime.min.time())
+    in_digest = sa.select(1).where(
+        WeeklyDigest.company_id == News.company_id,
+        WeeklyDigest.period_start == period_start,
+        WeeklyDigest.messages.op("@>")(
+            sa.func.jsonb_build_array(sa.func.jsonb_build_object("news_id", News.id))
+        ),
+    )
+    missing = sa.select(News.id).where(
+        News.timestamp >= start,
+        News.timestamp < start + timedelta(weeks=1),
+        News.message != "",
+        sa.not_(sa.func.lower(News.message).contains(FUNDING_ROUND)),
+        ~in_digest.exists(),
+    )
+    return bool(session.execute(sa.select(missing.exists())).scalar())
+
+
+def backfill_weekly_digests(session: Session, period_start: date) -> int:
+    """Rebuild the digests of a week if news of the week are missing in them.
+
+    The caller is responsible for committing the session.
+
+    Args:
+        session: The database session.
+        period_start: The first day of the ISO week.
+
+    Returns:
+        The number of news appended to the rebuilt digests, 0 if they were complete.
+    """
+    if not has_missing_digest_news(session, period_start):
+        return 0
+    return rebuild_weekly_digests(session, period_start)
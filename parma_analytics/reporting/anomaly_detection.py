@@ -0,0 +1,96 @@
+"""Incremental anomaly detection for the ANOMALY notification rule type.
+
+Every company measurement keeps a small running state instead of its history:
+
+- the count, mean and sum of squared deviations (M2) of all values, updated with
+  Welford's algorithm, give the z-score of a new value against the long-run
+  distribution, e.g. a sudden spike,
+- an exponentially weighted mean follows recent values, the distance of the EWMA to
+  the long-run mean in units of its standard error detects slow drifts that never
+  exceed a percentage threshold in a single step.
+
+Evaluating and updating the state is O(1) per value.
+"""
+
+import math
+from dataclasses import dataclass
+
+DEFAULT_EWMA_ALPHA = 0.1
+DEFAULT_MIN_OBSERVATIONS = 10
+
+
+@dataclass
+class AnomalyState:
+    """Running statistics of the values of a company measurement."""
+
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    ewma_mean: float = 0.0
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation of all values."""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+@dataclass
+class AnomalyScore:
+    """Deviation of a new value from the running statistics."""
+
+    z_score: float
+    drift_z_score: float
+
+    def exceeds(self, threshold: float) -> bool:
+        """Whether the spike or the drift exceeds the threshold."""
+        return max(abs(self.z_score), abs(self.drift_z_score)) >= threshold
+
+
+def update_state(state: AnomalyState, value: float, alpha: float) -> AnomalyState:
+    """Add a value to the running statistics.
+
+    Args:
+        state: The statistics of the previous values.
+        value: The new value.
+        alpha: The smoothing factor of the exponentially weighted statistics.
+
+    Returns:
+        The updated statistics.
+    """
+    if state.count == 0:
+        return AnomalyState(count=1, mean=value, ewma_mean=value)
+
+    count = state.count + 1
+    delta = value - state.mean
+    mean = state.mean + delta / count
+    return AnomalyState(
+        count=count,
+        mean=mean,
+        m2=state.m2 + delta * (value - mean),
+        ewma_mean=state.ewma_mean + alpha * (value - state.ewma_mean),
+    )
+
+
+def score(state: AnomalyState, value: float, alpha: float) -> AnomalyScore:
+    """Score a new value against the statistics of the previous values.
+
+    Args:
+        state: The statistics of the previous values.
+        value: The new value.
+        alpha: The smoothing factor of the exponentially weighted statistics.
+
+    Returns:
+        The z-score of the value and the drift z-score of the EWMA including the value
+        against the long-run distribution. Both are zero without any variance yet.
+    """
+    std = state.std
+    if std == 0:
+        return AnomalyScore(z_score=0.0, drift_z_score=0.0)
+
+    ewma_mean = state.ewma_mean + alpha * (value - state.ewma_mean)
+    # standard error of an EWMA of independent values with the long-run deviation
+    ewma_std = std * math.sqrt(alpha / (2 - alpha))
+    return AnomalyScore(
+        z_score=(value - state.mean) / std,
+        drift_z_score=(ewma_mean - state.mean) / ewma_std,
+    )
@@ -0,0 +1,100 @@
+"""Set-based resolution of the notification destinations of users.
+
+The email addresses and Slack channels of any number of users, or of all users
+subscribed to a company, are resolved with one joined query. Resolved destinations
+are kept for ``NOTIFICATION_DESTINATION_CACHE_TTL_SECONDS``, so that sending a report
+and a notification to the same user shortly after each other queries only once.
+"""
+
+import os
+from collections.abc import Iterable
+from typing import TypedDict
+
+from parma_analytics.db.prod.engine import get_engine
+from parma_analytics.db.prod.reporting import fetch_user_destinations
+from parma_analytics.utils.ttl_cache import TTLCache
+
+EMAIL = "EMAIL"
+SLACK = "SLACK"
+
+DESTINATION_CACHE_TTL_SECONDS = float(
+    os.getenv("NOTIFICATION_DESTINATION_CACHE_TTL_SECONDS", "60")
+)
+DESTINATION_CACHE_MAX_SIZE = int(
+    os.getenv("NOTIFICATION_DESTINATION_CACHE_MAX_SIZE", "10000")
+)
+
+_cache: TTLCache = TTLCache(DESTINATION_CACHE_TTL_SECONDS, DESTINATION_CACHE_MAX_SIZE)
+
+
+class Destinations(TypedDict):
+    """Notification destinations of a user."""
+
+    email: list[str]
+    slack: list[tuple[str, str]]
+
+
+def _group(rows: Iterable[tuple[int, str, str, str | None]]) -> dict[int, Destinations]:
+    destinations: dict[int, Destinations] = {}
+    for user_id, channel_type, destination, secret_id in rows:
+        user = destinations.setdefault(user_id, Destinations(email=[], slack=[]))
+        if channel_type == EMAIL and destination not in user["email"]:
+            user["email"].append(destination)
+        elif channel_type == SLACK and secret_id:
+            if (destination, secret_id) not in user["slack"]:
+                user["slack"].append((destination, secret_id))
+    return destinations
+
+
+def resolve_destinations(
+    user_ids: Iterable[int] | None = None,
+    company_id: int | None = None,
+    use_cache: bool = True,
+) -> dict[int, Destinations]:
+    """Resolve the notification destinations of users.
+
+    Args:
+        user_ids: The ids of the users.
+        company_id: The id of a company, resolves all users subscribed to it instead.
+        use_cache: Whether cached destinations may be returned.
+
+    Returns:
+        The destinations by user id. Users without destinations are included with
+        empty lists if they were requested by id.
+
+    Raises:
+        ValueError: If neither user ids nor a company id are given.
+    """
+    if company_id is not None:
+        key = ("company", company_id)
+        destinations = _cache.get(key) if use_cache else None
+        if destinations is None:
+            destinations = _group(
+                fetch_user_destinations(get_engine(), company_id=company_id)
+            )
+            _cache.set(key, destinations)
+        return destinations
+
+    if user_ids is None:
+        raise ValueError("Either user ids or a company id are required.")
+
+    result: dict[int, Destinations] = {}
+    missing = []
+    for user_id in dict.fromkeys(user_ids):
+        cached = _cache.get(("user", user_id)) if use_cache else None
+        if cached is None:
+            missing.append(user_id)
+        else:
+            result[user_id] = cached
+
+    if missing:
+        fetched = _group(fetch_user_destinations(get_engine(), user_ids=missing))
+        for user_id in missing:
+            result[user_id] = fetched.get(user_id, Destinations(email=[], slack=[]))
+            _cache.set(("user", user_id), result[user_id])
+    return result
+
+
+def invalidate_destinations() -> None:
+    """Forget all cached destinations, e.g. after channels were changed."""
+    _cache.clear()
@@ -0,0 +1,180 @@
+"""Batched sending of templated emails with SendGrid personalizations.
+
+Recipients of the same template and dynamic data are grouped into one ``Mail`` with a
+personalization per recipient, so that every recipient gets an own email without
+seeing the others. A request carries at most ``MAX_PERSONALIZATIONS`` recipients,
+larger groups are split into batches which are sent concurrently. A failing batch
+is reported with its recipients and does not affect the other batches.
+"""
+
+import json
+import logging
+import os
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any
+
+from sendgrid import SendGridAPIClient
+from sendgrid.helpers.mail import Mail, To
+
+logger = logging.getLogger(__name__)
+
+# SendGrid limit of personalizations per request
+MAX_PERSONALIZATIONS = 1000
+
+BATCH_CONCURRENCY = int(os.getenv("SENDGRID_BATCH_CONCURRENCY", "4"))
+
+
+@dataclass
+class EmailMessage:
+    """A templated email to a single recipient."""
+
+    to_email: str
+    template_id: str | None
+    dynamic_template_data: dict[str, Any]
+
+
+@dataclass
+class EmailBatch:
+    """Recipients receiving the same templated email in one request."""
+
+    template_id: str | None
+    dynamic_template_data: dict[str, Any]
+    recipients: list[str]
+
+
+@dataclass
+class BatchFailure:
+    """A batch that could not be sent."""
+
+    batch: EmailBatch
+    error: str
+
+
+@dataclass
+class BatchResult:
+    """Outcome of sending batches of emails."""
+
+    sent_batches: int = 0
+    sent_recipients: int = 0
+    failures: list[BatchFailure] = field(default_factory=list)
+
+    @property
+    def failed_recipients(self) -> list[str]:
+        """The recipients of all failed batches."""
+        return [
+            recipient
+            for failure in self.failures
+            for recipient in failure.batch.recipients
+        ]
+
+
+def group_messages(
+    messages: Iterable[EmailMessage], batch_size: int = MAX_PERSONALIZATIONS
+) -> list[EmailBatch]:
+    """Group emails with the same template and dynamic data into batches.
+
+    Recipients are deduplicated case-insensitively within a group.
+
+    Args:
+        messages: The emails.
+        batch_size: The maximum number of recipients per batch.
+
+    Returns:
+        The batches in the order the groups first appeared.
+    """
+    groups: dict[tuple[str | None, str], tuple[dict[str, Any], dict[str, str]]] = {}
+    for message in messages:
+        key = (
+            message.template_id,
+            json.dumps(message.dynamic_template_data, sort_keys=True, default=str),
+        )
+        _, recipients = groups.setdefault(key, (message.dynamic_template_data, {}))
+        recipients.setdefault(message.to_email.strip().lower(), message.to_email)
+
+    batches = []
+    for (template_id, _), (data, recipients) in groups.items():
+        addresses = list(recipients.values())
+        for start in range(0, len(addresses), batch_size):
+            batches.append(
+                EmailBatch(template_id, data, addresses[start : start + batch_size])
+            )
+    return batches
+
+
+class BatchEmailSender:
+    """Sends templated emails in batches of personalizations."""
+
+    def __init__(
+        self,
+        sg: SendGridAPIClient,
+        from_email: str | None,
+        batch_size: int = MAX_PERSONALIZATIONS,
+        concurrency: int | None = None,
+    ):
+        """Create a sender.
+
+        Args:
+            sg: The SendGrid client.
+            from_email: The sender address.
+            batch_size: The maximum number of recipients per request.
+            concurrency: The maximum number of concurrent requests, defaults to
+                ``SENDGRID_BATCH_CONCURRENCY``.
+        """
+        self.sg = sg
+        self.from_email = from_email
+        self.batch_size = min(batch_size, MAX_PERSONALIZATIONS)
+        self.concurrency = concurrency or BATCH_CONCURRENCY
+
+    def build_mail(self, batch: EmailBatch) -> Mail:
+        """Build the request of a batch with a personalization per recipient."""
+        message = Mail(
+            from_email=self.from_email,
+            to_emails=[
+                To(recipient, dynamic_template_data=batch.dynamic_template_data)
+                for recipient in batch.recipients
+            ],
+            is_multiple=True,
+        )
+        message.template_id = batch.template_id
+        return message
+
+    def send(self, messages: Iterable[EmailMessage]) -> BatchResult:
+        """Send emails, grouped into as few requests as possible.
+
+        Args:
+            messages: The emails.
+
+        Returns:
+            The number of sent batches and recipients and the failed batches.
+        """
+        result = BatchResult()
+        batches = group_messages(messages, self.batch_size)
+        if not batches:
+            return result
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.concurrency, len(batches))
+        ) as executor:
+            futures = {
+                executor.submit(self.sg.send, self.build_mail(batch)): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    future.result()
+                    result.sent_batches += 1
+                    result.sent_recipients += len(batch.recipients)
+                except Exception as e:
+                    logger.error(
+                        f"Failed to send email batch with template "
+                        f"{batch.template_id} to {len(batch.recipients)} "
+                        f"recipients: {e}"
+                    )
+                    result.failures.append(BatchFailure(batch, str(e)))
+        logger.debug(
+            f"Sent {result.sent_recipients} emails in {result.sent_batches} batches."
+        )
+        return result
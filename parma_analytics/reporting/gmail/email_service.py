@@ -3,13 +3,11 @@ import logging
 import os
 
 from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import (
-    Mail,
-)
 
 from ..notification_service_manager import (
     NotificationServiceManager,
 )
+from .batch_sender import BatchEmailSender, BatchResult, EmailMessage
 
 logger = logging.getLogger(__name__)
 
@@ -17,17 +15,19 @@ logger = logging.getLogger(__name__)
 class EmailService:
     """A service that handles the sending of emails."""
 
-    def __init__(self, user_id: int):
+    def __init__(self, user_id: int | None = None):
         self.sg: SendGridAPIClient = SendGridAPIClient(os.environ["SENDGRID_API_KEY"])
         self.notification_template_id: str | None = os.environ[
             "SENDGRID_NOTIFICATION_TEMPLATE_ID"
         ]
         self.report_template_id: str | None = os.environ["SENDGRID_REPORT_TEMPLATE_ID"]
         self.from_email: str | None = os.environ["SENDGRID_FROM_EMAIL"]
-        self.user_id: int = user_id
+        self.user_id: int | None = user_id
 
-    def _get_user_emails(self, user_id: int) -> list[str]:
+    def _get_user_emails(self, user_id: int | None) -> list[str]:
         """Get all user emails for notification or report."""
+        if user_id is None:
+            raise ValueError("The email service was created without a user.")
         channel_manager = NotificationServiceManager(
             service_type="email", user_id=user_id
         )
@@ -38,17 +38,34 @@ class EmailService:
         to_emails: list[str],
         template_id: str | None,
         dynamic_template_data: dict,
-    ):
+    ) -> BatchResult:
         """Generic function to send emails using SendGrid."""
-        for email in to_emails:
-            message = Mail(from_email=self.from_email, to_emails=email)
-            message.template_id = template_id
-            message.dynamic_template_data = dynamic_template_data
-            try:
-                self.sg.send(message)
-                logging.debug(f"Email sent to {email}")
-            except Exception as e:
-                logging.error(f"Failed to send email to {email}: {e}")
+        return self.send_bulk_email(to_emails, template_id, dynamic_template_data)
+
+    def send_bulk_email(
+        self,
+        to_emails: list[str],
+        template_id: str | None,
+        dynamic_template_data: dict,
+        concurrency: int | None = None,
+    ) -> BatchResult:
+        """Send the same templated email to many addresses in batched requests.
+
+        Args:
+            to_emails: The recipient addresses.
+            template_id: The SendGrid template.
+            dynamic_template_data: The data rendered into the template.
+            concurrency: The maximum number of concurrent requests, defaults to
+                ``SENDGRID_BATCH_CONCURRENCY``.
+
+        Returns:
+            The number of sent batches and recipients and the failed batches.
+        """
+        sender = BatchEmailSender(self.sg, self.from_email, concurrency=concurrency)
+        return sender.send(
+            EmailMessage(email, template_id, dynamic_template_data)
+            for email in to_emails
+        )
 
     def send_notification_email(self, notification_message: str):
         """Sends a notification email."""
@@ -58,8 +75,11 @@ class EmailService:
         }
         self._send_email(emails, self.notification_template_id, dynamic_template_data)
 
-    def send_report_email(self, message: str):
-        """Sends a report email."""
-        emails = self._get_user_emails(user_id=self.user_id)
+    def send_report_email(
+        self, message: str, emails: list[str] | None = None
+    ) -> BatchResult:
+        """Sends a report email, to the given emails instead of all of the user."""
+        if emails is None:
+            emails = self._get_user_emails(user_id=self.user_id)
         dynamic_template_data = {"message": message}
-        self._send_email(emails, self.report_template_id, dynamic_template_data)
+        return self._send_email(emails, self.report_template_id, dynamic_template_data)
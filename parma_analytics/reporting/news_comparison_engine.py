@@ -6,6 +6,7 @@ data source IDs, and determining the appropriate measurement value table based o
 type of source measurement.
 """
 
+from dataclasses import asdict
 from datetime import datetime
 from typing import Any
 
@@ -17,6 +18,10 @@ from parma_analytics.db.prod.aggregation_queries import (
     apply_aggregation_method,
     get_most_recent_measurement_values,
 )
+from parma_analytics.db.prod.anomaly_state_query import (
+    get_anomaly_state,
+    upsert_anomaly_state,
+)
 from parma_analytics.db.prod.engine import get_engine
 from parma_analytics.db.prod.models.company_source_measurement import CompanyMeasurement
 from parma_analytics.db.prod.models.measurement_value_models import (
@@ -31,14 +36,25 @@ from parma_analytics.db.prod.models.measurement_value_models import (
     MeasurementTextValue,
 )
 from parma_analytics.db.prod.models.news import News
+from parma_analytics.db.prod.models.notification_rules import NotificationRules
 from parma_analytics.db.prod.notification_rules_query import (
     get_notification_rules_by_source_measurement_id,
 )
 from parma_analytics.db.prod.source_measurement_query import (
     get_source_measurement_query,
 )
+from parma_analytics.db.prod.weekly_digest_query import append_to_digest
+from parma_analytics.reporting.anomaly_detection import (
+    DEFAULT_EWMA_ALPHA,
+    DEFAULT_MIN_OBSERVATIONS,
+    AnomalyState,
+    score,
+    update_state,
+)
 from parma_analytics.reporting.notification_rule_helper import compare_to_threshold
 
+ANOMALY_RULE_TYPE = "ANOMALY"
+
 
 # NewsComparisonEngineReturn
 class NewsComparisonEngineReturn(BaseModel):
@@ -52,6 +68,8 @@ class NewsComparisonEngineReturn(BaseModel):
         previous_value (Optional[float]): The aggregated value.
         num_aggregation_entries (Optional[int]): # of entries used for aggregation.
         percentage_difference (Optional[float]): % difference between values.
+        z_score (Optional[float]): z-score of the value for ANOMALY rules.
+        drift_z_score (Optional[float]): z-score of the EWMA for ANOMALY rules.
     """
 
     threshold: float | None = None
@@ -61,9 +79,12 @@ class NewsComparisonEngineReturn(BaseModel):
     previous_value: float | None = None
     num_aggregation_entries: int | None = None
     percentage_difference: float | None = None
+    z_score: float | None = None
+    drift_z_score: float | None = None
 
 
-def check_notification_rules(
+def check_notification_rules(  # noqa: PLR0913
+    session: Session,
     source_measurement_id: int,
     value: Any,
     timestamp: datetime,
@@ -73,6 +94,8 @@ def check_notification_rules(
     """Check the notification rules for a given measurement value.
 
     Args:
+        session (Session): The session the value is registered in, ANOMALY rules
+            update their running statistics in its transaction.
         source_measurement_id (int): The ID of the source measurement.
         company_id (int): The ID of the company.
         value (Any): The measurement value.
@@ -97,16 +120,25 @@ def check_notification_rules(
             company_measurement_id=company_measurement_id,
         )
         # nothing to compare to if there is no previous value
-        if previous_value is not None:
-            if previous_value != value:
-                return NewsComparisonEngineReturn(
-                    threshold=None, is_rules_satisfied=True
-                )
-        return NewsComparisonEngineReturn(threshold=None, is_rules_satisfied=False)
+        return NewsComparisonEngineReturn(
+            threshold=None,
+            is_rules_satisfied=previous_value is not None and previous_value != value,
+        )
     else:
         notification_rule = get_notification_rules_by_source_measurement_id(
             get_engine(), source_measurement_id=source_measurement_id
         )
+        if (
+            notification_rule is not None
+            and notification_rule.rule_type == ANOMALY_RULE_TYPE
+        ):
+            return check_anomaly_rule(
+                session,
+                notification_rule,
+                value,
+                measurement_type,
+                company_measurement_id,
+            )
         if notification_rule is not None:
             threshold = (
                 notification_rule.threshold
@@ -189,9 +221,82 @@ def check_notification_rules(
     return NewsComparisonEngineReturn(threshold=None, is_rules_satisfied=False)
 
 
+def check_anomaly_rule(
+    session: Session,
+    notification_rule: NotificationRules,
+    value: Any,
+    measurement_type: str,
+    company_measurement_id: int,
+) -> NewsComparisonEngineReturn:
+    """Check an ANOMALY rule and add the value to the running statistics.
+
+    The value is scored against the persisted statistics of the previous values, so
+    no history has to be queried. The rule is satisfied if the z-score of the value
+    (spike) or of the EWMA (drift) reaches the threshold, once enough values have been
+    observed.
+
+    The statistics are locked and updated in the transaction of the session, the
+    caller commits them together with the registered value, so a value that is not
+    stored is not counted either.
+
+    Args:
+        session: The session the value is registered in.
+        notification_rule: The ANOMALY rule of the source measurement.
+        value: The measurement value.
+        measurement_type: The type of the measurement.
+        company_measurement_id: The ID of the company measurement.
+
+    Returns:
+        NewsComparisonEngineReturn: An object containing the threshold, the z-scores
+        and whether the rule is satisfied.
+    """
+    if measurement_type not in ["int", "float"] or value is None:
+        return NewsComparisonEngineReturn(threshold=None, is_rules_satisfied=False)
+
+    value = float(value)
+    alpha = notification_rule.ewma_alpha or DEFAULT_EWMA_ALPHA
+    min_observations = notification_rule.min_observations or DEFAULT_MIN_OBSERVATIONS
+
+    persisted = get_anomaly_state(session, company_measurement_id)
+    state = (
+        AnomalyState(
+            count=persisted.count,
+            mean=persisted.mean,
+            m2=persisted.m2,
+            ewma_mean=persisted.ewma_mean,
+        )
+        if persisted is not None
+        else AnomalyState()
+    )
+    anomaly = score(state, value, alpha)
+    upsert_anomaly_state(
+        session, company_measurement_id, asdict(update_state(state, value, alpha))
+    )
+
+    if state.count >= min_observations and anomaly.exceeds(notification_rule.threshold):
+        return NewsComparisonEngineReturn(
+            threshold=notification_rule.threshold,
+            is_rules_satisfied=True,
+            previous_value=state.mean,
+            percentage_difference=(
+                abs(value - state.mean) / abs(state.mean) * 100 if state.mean else None
+            ),
+            z_score=anomaly.z_score,
+            drift_z_score=anomaly.drift_z_score,
+        )
+    return NewsComparisonEngineReturn(
+        threshold=None,
+        is_rules_satisfied=False,
+        z_score=anomaly.z_score,
+        drift_z_score=anomaly.drift_z_score,
+    )
+
+
 def create_news(news: News) -> News:
     """Creates a new News object with the given parameters.
 
+    The news is appended to the weekly digest of its company in the same transaction.
+
     Args:
        news: The data for creating the news.
 
@@ -200,6 +305,8 @@ def create_news(news: News) -> News:
     """
     with Session(get_engine()) as session:
         session.add(news)
+        session.flush()
+        append_to_digest(session, news)
         session.commit()
         session.refresh(news)
         return news
@@ -0,0 +1,192 @@
+"""Concurrent fan-out of a notification to all subscribers of a company.
+
+The destinations of all subscribers are resolved with one query and deduplicated, so
+that a channel or address shared by several subscribers is notified once. Every
+provider gets its own bounded thread pool, which limits the concurrent requests per
+provider without one provider blocking the other. Emails are sent in batched
+requests with a personalization per address. A failing destination is recorded in
+the delivery stats and does not affect the others.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from parma_analytics.reporting.destination_resolver import (
+    EMAIL,
+    SLACK,
+    resolve_destinations,
+)
+from parma_analytics.reporting.gmail.email_service import EmailService
+from parma_analytics.reporting.slack.send_slack_messages import SlackService
+from parma_analytics.vendor.secret_manager import prefetch_secrets
+
+logger = logging.getLogger(__name__)
+
+# maximum number of concurrent requests per provider
+SLACK_CONCURRENCY = int(os.getenv("NOTIFICATION_SLACK_CONCURRENCY", "4"))
+EMAIL_CONCURRENCY = int(os.getenv("NOTIFICATION_EMAIL_CONCURRENCY", "8"))
+
+NOTIFICATION_TITLE = "Important Update!"
+
+
+@dataclass
+class DeliveryFailure:
+    """A destination the notification could not be delivered to."""
+
+    provider: str
+    destination: str
+    error: str
+
+
+@dataclass
+class DeliveryStats:
+    """Outcome of dispatching a notification."""
+
+    sent: dict[str, int] = field(default_factory=lambda: {EMAIL: 0, SLACK: 0})
+    failures: list[DeliveryFailure] = field(default_factory=list)
+
+    @property
+    def total_sent(self) -> int:
+        """Number of destinations the notification was delivered to."""
+        return sum(self.sent.values())
+
+    @property
+    def total_failed(self) -> int:
+        """Number of destinations the notification could not be delivered to."""
+        return len(self.failures)
+
+
+class NotificationDispatcher:
+    """Sends a notification to the email addresses and Slack channels of users."""
+
+    def __init__(
+        self,
+        email_service: EmailService | None = None,
+        slack_service: SlackService | None = None,
+        email_concurrency: int | None = None,
+        slack_concurrency: int | None = None,
+    ):
+        """Create a dispatcher.
+
+        Args:
+            email_service: The email service, created on first use if None.
+            slack_service: The Slack service, created on first use if None.
+            email_concurrency: Maximum number of concurrent email batch requests,
+                defaults to ``NOTIFICATION_EMAIL_CONCURRENCY``.
+            slack_concurrency: Maximum number of concurrent Slack messages, defaults
+                to ``NOTIFICATION_SLACK_CONCURRENCY``.
+        """
+        self._email_service = email_service
+        self._slack_service = slack_service
+        self.email_concurrency = email_concurrency or EMAIL_CONCURRENCY
+        self.slack_concurrency = slack_concurrency or SLACK_CONCURRENCY
+
+    @property
+    def email_service(self) -> EmailService:
+        """The email service shared by all deliveries."""
+        if self._email_service is None:
+            self._email_service = EmailService()
+        return self._email_service
+
+    @property
+    def slack_service(self) -> SlackService:
+        """The Slack service shared by all deliveries."""
+        if self._slack_service is None:
+            self._slack_service = SlackService()
+        return self._slack_service
+
+    def dispatch(self, company_id: int, text: str) -> DeliveryStats:
+        """Send a notification to all users subscribed to a company.
+
+        Args:
+            company_id: The ID of the company.
+            text: The content of the notification.
+
+        Returns:
+            The delivery stats.
+        """
+        emails: set[str] = set()
+        slack_channels: set[tuple[str, str]] = set()
+        for destinations in resolve_destinations(company_id=company_id).values():
+            emails.update(email.strip().lower() for email in destinations["email"])
+            slack_channels.update(destinations["slack"])
+
+        stats = self.send(text, sorted(emails), sorted(slack_channels))
+        logger.info(
+            f"Notification for company {company_id} delivered to {stats.total_sent} "
+            f"destinations, {stats.total_failed} failed."
+        )
+        return stats
+
+    def send(
+        self,
+        text: str,
+        emails: list[str],
+        slack_channels: list[tuple[str, str]],
+    ) -> DeliveryStats:
+        """Send a notification to the given destinations concurrently.
+
+        Args:
+            text: The content of the notification.
+            emails: The email addresses.
+            slack_channels: The Slack channel names with the ids of their token
+                secrets.
+
+        Returns:
+            The delivery stats.
+        """
+        stats = DeliveryStats()
+        if not emails and not slack_channels:
+            return stats
+
+        # read every Slack token once instead of once per channel and thread
+        prefetch_secrets(secret_id for _, secret_id in slack_channels)
+
+        with ThreadPoolExecutor(
+            max_workers=self.slack_concurrency, thread_name_prefix="slack"
+        ) as slack_pool:
+            futures = {
+                slack_pool.submit(
+                    self.slack_service.send_message_to_channel,
+                    channel,
+                    secret_id,
+                    text,
+                    NOTIFICATION_TITLE,
+                ): channel
+                for channel, secret_id in slack_channels
+            }
+            # the emails are sent in batched requests while the Slack pool works
+            if emails:
+                self._send_emails(emails, text, stats)
+            for future in as_completed(futures):
+                channel = futures[future]
+                try:
+                    future.result()
+                    stats.sent[SLACK] += 1
+                except Exception as e:
+                    logger.error(f"Failed to notify Slack channel {channel}: {e}")
+                    stats.failures.append(DeliveryFailure(SLACK, channel, str(e)))
+        return stats
+
+    def _send_emails(self, emails: list[str], text: str, stats: DeliveryStats):
+        try:
+            result = self.email_service.send_bulk_email(
+                emails,
+                self.email_service.notification_template_id,
+                {"notification": text},
+                concurrency=self.email_concurrency,
+            )
+        except Exception as e:
+            logger.error(f"Failed to send notification emails: {e}")
+            stats.failures.extend(
+                DeliveryFailure(EMAIL, email, str(e)) for email in emails
+            )
+            return
+        stats.sent[EMAIL] += result.sent_recipients
+        stats.failures.extend(
+            DeliveryFailure(EMAIL, recipient, failure.error)
+            for failure in result.failures
+            for recipient in failure.batch.recipients
+        )
@@ -3,12 +3,7 @@
 
 from typing import Literal
 
-from parma_analytics.db.prod.engine import get_engine
-from parma_analytics.db.prod.reporting import (
-    fetch_channel_ids,
-    fetch_notification_destinations,
-    fetch_slack_destinations,
-)
+from parma_analytics.reporting.destination_resolver import resolve_destinations
 
 ServiceType = Literal["email", "slack"]
 
@@ -22,17 +17,13 @@ class NotificationServiceManager:
 
     def get_notification_destinations(self) -> list[str]:
         """Get the notification destinations for the given company or bucket ID."""
-        user_ids = [self.user_id]
-        channel_ids = fetch_channel_ids(get_engine(), user_ids=user_ids)
-        return fetch_notification_destinations(
-            get_engine(), channel_ids, self.service_type
-        )
+        destinations = resolve_destinations(user_ids=[self.user_id])[self.user_id]
+        if self.service_type == "slack":
+            return [destination for destination, _ in destinations["slack"]]
+        return list(destinations["email"])
 
     def get_slack_key_and_destinations(self):
         """Get the slack key and destinations for the given company or bucket ID."""
-        user_ids = [self.user_id]
-        channel_ids = fetch_channel_ids(get_engine(), user_ids=user_ids)
-        destinations_and_secret_ids = fetch_slack_destinations(
-            get_engine(), channel_ids
+        return list(
+            resolve_destinations(user_ids=[self.user_id])[self.user_id]["slack"]
         )
-        return destinations_and_secret_ids
@@ -0,0 +1,132 @@
+"""Data of the weekly reports of all users.
+
+Instead of querying the subscriptions, news and company names per user and company,
+the loader fetches them with three set-based queries and groups them in memory. The
+news are read from the weekly digests, which are maintained when the news are created,
+so a report does not aggregate the news of the week again. The news of a company are
+summarized once and shared by all users subscribed to it.
+"""
+
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from sqlalchemy.engine import Engine
+
+from parma_analytics.db.prod.company_query import get_company_names
+from parma_analytics.db.prod.reporting import fetch_all_subscriptions
+from parma_analytics.db.prod.weekly_digest_query import fetch_subscribed_digests
+
+REPORT_PERIOD = timedelta(weeks=1)
+
+
+class NewsMessage(NamedTuple):
+    """A news message of a company."""
+
+    message: str
+    source_measurement_id: int
+
+
+@dataclass
+class ReportData:
+    """Subscriptions, news and company names of the weekly reports."""
+
+    company_ids_by_user: dict[int, list[int]] = field(default_factory=dict)
+    news_by_company_id: dict[int, list[NewsMessage]] = field(default_factory=dict)
+    company_names: dict[int, str] = field(default_factory=dict)
+
+    @property
+    def user_ids(self) -> list[int]:
+        """The users subscribed to at least one company with news."""
+        return [
+            user_id
+            for user_id, company_ids in self.company_ids_by_user.items()
+            if any(self._has_news(company_id) for company_id in company_ids)
+        ]
+
+    def report_company_ids(self, user_id: int) -> list[int]:
+        """The companies with news the user is subscribed to."""
+        return [
+            company_id
+            for company_id in self.company_ids_by_user.get(user_id, [])
+            if self._has_news(company_id)
+        ]
+
+    def summarize(
+        self, summarize_company: Callable[[int, list[NewsMessage]], list[str]]
+    ) -> dict[int, list[str]]:
+        """Summarize the news of every company once.
+
+        Args:
+            summarize_company: Turns the news of a company into report messages.
+
+        Returns:
+            The report messages by company id.
+        """
+        return {
+            company_id: summarize_company(company_id, news)
+            for company_id, news in self.news_by_company_id.items()
+            if self._has_news(company_id)
+        }
+
+    def _has_news(self, company_id: int) -> bool:
+        return bool(self.news_by_company_id.get(company_id)) and bool(
+            self.company_names.get(company_id)
+        )
+
+
+def report_period_start(today: date | None = None) -> date:
+    """Get the first day of the ISO week of a day, defaults to today."""
+    today = today or date.today()
+    return today - timedelta(days=today.weekday())
+
+
+def digest_period_start(period_start: date) -> date:
+    """Get the first day of the finished week reported in a report period.
+
+    The reports are sent at the start of a week and cover the week before.
+    """
+    return period_start - REPORT_PERIOD
+
+
+def load_report_data(
+    engine: Engine,
+    user_ids: list[int] | None = None,
+    period_start: date | None = None,
+) -> ReportData:
+    """Load the data of the weekly reports with a constant number of queries.
+
+    Args:
+        engine: The database engine.
+        user_ids: Only load the reports of these users if given.
+        period_start: The first day of the report period, defaults to this week.
+
+    Returns:
+        The report data.
+    """
+    digest_start = digest_period_start(period_start or report_period_start())
+
+    company_ids_by_user: defaultdict[int, list[int]] = defaultdict(list)
+    for user_id, company_id in fetch_all_subscriptions(engine, user_ids):
+        if company_id is not None:
+            company_ids_by_user[user_id].append(company_id)
+
+    news_by_company_id: defaultdict[int, list[NewsMessage]] = defaultdict(list)
+    for company_id, messages in fetch_subscribed_digests(engine, digest_start):
+        news_by_company_id[company_id] = [
+            NewsMessage(entry["message"], entry["source_measurement_id"])
+            for entry in messages
+        ]
+
+    company_names = (
+        get_company_names(engine, list(news_by_company_id))
+        if news_by_company_id
+        else {}
+    )
+    return ReportData(
+        company_ids_by_user=dict(company_ids_by_user),
+        news_by_company_id=dict(news_by_company_id),
+        company_names=company_names,
+    )
@@ -0,0 +1,252 @@
+"""Background job sending the weekly reports.
+
+There is one run per report period (the ISO week). The reports of the users are sent
+by a pool of ``REPORT_WORKERS`` threads and every user is checkpointed in the
+``report_job_user`` table when their report was sent, failed or skipped because
+there are no news. Starting the run of a period again, e.g. after a crash or to
+retry failures, skips the users whose report was already sent or skipped and sends
+failed reports only to the destinations they were not delivered to. A failing user
+does not stop the reports of the others.
+
+A run holds a Postgres advisory lock while it is executed, so starting it on another
+instance while it is running does nothing instead of sending reports twice.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from parma_analytics.db.prod.engine import get_engine, get_session
+from parma_analytics.db.prod.models.report_job import ReportUserStatus
+from parma_analytics.db.prod.report_job_query import (
+    count_report_users,
+    get_failed_destinations,
+    get_finished_user_ids,
+    get_or_create_report_job,
+    get_report_failures,
+    get_report_job,
+    record_report_user,
+    try_lock_report_job,
+    unlock_report_job,
+    update_report_job,
+)
+from parma_analytics.db.prod.weekly_digest_query import backfill_weekly_digests
+from parma_analytics.reporting.report_data_loader import (
+    digest_period_start,
+    report_period_start,
+)
+from parma_analytics.reporting.report_renderer import ReportFragment
+from parma_analytics.reporting.send_reports import (
+    ReportDeliveryError,
+    ReportDestinations,
+    prepare_reports,
+    render_user_report,
+    send_user_report,
+)
+
+logger = logging.getLogger(__name__)
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "8"))
+
+
+@dataclass
+class ReportJobProgress:
+    """Progress of a weekly report run."""
+
+    job_id: int
+    period_start: date
+    status: str
+    total_users: int
+    sent: int
+    failed: int
+    skipped: int
+    pending: int
+    started_at: datetime
+    finished_at: datetime | None
+    users_per_second: float
+    failures: list[tuple[int, str | None]]
+
+
+def create_report_job(period_start: date | None = None) -> int:
+    """Get or create the run of a report period.
+
+    Args:
+        period_start: The first day of the report period, defaults to this week.
+
+    Returns:
+        The id of the run.
+    """
+    with get_session() as session:
+        job = get_or_create_report_job(session, period_start or report_period_start())
+        return job.id
+
+
+def run_report_job(job_id: int) -> None:
+    """Send the reports of a run that were not sent yet.
+
+    Does nothing if the run is already executed, by this or another process.
+
+    Args:
+        job_id: The id of the run.
+    """
+    connection = get_engine().connect()
+    try:
+        if not try_lock_report_job(connection, job_id):
+            logger.info(f"Report job {job_id} is already running.")
+            return
+        try:
+            _run_report_job(job_id)
+        finally:
+            unlock_report_job(connection, job_id)
+    except SQLAlchemyError as e:
+        logger.error(f"Error locking report job {job_id}: {e}")
+    finally:
+        connection.close()
+
+
+def get_report_job_progress(job_id: int | None = None) -> ReportJobProgress | None:
+    """Get the progress of a report run.
+
+    Args:
+        job_id: The id of the run, the latest run if None.
+
+    Returns:
+        The progress or None if the run does not exist.
+    """
+    with get_session() as session:
+        job = get_report_job(session, job_id)
+        if job is None:
+            return None
+        counts = count_report_users(session, job.id)
+        # the rate only counts the reports sent by the current execution of the run
+        current_counts = count_report_users(session, job.id, since=job.started_at)
+        failures = get_report_failures(session, job.id)
+
+    sent = counts.get("SENT", 0)
+    failed = counts.get("FAILED", 0)
+    skipped = counts.get("SKIPPED", 0)
+    delivered = current_counts.get("SENT", 0) + current_counts.get("FAILED", 0)
+    elapsed = ((job.finished_at or datetime.now()) - job.started_at).total_seconds()
+    return ReportJobProgress(
+        job_id=job.id,
+        period_start=job.period_start,
+        status=job.status,
+        total_users=job.total_users,
+        sent=sent,
+        failed=failed,
+        skipped=skipped,
+        pending=max(job.total_users - sent - failed - skipped, 0),
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        users_per_second=delivered / elapsed if elapsed > 0 else 0.0,
+        failures=failures,
+    )
+
+
+def _run_report_job(job_id: int) -> None:
+    """Send the reports of a run while holding its lock."""
+    try:
+        with get_session() as session:
+            job = get_report_job(session, job_id)
+            if job is None:
+                logger.error(f"Report job {job_id} not found.")
+                return
+            period_start = job.period_start
+            # digests of news created before they were maintained are rebuilt
+            backfilled = backfill_weekly_digests(
+                session, digest_period_start(period_start)
+            )
+            session.commit()
+        if backfilled:
+            logger.info(f"Report job {job_id}: backfilled {backfilled} digest news.")
+        report_data, messages_by_company_id = prepare_reports(period_start)
+        user_ids = report_data.user_ids
+        with get_session() as session:
+            finished_user_ids = get_finished_user_ids(session, job_id)
+            failed_destinations = get_failed_destinations(session, job_id)
+            update_report_job(
+                session, job_id, "RUNNING", total_users=len(user_ids), started=True
+            )
+
+        pending = [user_id for user_id in user_ids if user_id not in finished_user_ids]
+        logger.info(
+            f"Report job {job_id}: sending {len(pending)} of {len(user_ids)} reports."
+        )
+        with ThreadPoolExecutor(
+            max_workers=REPORT_WORKERS, thread_name_prefix="report"
+        ) as executor:
+            for user_id in pending:
+                report = render_user_report(
+                    report_data, messages_by_company_id, user_id, period_start
+                )
+                if report is None:
+                    _checkpoint(job_id, user_id, "SKIPPED")
+                    continue
+                destinations = failed_destinations.get(user_id)
+                executor.submit(
+                    _send_and_checkpoint,
+                    job_id,
+                    user_id,
+                    report,
+                    ReportDestinations(**destinations) if destinations else None,
+                )
+
+        with get_session() as session:
+            update_report_job(session, job_id, "COMPLETED", finished=True)
+        logger.info(f"Report job {job_id} completed.")
+    except Exception as e:
+        # the run stays RUNNING and resumes when it is started again
+        logger.error(f"Report job {job_id} aborted: {e}")
+
+
+def _send_and_checkpoint(
+    job_id: int,
+    user_id: int,
+    report: ReportFragment,
+    destinations: ReportDestinations | None,
+) -> None:
+    """Send the report of a user and record the outcome.
+
+    Args:
+        job_id: The id of the run.
+        user_id: The id of the user.
+        report: The report of the user.
+        destinations: The destinations a previous attempt failed for, all
+            destinations of the user if None.
+    """
+    status: ReportUserStatus = "SENT"
+    error: str | None = None
+    failed: dict | None = None
+    try:
+        send_user_report(user_id, report, destinations)
+    except ReportDeliveryError as e:
+        logger.error(f"Failed to send the report of user {user_id}: {e}")
+        status, error, failed = "FAILED", str(e), asdict(e.failed)
+    except Exception as e:
+        logger.error(f"Failed to send the report of user {user_id}: {e}")
+        # the destinations of a retry are kept, none was delivered to
+        status, error = "FAILED", str(e)
+        failed = asdict(destinations) if destinations else None
+
+    _checkpoint(job_id, user_id, status, error, failed)
+
+
+def _checkpoint(
+    job_id: int,
+    user_id: int,
+    status: ReportUserStatus,
+    error: str | None = None,
+    failed_destinations: dict | None = None,
+) -> None:
+    """Record the outcome of the report of a user, failures are logged."""
+    try:
+        with get_session() as session:
+            record_report_user(
+                session, job_id, user_id, status, error, failed_destinations
+            )
+    except Exception as e:
+        logger.error(f"Failed to checkpoint the report of user {user_id}: {e}")
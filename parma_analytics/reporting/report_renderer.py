@@ -0,0 +1,77 @@
+"""Fragment-based rendering of the weekly reports.
+
+The section of a company is identical in the reports of all its subscribers. It is
+rendered once per report period, as HTML for the email and as text for Slack, and
+cached by company and period. The report of a user concatenates the cached sections
+of the companies the user is subscribed to.
+"""
+
+import os
+from dataclasses import dataclass
+from datetime import date
+
+from parma_analytics.reporting.generate_html import environment
+from parma_analytics.utils.ttl_cache import TTLCache
+
+FRAGMENT_CACHE_TTL_SECONDS = float(
+    os.getenv("REPORT_FRAGMENT_CACHE_TTL_SECONDS", "86400")
+)
+FRAGMENT_CACHE_MAX_SIZE = int(os.getenv("REPORT_FRAGMENT_CACHE_MAX_SIZE", "10000"))
+
+_fragments: TTLCache = TTLCache(FRAGMENT_CACHE_TTL_SECONDS, FRAGMENT_CACHE_MAX_SIZE)
+
+
+@dataclass(frozen=True)
+class ReportFragment:
+    """The rendered section of a company."""
+
+    html: str
+    text: str
+
+
+def render_company_fragment(
+    company_id: int, company_name: str, messages: list[str], period_start: date
+) -> ReportFragment:
+    """Render the section of a company, cached per report period.
+
+    Args:
+        company_id: The id of the company.
+        company_name: The name of the company.
+        messages: The report messages of the company.
+        period_start: The first day of the report period.
+
+    Returns:
+        The HTML and Slack text of the section.
+    """
+    key = (company_id, period_start)
+    fragment = _fragments.get(key)
+    if fragment is None:
+        html = environment.get_template("company.html").render(
+            company_name=company_name, news_list=messages
+        )
+        text = f"{company_name}\n" + "".join(f"- {message}\n" for message in messages)
+        fragment = ReportFragment(html=html, text=text)
+        _fragments.set(key, fragment)
+    return fragment
+
+
+def render_report(fragments: list[ReportFragment]) -> ReportFragment:
+    """Assemble a report from the sections of its companies.
+
+    Args:
+        fragments: The sections in the order they appear in the report.
+
+    Returns:
+        The HTML document and the Slack text of the report.
+    """
+    html = environment.get_template("layout.html").render(
+        sections="".join(fragment.html for fragment in fragments)
+    )
+    return ReportFragment(
+        html=html, text="".join(fragment.text for fragment in fragments)
+    )
+
+
+def clear_fragments() -> None:
+    """Forget all rendered sections."""
+    _fragments.clear()
@@ -1,152 +1,168 @@
 """Module to get send reports based on user subscription."""
 
-import logging
-from typing import Any
+from dataclasses import dataclass, field
+from datetime import date
 
-from sqlalchemy.orm import Session
-
-from parma_analytics.db.prod.company_query import get_company_name
-from parma_analytics.db.prod.company_source_measurement_query import (
-    get_by_company_and_measurement_ids_query,
+from parma_analytics.db.prod.engine import get_engine
+from parma_analytics.db.prod.reporting import (
+    fetch_latest_sibling_values,
+    fetch_slack_secret_ids,
 )
-from parma_analytics.db.prod.engine import get_engine, get_session
-from parma_analytics.db.prod.measurement_value_query import MeasurementValueCRUD
-from parma_analytics.db.prod.models.measurement_value_models import (
-    MeasurementCommentValue,
-    MeasurementDateValue,
-    MeasurementFloatValue,
-    MeasurementImageValue,
-    MeasurementIntValue,
-    MeasurementLinkValue,
-    MeasurementNestedValue,
-    MeasurementParagraphValue,
-    MeasurementTextValue,
+from parma_analytics.db.prod.weekly_digest_query import is_funding_round
+from parma_analytics.reporting.destination_resolver import resolve_destinations
+from parma_analytics.reporting.gmail.email_service import EmailService
+from parma_analytics.reporting.report_data_loader import (
+    NewsMessage,
+    ReportData,
+    load_report_data,
 )
-from parma_analytics.db.prod.news_query import get_news_of_company
-from parma_analytics.db.prod.reporting import fetch_company_ids_for_user
-from parma_analytics.db.prod.source_measurement_query import (
-    get_all_source_measurements_from_parent,
-    get_source_measurement_query,
+from parma_analytics.reporting.report_renderer import (
+    ReportFragment,
+    render_company_fragment,
+    render_report,
 )
-from parma_analytics.db.prod.user_query import get_user
-from parma_analytics.reporting.generate_html import generate_html_report
-from parma_analytics.reporting.gmail.email_service import EmailService
 from parma_analytics.reporting.slack.send_slack_messages import SlackService
+from parma_analytics.vendor.secret_manager import prefetch_secrets
+
+
+def prepare_reports(
+    period_start: date | None = None,
+) -> tuple[ReportData, dict[int, list[str]]]:
+    """Load the report data and summarize the news of every company.
+
+    Args:
+        period_start: The first day of the report period, defaults to this week.
+
+    Returns:
+        The report data and the report messages by company id.
+    """
+    engine = get_engine()
+    prefetch_secrets(fetch_slack_secret_ids(engine))
+    report_data = load_report_data(engine, period_start=period_start)
+    # resolve the destinations of all users at once, the services of every
+    # user read them from the cache
+    resolve_destinations(user_ids=report_data.user_ids)
+    return report_data, report_data.summarize(summarize_company_news)
+
+
+def render_user_report(
+    report_data: ReportData,
+    messages_by_company_id: dict[int, list[str]],
+    user_id: int,
+    period_start: date,
+) -> ReportFragment | None:
+    """Assemble the report of a user from the cached sections of its companies.
 
+    Args:
+        report_data: The report data.
+        messages_by_company_id: The report messages by company id.
+        user_id: The id of the user.
+        period_start: The first day of the report period.
 
-def send_reports():
-    """Method to send report."."""
-    with get_session() as session:
-        try:
-            user_ids = get_user(session)
-            for user_id in user_ids:
-                company_ids = fetch_company_ids_for_user(session, user_id.id)
-                news_by_company: dict[str, Any] = {}
-
-                for company_id in company_ids:
-                    if company_id.company_id is not None:
-                        messages = get_news_of_company(session, company_id.company_id)
-                        company_name = get_company_name(
-                            get_engine(), company_id.company_id
-                        )
-                        if messages and company_name:
-                            news_by_company[company_name] = []
-                            funding_round_check = True
-                            for message in messages:
-                                if message.message:
-                                    if "funding round" in message.message.lower():
-                                        if funding_round_check:
-                                            new_message = handle_funding_round(
-                                                message,
-                                                company_id.company_id,
-                                            )
-                                            news_by_company[company_name].append(
-                                                new_message
-                                            )
-                                            funding_round_check = False
-                                    else:
-                                        news_by_company[company_name].append(
-                                            message.message
-                                        )
-                if news_by_company:
-                    user_id_int = user_id.id
-                    html = generate_html_report(news_by_company)
-                    email_service = EmailService(user_id_int)
-                    email_service.send_report_email(html)
-
-                    content = ""
-
-                    for company_name, news_list in news_by_company.items():
-                        content += f"{company_name}\n"
-
-                        for news_message in news_list:
-                            content += f"- {news_message}\n"
-                    slack_service = SlackService()
-                    slack_service.send_report(user_id_int, content)
-        except Exception as e:
-            logging.error(f"An error occurred in reporting/send_reports: {e}")
-            raise e
+    Returns:
+        The HTML and Slack text of the report or None if there are no news.
+    """
+    fragments = [
+        render_company_fragment(
+            company_id,
+            report_data.company_names[company_id],
+            messages_by_company_id.get(company_id, []),
+            period_start,
+        )
+        for company_id in report_data.report_company_ids(user_id)
+    ]
+    return render_report(fragments) if fragments else None
+
+
+@dataclass
+class ReportDestinations:
+    """Emails and slack channels of a user."""
+
+    emails: list[str] = field(default_factory=list)
+    channels: list[str] = field(default_factory=list)
+
+
+class ReportDeliveryError(RuntimeError):
+    """The report of a user was not delivered to some of its destinations."""
+
+    def __init__(self, failed: ReportDestinations):
+        super().__init__(
+            f"Report not delivered to emails {failed.emails} "
+            f"and slack channels {failed.channels}."
+        )
+        self.failed = failed
+
+
+def send_user_report(
+    user_id: int,
+    report: ReportFragment,
+    destinations: ReportDestinations | None = None,
+):
+    """Send the weekly report of a user via email and slack.
+
+    Args:
+        user_id: The id of the user.
+        report: The HTML and Slack text of the report.
+        destinations: Only send to these destinations, e.g. the ones a previous
+            attempt failed for, all destinations of the user if None.
+
+    Raises:
+        ReportDeliveryError: If the report could not be delivered to some
+            destinations.
+    """
+    email_service = EmailService(user_id)
+    email_result = email_service.send_report_email(
+        report.html, destinations.emails if destinations else None
+    )
+
+    slack_service = SlackService()
+    failed_channels = slack_service.send_report(
+        user_id, report.text, destinations.channels if destinations else None
+    )
+
+    failed_emails = email_result.failed_recipients if email_result else []
+    if failed_emails or failed_channels:
+        raise ReportDeliveryError(ReportDestinations(failed_emails, failed_channels))
+
+
+def summarize_company_news(company_id: int, messages: list[NewsMessage]) -> list[str]:
+    """Turn the news of a company into report messages.
+
+    Only the first funding round news is reported, extended by the latest values of
+    the funding round details.
+
+    Args:
+        company_id: The id of the company.
+        messages: The news of the company of the report period.
+
+    Returns:
+        The report messages.
+    """
+    summary = []
+    funding_round_check = True
+    for message in messages:
+        if message.message:
+            if is_funding_round(message.message):
+                if funding_round_check:
+                    summary.append(
+                        handle_funding_round(message, company_id) or message.message
+                    )
+                    funding_round_check = False
+            else:
+                summary.append(message.message)
+    return summary
 
 
 def handle_funding_round(message, company_id):
     """Method to handle if change in funding round has happened."""
-    source_measurement_id = message.source_measurement_id
-    source_measurement = get_source_measurement_query(
-        get_engine(), source_measurement_id
+    child_data_value = fetch_latest_sibling_values(
+        get_engine(), company_id, message.source_measurement_id
     )
-    if source_measurement.parent_measurement_id is not None:
-        child_source_measurements = get_all_source_measurements_from_parent(
-            get_engine(), source_measurement.parent_measurement_id
-        )
+    if child_data_value:
         message_for_funding = f"{message.message}\n"
-        child_data_value = {}
-        for child_source_measurement in child_source_measurements:
-            measurement_type = child_source_measurement.type.lower()
-            with get_session() as session:
-                company_measurement = get_by_company_and_measurement_ids_query(
-                    session, company_id, child_source_measurement.id
-                )
-                company_measurement_id = company_measurement.company_measurement_id
-                recent_value = handle_value(
-                    session, measurement_type, company_measurement_id
-                )
-                child_data_value[
-                    child_source_measurement.measurement_name
-                ] = recent_value
-        if child_data_value:
-            for (
-                measurement_name,
-                recent_value,
-            ) in child_data_value.items():
-                message_for_funding += f"- {measurement_name} - {recent_value}\n"
+        for (
+            measurement_name,
+            recent_value,
+        ) in child_data_value.items():
+            message_for_funding += f"- {measurement_name} - {recent_value}\n"
         return message_for_funding
-
-
-def handle_value(session: Session, measurement_type: str, company_measurement_id: int):
-    """Get the recent measurement value based by company_measurement id and type."""
-    query_functions = {
-        "int": MeasurementValueCRUD(MeasurementIntValue).get_recent_measurement_value,
-        "float": MeasurementValueCRUD(
-            MeasurementFloatValue
-        ).get_recent_measurement_value,
-        "paragraph": MeasurementValueCRUD(
-            MeasurementParagraphValue
-        ).get_recent_measurement_value,
-        "text": MeasurementValueCRUD(MeasurementTextValue).get_recent_measurement_value,
-        "comment": MeasurementValueCRUD(
-            MeasurementCommentValue
-        ).get_recent_measurement_value,
-        "link": MeasurementValueCRUD(MeasurementLinkValue).get_recent_measurement_value,
-        "image": MeasurementValueCRUD(
-            MeasurementImageValue
-        ).get_recent_measurement_value,
-        "date": MeasurementValueCRUD(MeasurementDateValue).get_recent_measurement_value,
-        "nested": MeasurementValueCRUD(
-            MeasurementNestedValue
-        ).get_recent_measurement_value,
-    }
-
-    if measurement_type in query_functions:
-        get_recent_function = query_functions[measurement_type]
-        recent_measurement_value = get_recent_function(session, company_measurement_id)
-        return recent_measurement_value.value
@@ -0,0 +1,139 @@
+"""Cached resolution of Slack channel names to channel ids.
+
+Slack only addresses channels by id, but users configure channel names. Instead of
+paging through ``conversations.list`` for every message, the first lookup of a
+workspace scans all its channels once and caches every name, so that following
+lookups in the same workspace are served from memory. A name that is still missing
+after a fresh scan is cached as missing for a shorter time, which keeps repeated
+lookups of a misconfigured channel from scanning the workspace again and again.
+
+Workspaces are identified by a hash of their API token, the token itself is never
+kept as a cache key. The directory and the web clients are shared by all
+``SlackService`` instances of the process.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import defaultdict
+
+from slack_sdk import WebClient
+
+from parma_analytics.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_CACHE_TTL_SECONDS = float(os.getenv("SLACK_CHANNEL_CACHE_TTL_SECONDS", "3600"))
+CHANNEL_CACHE_NEGATIVE_TTL_SECONDS = float(
+    os.getenv("SLACK_CHANNEL_CACHE_NEGATIVE_TTL_SECONDS", "300")
+)
+CHANNEL_CACHE_MAX_SIZE = int(os.getenv("SLACK_CHANNEL_CACHE_MAX_SIZE", "10000"))
+
+# maximum page size of conversations.list
+PAGE_SIZE = 1000
+
+# cached for names that were not found in a fresh scan
+_NOT_FOUND = ""
+
+
+def token_hash(token: str) -> str:
+    """Identify a workspace by the hash of its API token."""
+    return hashlib.sha256(token.encode("UTF-8")).hexdigest()
+
+
+class ChannelDirectory:
+    """Cache of the channel ids of Slack workspaces."""
+
+    def __init__(
+        self,
+        ttl: float = CHANNEL_CACHE_TTL_SECONDS,
+        negative_ttl: float = CHANNEL_CACHE_NEGATIVE_TTL_SECONDS,
+        max_size: int = CHANNEL_CACHE_MAX_SIZE,
+    ):
+        """Create an empty directory.
+
+        Args:
+            ttl: Time to live of resolved channel ids in seconds.
+            negative_ttl: Time to live of channel names that were not found.
+            max_size: Maximum number of cached channel names.
+        """
+        self.negative_ttl = negative_ttl
+        self._cache: TTLCache[tuple[str, str], str] = TTLCache(ttl, max_size)
+        # one scan per workspace at a time, concurrent lookups wait for its result
+        self._scan_locks: defaultdict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._scan_locks_lock = threading.Lock()
+
+    def get_channel_id(self, client: WebClient, channel_name: str) -> str | None:
+        """Resolve a channel name to its id.
+
+        Args:
+            client: The web client of the workspace.
+            channel_name: The name of the channel.
+
+        Returns:
+            The id of the channel or None if the workspace has no such channel.
+        """
+        workspace = token_hash(client.token or "")
+        key = (workspace, channel_name)
+        channel_id = self._cache.get(key)
+        if channel_id is None:
+            with self._scan_lock(workspace):
+                # another thread may have scanned the workspace meanwhile
+                channel_id = self._cache.get(key)
+                if channel_id is None:
+                    channel_id = self._scan(client, workspace, channel_name)
+        return channel_id or None
+
+    def invalidate(self, client: WebClient, channel_name: str) -> None:
+        """Forget the cached id of a channel, e.g. after it was renamed or deleted."""
+        self._cache.pop((token_hash(client.token or ""), channel_name))
+
+    def clear(self) -> None:
+        """Forget all cached channels."""
+        self._cache.clear()
+
+    def _scan_lock(self, workspace: str) -> threading.Lock:
+        with self._scan_locks_lock:
+            return self._scan_locks[workspace]
+
+    def _scan(self, client: WebClient, workspace: str, channel_name: str) -> str:
+        """Cache all channels of a workspace and return the id of the wanted one."""
+        channel_id = _NOT_FOUND
+        num_channels = 0
+        for page in client.conversations_list(limit=PAGE_SIZE, exclude_archived=True):
+            for channel in page["channels"]:
+                self._cache.set((workspace, channel["name"]), channel["id"])
+                if channel["name"] == channel_name:
+                    channel_id = channel["id"]
+                num_channels += 1
+        logger.debug(f"Cached {num_channels} Slack channels of a workspace.")
+
+        if channel_id == _NOT_FOUND:
+            self._cache.set(
+                (workspace, channel_name), _NOT_FOUND, ttl=self.negative_ttl
+            )
+        return channel_id
+
+
+_clients: dict[str, WebClient] = {}
+_clients_lock = threading.Lock()
+
+channel_directory = ChannelDirectory()
+
+
+def get_web_client(token: str) -> WebClient:
+    """Get the shared web client of a workspace.
+
+    Args:
+        token: The API token of the workspace.
+
+    Returns:
+        The web client, created on first use.
+    """
+    key = token_hash(token)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = WebClient(token=token)
+        return client
@@ -3,6 +3,8 @@ r"""The SlackService provides functionality to send messages and reports to Slac
 Available methods:
 - send_report(user_id: int, content: str): Sends a weekly report to a user.
 - send_notification(user_id: int, content: str): Sends a notification to a user.
+- send_message_to_channel(channel_name: str, secret_id: str, content: str, title: str):
+    Sends a message to a single channel.
 
 This class also encapsulates private helper methods for tasks such as sending messages,
 retrieving channel IDs, creating message blocks,
@@ -24,7 +26,11 @@ from slack_sdk.errors import SlackApiError
 from parma_analytics.reporting.notification_service_manager import (
     NotificationServiceManager,
 )
-from parma_analytics.vendor.secret_manager import get_client, retrieve_secret
+from parma_analytics.reporting.slack.channel_directory import (
+    channel_directory,
+    get_web_client,
+)
+from parma_analytics.vendor.secret_manager import get_secret
 
 logger = logging.getLogger(__name__)
 
@@ -39,41 +45,28 @@ class SlackService:
             Sends a notification to a user.
     """
 
-    def _get_channel_id(self, channel_name: str, client: WebClient):
-        try:
-            for result in client.conversations_list():
-                for channel in result["channels"]:
-                    if channel["name"] == channel_name:
-                        return channel["id"]
+    def _get_channel_id(self, channel_name: str, client: WebClient) -> str:
+        """Resolve a channel name, Slack API errors of the lookup are raised."""
+        channel_id = channel_directory.get_channel_id(client, channel_name)
+        if channel_id is None:
             raise ValueError(f"Channel with name '{channel_name}' not found.")
-        except Exception as e:
-            logger.error(f"An error occurred while fetching the channel ID: {e}")
+        return channel_id
 
-    def _send_message(
+    def _post_message(
         self,
+        client: WebClient,
         channel_name: str,
         content: str,
-        slack_api_token: str,
-        blocks: list[Any] | None = None,
+        blocks: list[Any] | None,
     ):
-        """Sends a message to a Slack channel.
-
-        Args:
-            channel_name (str): The name of the Slack channel to send the message to.
-            content (str): The content of the message.
-            slack_api_token (str): The API token for accessing the Slack API.
-            blocks (List[Any], optional): The blocks to include in the message.
-        """
+        """Post a message, forgetting the cached channel id if it became invalid."""
+        channel_id = self._get_channel_id(channel_name=channel_name, client=client)
         try:
-            slack_client = WebClient(token=slack_api_token)
-            channel_id = self._get_channel_id(
-                channel_name=channel_name, client=slack_client
-            )
-            slack_client.chat_postMessage(
-                channel=channel_id, text=content, blocks=blocks
-            )
+            client.chat_postMessage(channel=channel_id, text=content, blocks=blocks)
         except SlackApiError as e:
-            logger.error(f"Error sending report: {e.response['error']}")
+            if e.response.get("error") == "channel_not_found":
+                channel_directory.invalidate(client, channel_name)
+            raise
 
     def _create_message_blocks(
         self,
@@ -108,42 +101,72 @@ class SlackService:
         )
         return channel_manager.get_slack_key_and_destinations()
 
-    def _send_message_to_user(self, user_id: int, content: str, title: str):
+    def send_message_to_channel(
+        self, channel_name: str, secret_id: str, content: str, title: str
+    ):
+        """Send a message to a single Slack channel, raising on failure.
+
+        Args:
+            channel_name: The name of the Slack channel.
+            secret_id: The id of the secret holding the Slack API token.
+            content: The content of the message.
+            title: The title for the message blocks.
+        """
+        slack_api_token = get_secret(secret_id)
+        self._post_message(
+            get_web_client(slack_api_token),
+            channel_name,
+            content,
+            self._create_message_blocks(content=content, title=title),
+        )
+
+    def _send_message_to_user(
+        self,
+        user_id: int,
+        content: str,
+        title: str,
+        channels: list[str] | None = None,
+    ) -> list[str]:
         """General function to send a message to a user.
 
         Args:
             user_id: The ID of the user.
             content: The content of the message.
             title: The title for the message blocks.
+            channels: Only send to these channels of the user, all if None.
+
+        Returns:
+            The channels the message could not be sent to.
         """
         channels_and_keys = self._get_user_destinations(user_id)
+        if channels is not None:
+            channels_and_keys = [
+                (channel, secret_id)
+                for channel, secret_id in channels_and_keys
+                if channel in channels
+            ]
+        failed_channels = []
         for channel, secret_id in channels_and_keys:
             try:
-                slack_api_token = retrieve_secret(get_client(), secret_id=secret_id)
-            except Exception as e:
-                logger.error(
-                    f"Failed to retrieve secret key for secret_id {secret_id}: {e}"
-                )
-                continue  # Skip to the next channel
-            blocks = self._create_message_blocks(content=content, title=title)
-            try:
-                self._send_message(
-                    channel_name=channel,
-                    content=content,
-                    slack_api_token=slack_api_token,
-                    blocks=blocks,
-                )
+                self.send_message_to_channel(channel, secret_id, content, title)
             except Exception as e:
                 logger.error(f"Failed to send message to channel {channel}: {e}")
-
-    def send_report(self, user_id: int, content: str):
-        """Send a weekly report to a user."""
-        self._send_message_to_user(
-            user_id=user_id, content=content, title="Your Weekly Report by Parma AI"
+                failed_channels.append(channel)
+        return failed_channels
+
+    def send_report(
+        self, user_id: int, content: str, channels: list[str] | None = None
+    ) -> list[str]:
+        """Send a weekly report to a user, returning the channels that failed."""
+        return self._send_message_to_user(
+            user_id=user_id,
+            content=content,
+            title="Your Weekly Report by Parma AI",
+            channels=channels,
         )
 
-    def send_notification(self, user_id: int, content: str):
-        """Send a notification to a user."""
-        self._send_message_to_user(
+    def send_notification(self, user_id: int, content: str) -> list[str]:
+        """Send a notification to a user, returning the channels that failed."""
+        return self._send_message_to_user(
             user_id=user_id, content=content, title="Important Update!"
         )
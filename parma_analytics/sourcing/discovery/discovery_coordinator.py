@@ -0,0 +1,190 @@
+"""Batched discovery of the identifiers of many companies of a data source.
+
+Instead of calling the discovery endpoint of a mining module once per company, the
+coordinator collects all companies of a data source that need discovery, sends them
+in chunks of ``DISCOVERY_CHUNK_SIZE`` with up to ``DISCOVERY_CONCURRENCY`` concurrent
+requests and stores the identifiers of all responses in one transaction.
+"""
+
+import asyncio
+import json
+import logging
+import os
+
+from parma_analytics.bl.company_data_source_identifiers_bll import (
+    replace_discovered_identifiers_bll,
+)
+from parma_analytics.bl.data_source_helper import (
+    DataSourceSnapshot,
+    ensure_appropriate_scheme,
+)
+from parma_analytics.db.prod.company_data_source_identifiers_query import IdentifierData
+from parma_analytics.db.prod.company_query import get_company_names
+from parma_analytics.db.prod.engine import get_engine
+from parma_analytics.sourcing.discovery.discovery_manager import (
+    discovered_identifiers,
+)
+from parma_analytics.sourcing.discovery.discovery_model import (
+    DiscoveryQueryData,
+    DiscoveryResponseModel,
+)
+from parma_analytics.utils.http_client import async_request, close_async_client
+from parma_analytics.utils.jwt_handler import JWTHandler
+
+logger = logging.getLogger(__name__)
+
+DISCOVERY_CHUNK_SIZE = int(os.getenv("DISCOVERY_CHUNK_SIZE", "50"))
+DISCOVERY_CONCURRENCY = int(os.getenv("DISCOVERY_CONCURRENCY", "4"))
+
+
+async def discover_chunk(
+    data_source: DataSourceSnapshot, query_data: list[DiscoveryQueryData]
+) -> DiscoveryResponseModel:
+    """Call the discovery endpoint of a data source for a chunk of companies.
+
+    Args:
+        data_source: The data source.
+        query_data: The companies to discover.
+
+    Returns:
+        The discovered identifiers.
+
+    Raises:
+        ValueError: If the data source has no valid invocation endpoint.
+        httpx.HTTPError: If the request fails.
+    """
+    invocation_endpoint = ensure_appropriate_scheme(data_source.invocation_endpoint)
+    if not invocation_endpoint:
+        raise ValueError(
+            f"Invalid invocation endpoint: {data_source.invocation_endpoint} "
+            f"for data source {data_source.id}"
+        )
+
+    token: str = JWTHandler.create_jwt(data_source.id)
+    response = await async_request(
+        "POST",
+        f"{invocation_endpoint}/discover",
+        content=json.dumps([query.model_dump() for query in query_data]),
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    response.raise_for_status()
+    return DiscoveryResponseModel(**response.json())
+
+
+async def discover_all(
+    data_source: DataSourceSnapshot,
+    query_data: list[DiscoveryQueryData],
+    chunk_size: int | None = None,
+    concurrency: int | None = None,
+) -> list[DiscoveryResponseModel]:
+    """Discover many companies in concurrent chunks.
+
+    A failing chunk is logged and skipped, the other chunks are not affected.
+
+    Args:
+        data_source: The data source.
+        query_data: The companies to discover.
+        chunk_size: The companies per request, defaults to ``DISCOVERY_CHUNK_SIZE``.
+        concurrency: The maximum number of concurrent requests, defaults to
+            ``DISCOVERY_CONCURRENCY``.
+
+    Returns:
+        The responses of all successful chunks.
+    """
+    chunk_size = chunk_size or DISCOVERY_CHUNK_SIZE
+    semaphore = asyncio.Semaphore(concurrency or DISCOVERY_CONCURRENCY)
+    chunks = [
+        query_data[start : start + chunk_size]
+        for start in range(0, len(query_data), chunk_size)
+    ]
+
+    async def discover(chunk: list[DiscoveryQueryData]) -> DiscoveryResponseModel:
+        async with semaphore:
+            return await discover_chunk(data_source, chunk)
+
+    results = await asyncio.gather(
+        *(discover(chunk) for chunk in chunks), return_exceptions=True
+    )
+    responses = []
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, BaseException):
+            logger.error(
+                f"Discovery of {len(chunk)} companies failed for data source "
+                f"{data_source.id}: {result}"
+            )
+        else:
+            responses.append(result)
+    return responses
+
+
+def discover_identifiers(
+    data_source: DataSourceSnapshot, company_data_source_ids: dict[int, int]
+) -> set[int]:
+    """Discover and store the identifiers of many companies of a data source.
+
+    The automatically discovered identifiers of every discovered company are
+    replaced, so expired identifiers are removed and concurrent discoveries of the
+    same company do not store its identifiers twice.
+
+    Must not be called from a running event loop, the requests are sent in an own
+    loop.
+
+    Args:
+        data_source: The data source.
+        company_data_source_ids: The company data source id by company id of the
+            companies to discover.
+
+    Returns:
+        The ids of the companies identifiers were discovered for.
+    """
+    if not company_data_source_ids:
+        return set()
+
+    names = get_company_names(get_engine(), list(company_data_source_ids))
+    query_data = []
+    for company_id in company_data_source_ids:
+        if company_id in names:
+            query_data.append(
+                DiscoveryQueryData(company_id=str(company_id), name=names[company_id])
+            )
+        else:
+            logger.error(f"Company not found with id: {company_id}")
+
+    async def run() -> list[DiscoveryResponseModel]:
+        try:
+            return await discover_all(data_source, query_data)
+        finally:
+            await close_async_client()
+
+    responses = asyncio.run(run()) if query_data else []
+
+    # map every company of a response to its own company data source
+    identifiers: list[IdentifierData] = []
+    discovered: set[int] = set()
+    for response in responses:
+        for raw_company_id, properties in response.identifiers.items():
+            company_id = int(raw_company_id)
+            company_data_source_id = company_data_source_ids.get(company_id)
+            if company_data_source_id is None:
+                logger.warning(
+                    f"Discovery returned unknown company {company_id} "
+                    f"for data source {data_source.id}"
+                )
+                continue
+            discovered.add(company_id)
+            identifiers.extend(
+                discovered_identifiers(
+                    company_data_source_id, properties, response.validity
+                )
+            )
+
+    if discovered:
+        replace_discovered_identifiers_bll(
+            [company_data_source_ids[company_id] for company_id in discovered],
+            identifiers,
+        )
+    logger.info(
+        f"Discovered {len(identifiers)} identifiers of {len(discovered)} of "
+        f"{len(company_data_source_ids)} companies for data source {data_source.id}."
+    )
+    return discovered
@@ -2,18 +2,10 @@
 
 import json
 import logging
+from datetime import datetime
 
-import requests
+import httpx
 
-from parma_analytics.bl.company_bll import get_company_id_bll
-from parma_analytics.bl.company_data_source_bll import (
-    get_company_data_source_bll,
-)
-from parma_analytics.bl.company_data_source_identifiers_bll import (
-    create_company_data_source_identifier_bll,
-    delete_company_data_source_identifier_bll,
-    get_company_data_source_identifiers_bll,
-)
 from parma_analytics.bl.data_source_helper import ensure_appropriate_scheme
 from parma_analytics.db.prod.company_data_source_identifiers_query import IdentifierData
 from parma_analytics.db.prod.models.types import DataSource
@@ -21,6 +13,7 @@ from parma_analytics.sourcing.discovery.discovery_model import (
     DiscoveryQueryData,
     DiscoveryResponseModel,
 )
+from parma_analytics.utils.http_client import request
 from parma_analytics.utils.jwt_handler import JWTHandler
 
 logger = logging.getLogger(__name__)
@@ -44,8 +37,11 @@ def call_discover_endpoint(
     request_payload = json.dumps([query.model_dump() for query in query_data])
 
     try:
-        response = requests.post(
-            f"{invocation_endpoint}/discover", data=request_payload, headers=header
+        response = request(
+            "POST",
+            f"{invocation_endpoint}/discover",
+            content=request_payload,
+            headers=header,
         )
         response.raise_for_status()
 
@@ -54,7 +50,7 @@ def call_discover_endpoint(
 
         return DiscoveryResponseModel(**response_data)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(
             f"Request error happened for "
             f"data source {data_source.id} "
@@ -70,64 +66,20 @@ def call_discover_endpoint(
         raise e
 
 
-def process_discovery_response(
-    discovery_response: DiscoveryResponseModel, company_data_source_id: int
-):
-    """Process discovery response and store identifiers in db."""
-    logger.debug(f"Processing discovery response: {discovery_response}")
-
-    for company_id, data in discovery_response.identifiers.items():
-        for property_key, values in data.items():
-            for value in values:
-                logger.debug(
-                    f"Creating identifier for company {company_id} "
-                    f"with property {property_key} and value {value}"
-                )
-                identifier_data = IdentifierData(
-                    company_data_source_id=company_data_source_id,
-                    identifier_type="AUTOMATICALLY_DISCOVERED",
-                    property=property_key,
-                    value=value,
-                    validity=discovery_response.validity,
-                )
-                create_company_data_source_identifier_bll(identifier_data)
-
-
-def rediscover_identifiers(data_source: DataSource, company_id: int) -> None:
-    """Rediscover identifiers for a company and update them in the database."""
-    logger.debug(f"Rediscovering identifiers for company {company_id}")
-
-    company_entity = get_company_id_bll(company_id)
-    if not company_entity:
-        logger.error(f"Company not found with id: {company_id}")
-        return
-
-    # Prepare discovery query data
-    query_data = [
-        DiscoveryQueryData(company_id=str(company_id), name=company_entity.name)
-    ]
-
-    discovery_response = call_discover_endpoint(data_source, query_data)
-    logger.debug(f"Discovery response: {discovery_response}")
-
-    company_data_source = get_company_data_source_bll(company_id, data_source.id)
-
-    existing_identifiers = get_company_data_source_identifiers_bll(
-        company_id, data_source.id
-    )
-
-    # Delete old identifiers that are not manually added
-    if existing_identifiers:
-        for identifier in existing_identifiers:
-            if identifier.identifier_type == "AUTOMATICALLY_DISCOVERED":
-                delete_company_data_source_identifier_bll(identifier.id)
-    else:
-        logger.warning("No existing identifiers found. CompanyDataSource is not found!")
-
-    if company_data_source:
-        process_discovery_response(discovery_response, company_data_source.id)
-    else:
-        logger.warning(
-            f"CompanyDataSource is not found for company {company_id} "
-            f"and data source {data_source.id}"
+def discovered_identifiers(
+    company_data_source_id: int,
+    properties: dict[str, list[str]],
+    validity: datetime,
+) -> list[IdentifierData]:
+    """Turn the discovered values of a company into identifier rows."""
+    return [
+        IdentifierData(
+            company_data_source_id=company_data_source_id,
+            identifier_type="AUTOMATICALLY_DISCOVERED",
+            property=property_key,
+            value=value,
+            validity=validity,
         )
+        for property_key, values in properties.items()
+        for value in values
+    ]
@@ -0,0 +1,128 @@
+"""Background refresh of discovered identifiers before they expire.
+
+Identifiers that expire within ``IDENTIFIER_REFRESH_LEAD_SECONDS`` are rediscovered
+ahead of time, so preparing the payload of a mining module does not have to wait for
+the discovery. The due company data sources are read in pages of
+``IDENTIFIER_REFRESH_BATCH_SIZE`` from the index on the validity and rediscovered per
+data source. A random pause of up to ``IDENTIFIER_REFRESH_MAX_JITTER_SECONDS`` between
+the pages spreads the discovery requests over time instead of sending them at once.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from parma_analytics.bl.company_data_source_identifiers_bll import (
+    get_expiring_company_data_sources_bll,
+)
+from parma_analytics.bl.data_source_helper import DataSourceSnapshot
+from parma_analytics.db.prod.data_source_query import get_all_data_source
+from parma_analytics.db.prod.engine import get_engine
+from parma_analytics.sourcing.discovery.discovery_coordinator import (
+    discover_identifiers,
+)
+
+logger = logging.getLogger(__name__)
+
+IDENTIFIER_REFRESH_LEAD_SECONDS = float(
+    os.getenv("IDENTIFIER_REFRESH_LEAD_SECONDS", "86400")
+)
+IDENTIFIER_REFRESH_BATCH_SIZE = int(os.getenv("IDENTIFIER_REFRESH_BATCH_SIZE", "200"))
+IDENTIFIER_REFRESH_MAX_JITTER_SECONDS = float(
+    os.getenv("IDENTIFIER_REFRESH_MAX_JITTER_SECONDS", "10")
+)
+
+# a refresh is never executed twice at the same time by this process
+_refresh_lock = threading.Lock()
+
+
+def refresh_expiring_identifiers(
+    lead_seconds: float | None = None,
+    batch_size: int | None = None,
+    max_jitter_seconds: float | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> int:
+    """Rediscover the identifiers that expire soon.
+
+    Does nothing if a refresh is already running in this process. A failing data
+    source is logged and does not stop the refresh of the others.
+
+    Args:
+        lead_seconds: How long before their expiry identifiers are rediscovered,
+            defaults to ``IDENTIFIER_REFRESH_LEAD_SECONDS``.
+        batch_size: The company data sources per page, defaults to
+            ``IDENTIFIER_REFRESH_BATCH_SIZE``.
+        max_jitter_seconds: The maximum pause between two pages, defaults to
+            ``IDENTIFIER_REFRESH_MAX_JITTER_SECONDS``.
+        sleep: Pauses for the given seconds.
+
+    Returns:
+        The number of companies whose identifiers were rediscovered.
+    """
+    if not _refresh_lock.acquire(blocking=False):
+        logger.info("Identifier refresh is already running.")
+        return 0
+
+    try:
+        return _refresh(
+            IDENTIFIER_REFRESH_LEAD_SECONDS if lead_seconds is None else lead_seconds,
+            batch_size or IDENTIFIER_REFRESH_BATCH_SIZE,
+            IDENTIFIER_REFRESH_MAX_JITTER_SECONDS
+            if max_jitter_seconds is None
+            else max_jitter_seconds,
+            sleep,
+        )
+    finally:
+        _refresh_lock.release()
+
+
+def _refresh(
+    lead_seconds: float,
+    batch_size: int,
+    max_jitter_seconds: float,
+    sleep: Callable[[float], None],
+) -> int:
+    expires_before = datetime.now() + timedelta(seconds=lead_seconds)
+    data_sources: dict[int, DataSourceSnapshot] = {
+        data_source.id: DataSourceSnapshot.of(data_source)
+        for data_source in get_all_data_source(get_engine())
+        if data_source.is_active
+    }
+
+    refreshed = 0
+    after: tuple[datetime, int] | None = None
+    while True:
+        page = get_expiring_company_data_sources_bll(expires_before, batch_size, after)
+        if not page:
+            break
+
+        company_data_source_ids: defaultdict[int, dict[int, int]] = defaultdict(dict)
+        for expiring in page:
+            company_data_source_ids[expiring.data_source_id][
+                expiring.company_id
+            ] = expiring.company_data_source_id
+
+        for data_source_id, ids in company_data_source_ids.items():
+            data_source = data_sources.get(data_source_id)
+            if data_source is None:
+                continue
+            try:
+                refreshed += len(discover_identifiers(data_source, ids))
+            except Exception as e:
+                logger.error(
+                    f"Failed to refresh the identifiers of {len(ids)} companies "
+                    f"for data source {data_source_id}: {e}"
+                )
+
+        if len(page) < batch_size:
+            break
+        after = (page[-1].validity, page[-1].company_data_source_id)
+        sleep(random.uniform(0, max_jitter_seconds))
+
+    logger.info(f"Refreshed the identifiers of {refreshed} companies.")
+    return refreshed
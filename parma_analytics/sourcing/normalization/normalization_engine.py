@@ -1,5 +1,6 @@
 """Normalization engine for normalizing raw data."""
 
+import asyncio
 import logging
 from datetime import datetime
 from typing import Any
@@ -10,7 +11,6 @@ from parma_analytics.db.mining.models import NormalizationSchema, RawData
 from parma_analytics.sourcing.normalization.normalization_model import NormalizedData
 
 logger = logging.getLogger(__name__)
-comment_ids = []
 
 
 def build_lookup_dict(mapping_schema: dict[str, Any]) -> dict[str, dict[str, str]]:
@@ -69,7 +69,11 @@ def process_data_point(
 
 
 def normalize_nested_data(
-    nested_data: Any, company_id: str, timestamp: str, lookup_dict: dict[str, Any]
+    nested_data: Any,
+    company_id: str,
+    timestamp: str,
+    lookup_dict: dict[str, Any],
+    comment_ids: list[int] | None = None,
 ) -> list[NormalizedData]:
     """Recursively normalizes nested data according to the provided mapping schema.
 
@@ -85,10 +89,13 @@ def normalize_nested_data(
         company_id: The ID of the company associated with the data.
         timestamp: The timestamp when the data was retrieved or processed.
         lookup_dict: map information for data normalization.
+        comment_ids: Collects the ids of the registered comment values.
 
     Returns:
         A list of NormalizedData instances representing the normalized nested data.
     """
+    if comment_ids is None:
+        comment_ids = []
     normalized_results: list[NormalizedData] = []
     if isinstance(nested_data, dict):
         nested_data = [nested_data]
@@ -118,7 +125,7 @@ def normalize_nested_data(
                     register_values(normalized_data)
                     normalized_results.append(normalized_data)
                     nested_results = normalize_nested_data(
-                        value, company_id, timestamp, lookup_dict
+                        value, company_id, timestamp, lookup_dict, comment_ids
                     )
                     normalized_results.extend(nested_results)
     return normalized_results
@@ -141,6 +148,8 @@ def normalize_data(
 
     lookup_dict = build_lookup_dict(mapping_schema.schema)
     normalized_results = []
+    # ids of comment type values for sentiment analysis
+    comment_ids: list[int] = []
 
     timestamp = str(raw_data.create_time)
     company_id = str(raw_data.company_id)
@@ -172,11 +181,13 @@ def normalize_data(
             register_values(normalized_data)
             normalized_results.append(normalized_data)
             nested_results = normalize_nested_data(
-                value, company_id, timestamp, lookup_dict
+                value, company_id, timestamp, lookup_dict, comment_ids
             )
             normalized_results.extend(nested_results)
 
-    assert update_scores is not None
-    # TODO: restore sentiment analysis once ChatGPT issue is resolved
-    # asyncio.run(update_scores(comment_ids))
+    if comment_ids:
+        try:
+            asyncio.run(update_scores(comment_ids))
+        except Exception as e:
+            logger.error(f"Error updating sentiment scores: {e}")
     return normalized_results
@@ -0,0 +1,177 @@
+"""Process-wide pooled HTTP clients for the requests to the mining modules.
+
+Creating a client per request pays a new TCP and TLS handshake every time. Instead,
+the process shares one synchronous client, and one asynchronous client per event loop
+because an ``httpx.AsyncClient`` is bound to the loop it is used in. Connections are
+kept alive and use HTTP/2 if the optional ``h2`` package is installed. Besides the
+global connection limit of the pool, the concurrent requests per host are bounded so
+that a single mining module cannot exhaust the pool.
+
+Certificates are verified unless ``MINING_HTTP_VERIFY_TLS`` is disabled. Only the
+trigger requests opt out with ``TRIGGER_VERIFY_TLS``, the trigger endpoints of the
+mining modules have always been called without verifying their certificates.
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+from collections import defaultdict
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
+
+import httpx
+
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("MINING_HTTP_CONNECT_TIMEOUT_SECONDS", "10"))
+READ_TIMEOUT_SECONDS = float(os.getenv("MINING_HTTP_READ_TIMEOUT_SECONDS", "300"))
+WRITE_TIMEOUT_SECONDS = float(os.getenv("MINING_HTTP_WRITE_TIMEOUT_SECONDS", "60"))
+POOL_TIMEOUT_SECONDS = float(os.getenv("MINING_HTTP_POOL_TIMEOUT_SECONDS", "30"))
+MAX_CONNECTIONS = int(os.getenv("MINING_HTTP_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("MINING_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")
+)
+KEEPALIVE_EXPIRY_SECONDS = float(
+    os.getenv("MINING_HTTP_KEEPALIVE_EXPIRY_SECONDS", "30")
+)
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("MINING_HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+HTTP2_ENABLED = os.getenv("MINING_HTTP2_ENABLED", "true").lower() == "true"
+VERIFY_TLS = os.getenv("MINING_HTTP_VERIFY_TLS", "true").lower() == "true"
+TRIGGER_VERIFY_TLS = os.getenv("MINING_TRIGGER_VERIFY_TLS", "false").lower() == "true"
+
+_lock = threading.Lock()
+_client: httpx.Client | None = None
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[bool, httpx.AsyncClient]
+] = weakref.WeakKeyDictionary()
+
+_host_semaphores: defaultdict[str, threading.BoundedSemaphore] = defaultdict(
+    lambda: threading.BoundedSemaphore(MAX_CONNECTIONS_PER_HOST)
+)
+_async_host_semaphores: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, defaultdict[str, asyncio.Semaphore]
+] = weakref.WeakKeyDictionary()
+
+
+def http2_available() -> bool:
+    """Whether HTTP/2 is enabled and the ``h2`` package is installed."""
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def _client_options(verify: bool) -> dict[str, Any]:
+    return {
+        "verify": verify,
+        "http2": http2_available(),
+        "timeout": httpx.Timeout(
+            connect=CONNECT_TIMEOUT_SECONDS,
+            read=READ_TIMEOUT_SECONDS,
+            write=WRITE_TIMEOUT_SECONDS,
+            pool=POOL_TIMEOUT_SECONDS,
+        ),
+        "limits": httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    }
+
+
+def get_client() -> httpx.Client:
+    """Get the shared synchronous client."""
+    global _client  # noqa: PLW0603
+    with _lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(**_client_options(VERIFY_TLS))
+        return _client
+
+
+def get_async_client(verify: bool = VERIFY_TLS) -> httpx.AsyncClient:
+    """Get the shared asynchronous client of the running event loop.
+
+    Args:
+        verify: Whether the client verifies certificates.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(verify)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(**_client_options(verify))
+            clients[verify] = client
+        return client
+
+
+@contextmanager
+def host_limit(url: str) -> Iterator[None]:
+    """Bound the concurrent synchronous requests to the host of a URL."""
+    with _lock:
+        semaphore = _host_semaphores[httpx.URL(url).host]
+    with semaphore:
+        yield
+
+
+@asynccontextmanager
+async def async_host_limit(url: str) -> AsyncIterator[None]:
+    """Bound the concurrent requests of the running event loop to a host."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        semaphores = _async_host_semaphores.setdefault(
+            loop,
+            defaultdict(lambda: asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)),
+        )
+        semaphore = semaphores[httpx.URL(url).host]
+    async with semaphore:
+        yield
+
+
+def request(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """Send a request with the shared synchronous client.
+
+    Args:
+        method: The HTTP method.
+        url: The URL.
+        kwargs: Further arguments of ``httpx.Client.request``.
+
+    Returns:
+        The response.
+    """
+    with host_limit(url):
+        return get_client().request(method, url, **kwargs)
+
+
+async def async_request(
+    method: str, url: str, verify: bool = VERIFY_TLS, **kwargs: Any
+) -> httpx.Response:
+    """Send a request with the shared asynchronous client of the running loop.
+
+    Args:
+        method: The HTTP method.
+        url: The URL.
+        verify: Whether the certificate of the host is verified.
+        kwargs: Further arguments of ``httpx.AsyncClient.request``.
+
+    Returns:
+        The response.
+    """
+    async with async_host_limit(url):
+        return await get_async_client(verify).request(method, url, **kwargs)
+
+
+async def close_async_client() -> None:
+    """Close the clients of the running event loop, e.g. before closing the loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.pop(loop, {})
+        _async_host_semaphores.pop(loop, None)
+    for client in clients.values():
+        await client.aclose()
+
+
+def close_client() -> None:
+    """Close the shared synchronous client."""
+    global _client  # noqa: PLW0603
+    with _lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
@@ -0,0 +1,90 @@
+"""Thread-safe in-process cache with expiring entries and LRU eviction."""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Cache whose entries expire after a time to live.
+
+    When the maximum size is reached the least recently used entry is evicted. The
+    cache is local to the process, entries cached by other instances of the service
+    are only invalidated by their expiry.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_size: int = 1024,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        """Create an empty cache.
+
+        Args:
+            ttl: Time to live of the entries in seconds.
+            max_size: Maximum number of entries.
+            timer: Clock returning the current time in seconds.
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._timer = timer
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K, default: Any = None) -> V | Any:
+        """Get the value cached for the key.
+
+        Args:
+            key: The key of the entry.
+            default: The value returned if there is no valid entry.
+
+        Returns:
+            The cached value or the default if the key is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= self._timer():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """Cache a value.
+
+        Args:
+            key: The key of the entry.
+            value: The value to cache.
+            ttl: Time to live of this entry in seconds, defaults to the cache ttl.
+        """
+        with self._lock:
+            self._entries[key] = (
+                self._timer() + (self.ttl if ttl is None else ttl),
+                value,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        """Remove the entry of the key if it exists."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        """Number of entries including expired ones that were not yet evicted."""
+        return len(self._entries)
@@ -13,6 +13,21 @@ resource "google_cloud_scheduler_job" "schedule_job" {
   region  = var.region
 }
 
+# Refresh of the discovered identifiers before they expire
+resource "google_cloud_scheduler_job" "refresh_identifiers_job" {
+  depends_on = []
+  name       = "refresh-identifiers-job-${var.env}"
+  schedule   = "15 * * * *" # Every hour at quarter past, between the schedule runs
+
+  http_target {
+    uri         = "https://analytics.${var.api_subdomain}${var.base_domain}/refresh-identifiers"
+    http_method = "GET"
+  }
+
+  project = var.project
+  region  = var.region
+}
+
 # Weekly reports
 resource "google_cloud_scheduler_job" "weekly_reports_schedule_job" {
   depends_on = []
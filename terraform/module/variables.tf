@@ -86,3 +86,11 @@ variable "chatgpt_api_key" {
   type      = string
   sensitive = true
 }
+
+/* ------------------------------------ Sentiment ----------------------------------- */
+
+variable "sentiment_scorer" {
+  description = "Sentiment scoring backend: lexicon (offline) or chatgpt"
+  type        = string
+  default     = "lexicon"
+}
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import polars as pl
+import pytest
+
+from parma_analytics.analytics.inference.trend_engine import fit_trends, update_trend
+from parma_analytics.analytics.inference.trend_models import (
+    TrendState,
+    fit,
+    to_days,
+    update,
+)
+
+MODULE = "parma_analytics.analytics.inference.trend_engine"
+
+RISING, FALLING, FLAT = 7, 3, 5
+
+START = datetime(2024, 1, 1)
+
+
+def initial_state(timestamp: datetime, value: float) -> TrendState:
+    return TrendState(
+        origin=timestamp,
+        count=1,
+        sum_t=0.0,
+        sum_y=value,
+        sum_tt=0.0,
+        sum_ty=0.0,
+        last_timestamp=timestamp,
+        last_value=value,
+        ewma=value,
+        level=value,
+        trend=0.0,
+    )
+
+
+@pytest.fixture
+def series() -> pl.DataFrame:
+    rng = np.random.default_rng(42)
+    rows = []
+    for company_measurement_id, slope in ((RISING, 2.0), (FALLING, -1.0), (FLAT, 0.0)):
+        days = np.cumsum(rng.uniform(0.5, 2.0, 25))
+        for day in days:
+            rows.append(
+                {
+                    "company_measurement_id": company_measurement_id,
+                    "timestamp": START + timedelta(days=float(day)),
+                    "value": 100.0 + slope * day,
+                }
+            )
+    return pl.DataFrame(rows)
+
+
+def test_fit_least_squares_slope():
+    codes = np.array([0, 0, 0, 1, 1, 2])
+    t = np.array([0.0, 1.0, 2.0, 0.0, 4.0, 0.0])
+    y = np.array([1.0, 3.0, 5.0, 10.0, 8.0, 4.0])
+
+    fitted = fit(codes, t, y, 3)
+
+    np.testing.assert_allclose(fitted["slope"], [2.0, -0.5, 0.0])
+    np.testing.assert_allclose(fitted["last_value"], [5.0, 8.0, 4.0])
+    assert fitted["count"].tolist() == [3, 2, 1]
+
+
+def test_fit_trends_linear_series(series):
+    trends = {trend["company_measurement_id"]: trend for trend in fit_trends(series)}
+
+    assert list(trends) == sorted([RISING, FALLING, FLAT])
+    assert trends[RISING]["slope"] == pytest.approx(2.0)
+    assert trends[FALLING]["slope"] == pytest.approx(-1.0)
+    assert trends[FLAT]["slope"] == pytest.approx(0.0)
+    assert trends[RISING]["trend_score"] > 0 > trends[FALLING]["trend_score"]
+    assert trends[RISING]["forecast"] > trends[RISING]["last_value"]
+    assert (
+        trends[RISING]["origin"]
+        == series.filter(pl.col("company_measurement_id") == RISING)["timestamp"].min()
+    )
+
+
+def test_incremental_update_matches_batch_fit(series):
+    one = series.filter(pl.col("company_measurement_id") == RISING)
+    timestamps, values = one["timestamp"].to_list(), one["value"].to_list()
+
+    state = initial_state(timestamps[0], values[0])
+    for timestamp, value in zip(timestamps[1:], values[1:]):
+        state = update(state, timestamp, value)
+    (batch,) = fit_trends(one)
+
+    for key, value in state.as_dict().items():
+        if isinstance(value, datetime):
+            assert batch[key] == value, key
+        else:
+            assert batch[key] == pytest.approx(value), key
+    assert to_days(state.last_timestamp, state.origin) == pytest.approx(
+        to_days(timestamps[-1], timestamps[0])
+    )
+
+
+@patch(f"{MODULE}.upsert_trends")
+@patch(f"{MODULE}.get_trend_state")
+@patch(f"{MODULE}.fetch_numeric_series")
+def test_update_trend_incremental(mock_fetch, mock_get_state, mock_upsert):
+    state = initial_state(START, 10.0)
+    mock_get_state.return_value = MagicMock(**state.as_dict())
+    session = MagicMock()
+
+    update_trend(session, RISING, START + timedelta(days=1), 12)
+
+    mock_fetch.assert_not_called()
+    ((_, (trend,)), _) = mock_upsert.call_args
+    assert trend["company_measurement_id"] == RISING
+    assert trend["count"] == 2  # noqa: PLR2004
+    assert trend["slope"] == pytest.approx(2.0)
+
+
+@patch(f"{MODULE}.get_engine")
+@patch(f"{MODULE}.upsert_trends")
+@patch(f"{MODULE}.get_trend_state")
+@patch(f"{MODULE}.fetch_numeric_series")
+def test_update_trend_refits_out_of_order_value(
+    mock_fetch, mock_get_state, mock_upsert, mock_get_engine, series
+):
+    mock_get_state.return_value = MagicMock(last_timestamp=START + timedelta(days=9))
+    mock_fetch.return_value = series.filter(pl.col("company_measurement_id") == FALLING)
+
+    update_trend(MagicMock(), FALLING, START + timedelta(days=2), 1.0)
+
+    mock_fetch.assert_called_once_with(mock_get_engine.return_value, [FALLING])
+    ((_, trends), _) = mock_upsert.call_args
+    assert [trend["company_measurement_id"] for trend in trends] == [FALLING]
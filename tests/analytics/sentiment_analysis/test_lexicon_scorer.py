@@ -0,0 +1,80 @@
+from unittest.mock import patch
+
+import pytest
+
+from parma_analytics.analytics.sentiment_analysis.lexicon_scorer import (
+    LexiconSentimentScorer,
+    load_lexicon,
+)
+from parma_analytics.analytics.sentiment_analysis.scorer import NEUTRAL_SCORE
+from parma_analytics.analytics.sentiment_analysis.sentiment_analysis import (
+    ChatGptSentimentScorer,
+    get_scorer,
+)
+
+
+@pytest.fixture(scope="module")
+def scorer() -> LexiconSentimentScorer:
+    return LexiconSentimentScorer(
+        {"good": 2.0, "bad": -2.0, "recommend": 1.0, "rip off": -3.0}
+    )
+
+
+def test_load_lexicon():
+    lexicon = load_lexicon()
+
+    assert lexicon["great"] > 0
+    assert lexicon["terrible"] < 0
+    assert "highly recommend" in lexicon
+
+
+def test_score_texts_polarity(scorer):
+    scores = scorer.score_texts(["good", "bad", "nothing to see here", ""])
+
+    assert scores.tolist() == [7, 3, 5, 5]
+
+
+def test_score_texts_negation_and_intensifiers(scorer):
+    good, not_good, very_good, not_bad = scorer.score_texts(
+        ["good", "this is not good", "very good", "not that bad"]
+    )
+
+    assert not_good < NEUTRAL_SCORE < good < very_good
+    assert not_bad > NEUTRAL_SCORE
+
+
+def test_score_texts_bigrams_replace_unigrams(scorer):
+    polarity = scorer.polarity(["a rip off", "rip", "off", "never a rip off"])
+
+    assert polarity[0] < 0
+    assert polarity[1] == polarity[2] == 0
+    assert polarity[3] > 0
+
+
+def test_score_texts_but_shifts_emphasis(scorer):
+    polarity = scorer.polarity(["good but bad", "bad but good"])
+
+    assert polarity[0] < 0 < polarity[1]
+
+
+def test_score_texts_is_independent_of_batch(scorer):
+    texts = ["good", "not bad", "bad but good", "", "recommend!!"]
+
+    batch = scorer.score_texts(texts).tolist()
+
+    assert batch == [scorer.score_texts([text])[0] for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_score_keeps_ids(scorer):
+    assert await scorer.score({7: "good", 3: "bad"}) == {7: 7, 3: 3}
+    assert await scorer.score({}) == {}
+
+
+def test_get_scorer_selection():
+    with patch.dict("os.environ", {"SENTIMENT_SCORER": "ChatGPT"}):
+        assert isinstance(get_scorer(), ChatGptSentimentScorer)
+    assert isinstance(get_scorer("lexicon"), LexiconSentimentScorer)
+    assert get_scorer("lexicon") is get_scorer("lexicon")
+    with pytest.raises(ValueError):
+        get_scorer("unknown")
@@ -0,0 +1,122 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from parma_analytics.analytics.sentiment_analysis.scorer import SentimentScorer
+from parma_analytics.analytics.sentiment_analysis.sentiment_analysis import (
+    DEFAULT_SCORER,
+    parse_sentiment_scores,
+)
+from parma_analytics.analytics.sentiment_analysis.update_score import (
+    chunk_comments,
+    estimate_tokens,
+    score_comments,
+    update_scores,
+)
+from parma_analytics.db.prod.measurement_value_query import update_sentiment_scores
+
+
+def test_chunk_comments_respects_token_budget():
+    comments = {i: "x" * 40 for i in range(10)}
+    budget = 3 * estimate_tokens("x" * 40)
+
+    chunks = chunk_comments(comments, token_budget=budget)
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert {id for chunk in chunks for id in chunk} == set(comments)
+
+
+def test_chunk_comments_oversized_comment_gets_own_chunk():
+    comments = {1: "short", 2: "x" * 1000, 3: "short"}
+
+    chunks = chunk_comments(comments, token_budget=20)
+
+    assert chunks == [{1: "short"}, {2: "x" * 1000}, {3: "short"}]
+
+
+def test_parse_sentiment_scores_matches_ids():
+    response = 'scores: {"11": 7, "12": "3", "13": 42, "99": 5, "14": "n/a"}'
+
+    scores = parse_sentiment_scores(response, [11, 12, 13, 14])
+
+    assert scores == {11: 7, 12: 3}
+
+
+def test_parse_sentiment_scores_invalid_response():
+    assert parse_sentiment_scores("no json here", [1]) == {}
+    assert parse_sentiment_scores("{not: valid}", [1]) == {}
+
+
+def test_update_sentiment_scores_single_statement():
+    db = MagicMock()
+
+    update_sentiment_scores(db, {1: 7, 2: 3})
+
+    db.execute.assert_called_once()
+    statement = db.execute.call_args.args[0]
+    sql = str(
+        statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    assert "FROM (VALUES (1, 7), (2, 3)) AS v (id, score)" in sql
+
+
+MODULE = "parma_analytics.analytics.sentiment_analysis.update_score"
+
+
+class FakeScorer(SentimentScorer):
+    """Chunked scorer failing for chunks containing a negative comment."""
+
+    name = "fake"
+    chunked = True
+
+    def __init__(self):
+        self.calls = 0
+
+    async def score(self, comments):
+        """Score every comment with 9 unless the chunk contains "bad"."""
+        self.calls += 1
+        if "bad" in comments.values():
+            raise Exception("API down")
+        return {id: 9 for id in comments}
+
+
+@pytest.mark.asyncio
+@patch(f"{MODULE}.CHUNK_TOKEN_BUDGET", 1)
+@patch(f"{MODULE}.update_sentiment_scores")
+@patch(f"{MODULE}.get_session")
+@patch(f"{MODULE}.get_scorer")
+async def test_update_scores(mock_get_scorer, mock_get_session, mock_update):
+    comment_values = [MagicMock(id=1, value="great"), MagicMock(id=2, value="bad")]
+    session = MagicMock()
+    session.query.return_value.filter.return_value.all.return_value = comment_values
+    mock_get_session.return_value.__enter__.return_value = session
+    fake_scorer, fallback_scorer = FakeScorer(), MagicMock()
+    fallback_scorer.score = AsyncMock(return_value={2: 1})
+    mock_get_scorer.side_effect = (
+        lambda name=None: fallback_scorer if name else fake_scorer
+    )
+
+    scores = await update_scores([1, 2, -1, None])
+
+    assert scores == {1: 9, 2: 1}
+    assert fake_scorer.calls == len(comment_values)
+    mock_get_scorer.assert_called_with(DEFAULT_SCORER)
+    fallback_scorer.score.assert_awaited_once_with({2: "bad"})
+    mock_update.assert_called_once_with(session, {1: 9, 2: 1})
+    session.commit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_score_comments_unchunked_scorer_gets_whole_batch():
+    scorer = MagicMock(chunked=False)
+    scorer.name = DEFAULT_SCORER
+    scorer.score = AsyncMock(return_value={1: 8, 2: 2})
+    comments = {1: "great", 2: "bad"}
+
+    scores = await score_comments(comments, scorer=scorer)
+
+    assert scores == {1: 8, 2: 2}
+    scorer.score.assert_awaited_once_with(comments)
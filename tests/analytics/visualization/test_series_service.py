@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import polars as pl
+import pytest
+
+from parma_analytics.analytics.visualization.downsampling import lttb, min_max
+from parma_analytics.analytics.visualization.series_service import (
+    downsample,
+    get_downsampled_series,
+    invalidate_series,
+)
+
+MODULE = "parma_analytics.analytics.visualization.series_service"
+
+
+@pytest.fixture
+def series() -> pl.DataFrame:
+    start = datetime(2021, 1, 1)
+    values = np.sin(np.arange(5000) / 100.0)
+    values[1234] = 10.0
+    return pl.DataFrame(
+        {
+            "timestamp": [start + timedelta(hours=hour) for hour in range(5000)],
+            "value": values,
+        }
+    )
+
+
+def test_lttb_keeps_endpoints_and_budget():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+
+    indices = lttb(x, y, 100)
+
+    assert len(indices) == 100  # noqa: PLR2004
+    assert indices[0] == 0
+    assert indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_small_series_is_kept():
+    assert lttb(np.arange(5.0), np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+    with pytest.raises(ValueError):
+        lttb(np.arange(5.0), np.arange(5.0), 2)
+
+
+def test_min_max_keeps_extremes_of_buckets():
+    x = np.arange(8, dtype=float)
+    y = np.array([1.0, 5.0, 2.0, 0.0, 3.0, 9.0, 4.0, 4.0])
+
+    indices = min_max(x, y, 4)
+
+    assert indices.tolist() == [1, 3, 4, 5]
+
+
+def test_downsample_keeps_spike(series):
+    for method in ("lttb", "minmax"):
+        points = downsample(series, 200, method)
+
+        assert len(points) <= 200  # noqa: PLR2004
+        assert points["value"].max() == pytest.approx(10.0)
+        assert points["timestamp"].is_sorted()
+
+
+@patch(f"{MODULE}.get_engine")
+@patch(f"{MODULE}.fetch_numeric_series")
+def test_get_downsampled_series_is_cached_until_invalidated(
+    mock_fetch, mock_get_engine, series
+):
+    mock_fetch.return_value = series
+
+    first = get_downsampled_series(42, max_points=100)
+    second = get_downsampled_series(42, max_points=100)
+    other_budget = get_downsampled_series(42, max_points=50)
+    invalidate_series(42)
+    refetched = get_downsampled_series(42, max_points=100)
+
+    assert first is second
+    assert first.total_points == len(series)
+    assert len(first.values) == len(first.timestamps) <= 100  # noqa: PLR2004
+    assert len(other_budget.values) <= 50  # noqa: PLR2004
+    assert refetched is not first
+    assert mock_fetch.call_count == 3  # noqa: PLR2004
+    mock_fetch.assert_called_with(mock_get_engine.return_value, [42], None, None)
+
+
+def test_get_downsampled_series_unknown_method():
+    with pytest.raises(ValueError):
+        get_downsampled_series(1, method="mean")
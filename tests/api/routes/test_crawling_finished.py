@@ -77,6 +77,40 @@ def test_crawling_finished_with_errors(client):
     assert response_json["return_message"] == "Notified about crawling finished"
 
 
+def test_crawling_finished_shard(client):
+    test_data = {"task_id": 12345, "shard_id": 2, "errors": None}
+
+    with patch.object(
+        MiningModuleManager, "set_task_status_success_with_id"
+    ) as mock_method:
+        response = client.post(
+            "/crawling-finished", json=test_data, headers=mock_authorization_header
+        )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    mock_method.assert_called_once_with(12345, None, 2, {})
+
+
+def test_crawling_finished_company_errors(client):
+    test_data = {
+        "task_id": 12345,
+        "errors": {
+            "7": {"error_type": "Type1", "error_description": "Description1"},
+            "general": {"error_type": "Type2", "error_description": "Description2"},
+        },
+    }
+
+    with patch.object(
+        MiningModuleManager, "set_task_status_success_with_id"
+    ) as mock_method:
+        client.post(
+            "/crawling-finished", json=test_data, headers=mock_authorization_header
+        )
+
+    # only errors reported by company id mark a company as failed
+    assert mock_method.call_args.args[3] == {7: ("Type1", "Description1")}
+
+
 def test_crawling_finished_exception_handling(client):
     test_data = {
         "task_id": 12345,
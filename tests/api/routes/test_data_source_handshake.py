@@ -3,8 +3,8 @@ import logging
 from http import HTTPStatus
 from unittest.mock import Mock, patch
 
+import httpx
 import pytest
-import requests
 from fastapi.testclient import TestClient
 
 from parma_analytics.api import app
@@ -12,6 +12,8 @@ from parma_analytics.db.mining.models import NormalizationSchemaIn
 
 logger = logging.getLogger(__name__)
 
+REQUEST = "parma_analytics.api.routes.data_source_handshake.request"
+
 
 @pytest.fixture
 def client():
@@ -37,14 +39,14 @@ def mock_requests_get():
             "normalization_map": "{'Source': 'DataSource'}",
         },
     )
-    with patch("requests.get", return_value=mock_response) as mock:
+    with patch(REQUEST, return_value=mock_response) as mock:
         yield mock
 
 
 @pytest.fixture
 def mock_requests_get_failure_400_bad_request():
     mock_response = Mock(status_code=HTTPStatus.BAD_REQUEST)
-    with patch("requests.get", return_value=mock_response) as mock:
+    with patch(REQUEST, return_value=mock_response) as mock:
         yield mock
 
 
@@ -121,9 +123,7 @@ def test_perform_handshake_request_exception(
     mock_data_source_id = 123
     mock_invocation_endpoint = "https://example.com/data-source"
 
-    with patch(
-        "requests.get", side_effect=requests.exceptions.RequestException("Error")
-    ):
+    with patch(REQUEST, side_effect=httpx.ConnectError("Error")):
         response = client.get(
             f"/handshake?invocation_endpoint={mock_invocation_endpoint}&data_source_id={mock_data_source_id}"
         )
@@ -142,7 +142,7 @@ def test_perform_handshake_success_with_string_response(
     )
 
     with patch(
-        "requests.get",
+        REQUEST,
         return_value=Mock(
             status_code=HTTPStatus.OK, json=lambda: mock_response_json_string
         ),
@@ -0,0 +1,21 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette import status
+
+from parma_analytics.api import app
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_refresh_identifiers_endpoint_success(client: TestClient):
+    with patch(
+        "parma_analytics.api.routes.identifier_refresh.refresh_expiring_identifiers"
+    ) as mock_refresh:
+        response = client.get("/refresh-identifiers")
+        assert response.status_code == status.HTTP_200_OK
+        mock_refresh.assert_called_once()
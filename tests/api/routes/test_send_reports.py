@@ -1,3 +1,4 @@
+from datetime import date, datetime
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -5,6 +6,9 @@ from fastapi.testclient import TestClient
 from starlette import status
 
 from parma_analytics.api import app
+from parma_analytics.reporting.report_job import ReportJobProgress
+
+MODULE = "parma_analytics.api.routes.send_reports"
 
 
 @pytest.fixture
@@ -12,10 +16,48 @@ def client():
     return TestClient(app)
 
 
-@patch(
-    "parma_analytics.api.routes.send_reports.send_reports", MagicMock(return_value=None)
-)
-def test_weekly_reports(client: TestClient):
+@patch(f"{MODULE}.run_report_job")
+@patch(f"{MODULE}.create_report_job", MagicMock(return_value=3))
+def test_weekly_reports(mock_run_report_job: MagicMock, client: TestClient):
     response = client.get("/weekly-reports")
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.json()["job_id"] == 3  # noqa: PLR2004
+    mock_run_report_job.assert_called_once_with(3)
+
+
+@patch(f"{MODULE}.create_report_job", MagicMock(side_effect=Exception("db down")))
+def test_weekly_reports_error(client: TestClient):
+    response = client.get("/weekly-reports")
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+def test_weekly_reports_status(client: TestClient):
+    progress = ReportJobProgress(
+        job_id=3,
+        period_start=date(2024, 1, 1),
+        status="RUNNING",
+        total_users=10,
+        sent=6,
+        failed=1,
+        skipped=2,
+        pending=1,
+        started_at=datetime(2024, 1, 1, 8),
+        finished_at=None,
+        users_per_second=2.5,
+        failures=[(4, "bounced")],
+    )
+    with patch(f"{MODULE}.get_report_job_progress", return_value=progress):
+        response = client.get("/weekly-reports/status?job_id=3")
+
     assert response.status_code == status.HTTP_200_OK
-    assert response.text == "Weekly reports sent successfully"
+    body = response.json()
+    assert body["skipped"] == 2  # noqa: PLR2004
+    assert body["pending"] == 1
+    assert body["failures"] == [{"user_id": 4, "error": "bounced"}]
+
+
+def test_weekly_reports_status_not_found(client: TestClient):
+    with patch(f"{MODULE}.get_report_job_progress", return_value=None):
+        response = client.get("/weekly-reports/status")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
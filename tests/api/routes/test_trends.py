@@ -0,0 +1,26 @@
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from starlette import status
+
+from parma_analytics.api.routes.trends import _run_trend_inference
+
+
+def test_trends_endpoint(client: TestClient):
+    with patch(
+        "parma_analytics.api.routes.trends._run_trend_inference"
+    ) as mock_run_trend_inference:
+        response = client.get("/trends")
+
+    assert response.status_code == status.HTTP_200_OK
+    mock_run_trend_inference.assert_called_once()
+
+
+def test_run_trend_inference_logs_errors():
+    with patch(
+        "parma_analytics.api.routes.trends.run_trend_inference",
+        side_effect=Exception("database down"),
+    ) as mock_run_trend_inference:
+        _run_trend_inference()
+
+    mock_run_trend_inference.assert_called_once()
@@ -0,0 +1,41 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from starlette import status
+
+from parma_analytics.analytics.visualization.series_service import DownsampledSeries
+
+
+def test_read_series(client: TestClient):
+    series = DownsampledSeries(
+        company_measurement_id=7,
+        method="minmax",
+        total_points=1000,
+        timestamps=[datetime(2024, 1, 1), datetime(2024, 1, 2)],
+        values=[1.0, 2.5],
+    )
+    with patch(
+        "parma_analytics.api.routes.visualization.get_downsampled_series",
+        return_value=series,
+    ) as mock_get_series:
+        response = client.get(
+            "/visualization/series/7",
+            params={"max_points": 2 + 1, "method": "minmax", "start": "2024-01-01"},
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "company_measurement_id": 7,
+        "method": "minmax",
+        "total_points": 1000,
+        "timestamps": ["2024-01-01T00:00:00", "2024-01-02T00:00:00"],
+        "values": [1.0, 2.5],
+    }
+    mock_get_series.assert_called_once_with(7, datetime(2024, 1, 1), None, 3, "minmax")
+
+
+def test_read_series_validates_budget(client: TestClient):
+    response = client.get("/visualization/series/7", params={"max_points": 1})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
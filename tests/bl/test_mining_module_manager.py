@@ -1,5 +1,8 @@
+import asyncio
+import json
 import logging
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
 from unittest.mock import ANY, AsyncMock, MagicMock, patch
 
 import httpx
@@ -7,14 +10,14 @@ import pytest
 from httpx import AsyncClient
 from sqlalchemy.orm import sessionmaker
 
+from parma_analytics.bl.data_source_helper import DataSourceSnapshot
 from parma_analytics.bl.mining_module_manager import MiningModuleManager
 from parma_analytics.bl.scraping_model import ScrapingPayloadModel
+from parma_analytics.db.prod.company_data_source_identifiers_query import (
+    DataSourceIdentifiers,
+)
 from parma_analytics.db.prod.engine import get_engine
-from parma_analytics.db.prod.models.company import Company
 from parma_analytics.db.prod.models.company_data_source import CompanyDataSource
-from parma_analytics.db.prod.models.company_data_source_identifier import (
-    CompanyDataSourceIdentifier,
-)
 from parma_analytics.db.prod.models.types import (
     DataSource,
     ScheduledTask,
@@ -94,42 +97,31 @@ def test_manage_session_exception(mock_get_engine, mock_session_class):
     mock_session.close.assert_called_once()
 
 
-@patch("parma_analytics.bl.mining_module_manager.get_company_id_bll")
-@patch("parma_analytics.bl.mining_module_manager.call_discover_endpoint")
-@patch("parma_analytics.bl.mining_module_manager.process_discovery_response")
-@patch(
-    "parma_analytics.bl.mining_module_manager.MiningModuleManager._fetch_identifiers"
-)
-def test_create_payload_success(
-    mock_fetch_identifiers,
-    mock_process_discovery_response,
-    mock_call_discover_endpoint,
-    mock_get_company_id_bll,
-):
-    # Setup
-    mock_fetch_identifiers.return_value = {"some_key": ["identifier1", "identifier2"]}
-
-    task_id = 123
-    companies = [
+def company_data_sources(*company_ids: int) -> list[CompanyDataSource]:
+    return [
         CompanyDataSource(
-            id=1,
-            company_id=1,
+            id=company_id * 10,
+            company_id=company_id,
             data_source_id=1,
             is_data_source_active=True,
             health_status="UP",
             created_at=datetime.now(),
             modified_at=datetime.now(),
-        ),
-        CompanyDataSource(
-            id=2,
-            company_id=2,
-            data_source_id=1,
-            is_data_source_active=True,
-            health_status="UP",
-            created_at=datetime.now(),
-            modified_at=datetime.now(),
-        ),
+        )
+        for company_id in company_ids
     ]
+
+
+@patch("parma_analytics.bl.mining_module_manager.get_data_source_identifiers_bll")
+@patch("parma_analytics.bl.mining_module_manager.discover_identifiers")
+def test_create_payload_success(mock_discover_identifiers, mock_get_identifiers):
+    # Setup
+    mock_identifiers = {"some_key": ["identifier1", "identifier2"]}
+    mock_get_identifiers.return_value = DataSourceIdentifiers(
+        identifiers={1: mock_identifiers, 2: mock_identifiers}
+    )
+    task_id = 123
+    companies = company_data_sources(1, 2)
     data_source = DataSource(id=1, source_name="DataSource1")
 
     mining_module_manager = MiningModuleManager()
@@ -139,193 +131,106 @@ def test_create_payload_success(
 
     # Assertions
     assert isinstance(payload, ScrapingPayloadModel)
-    assert payload.companies is not None
     assert payload.task_id == task_id
-    assert all(str(company.company_id) in payload.companies for company in companies)
-    for company in companies:
-        assert payload.companies[str(company.company_id)] == {
-            "some_key": ["identifier1", "identifier2"]
-        }
+    assert payload.companies == {"1": mock_identifiers, "2": mock_identifiers}
 
-    mock_fetch_identifiers.assert_called()
-    mock_get_company_id_bll.assert_not_called()
-    mock_call_discover_endpoint.assert_not_called()
-    mock_process_discovery_response.assert_not_called()
+    # the identifiers are loaded for all companies at once
+    mock_get_identifiers.assert_called_once_with(data_source.id)
+    mock_discover_identifiers.assert_not_called()
 
 
-@patch("parma_analytics.bl.mining_module_manager.get_company_id_bll")
-@patch("parma_analytics.bl.mining_module_manager.call_discover_endpoint")
-@patch("parma_analytics.bl.mining_module_manager.process_discovery_response")
-@patch(
-    "parma_analytics.bl.mining_module_manager.MiningModuleManager._fetch_identifiers"
-)
-def test_create_payload_discovery(
-    mock_fetch_identifiers,
-    mock_process_discovery_response,
-    mock_call_discover_endpoint,
-    mock_get_company_id_bll,
-    caplog,
-):
+@patch("parma_analytics.bl.mining_module_manager.get_data_source_identifiers_bll")
+@patch("parma_analytics.bl.mining_module_manager.discover_identifiers")
+def test_create_payload_discovery(mock_discover_identifiers, mock_get_identifiers):
     # Setup
-    mock_fetch_identifiers.side_effect = [None, {"some_key": ["identifier1"]}]
-    mock_get_company_id_bll.side_effect = [
-        Company(name="Test Company Name"),
-        Company(name="Test Company Name"),
-    ]
-
-    task_id = 123
-    companies = [
-        CompanyDataSource(
-            id=1,
-            company_id=1,
-            data_source_id=1,
-            is_data_source_active=True,
-            health_status="UP",
-            created_at=datetime.now(),
-            modified_at=datetime.now(),
-        ),
+    mock_get_identifiers.side_effect = [
+        DataSourceIdentifiers(missing=[1]),
+        DataSourceIdentifiers(identifiers={1: {"some_key": ["identifier1"]}}),
     ]
+    mock_discover_identifiers.return_value = {1}
+    companies = company_data_sources(1)
     data_source = DataSource(id=1, source_name="DataSource1")
 
     mining_module_manager = MiningModuleManager()
 
     # Run the test
-    with caplog.at_level(logging.INFO):
-        payload = mining_module_manager._create_payload(task_id, companies, data_source)
+    payload = mining_module_manager._create_payload(123, companies, data_source)
 
     # Assertions
-    assert isinstance(payload, ScrapingPayloadModel)
-    assert payload.companies is not None
-    assert payload.task_id == task_id
-    assert all(str(company.company_id) in payload.companies for company in companies)
-    for company in companies:
-        assert payload.companies[str(company.company_id)] == {
-            "some_key": ["identifier1"]
-        }
-
-    mock_fetch_identifiers.assert_called()
-    mock_get_company_id_bll.assert_called()
-    mock_call_discover_endpoint.assert_called()
-    mock_process_discovery_response.assert_called()
+    assert payload.companies == {"1": {"some_key": ["identifier1"]}}
+    mock_discover_identifiers.assert_called_once_with(data_source, {1: 10})
+    assert mock_get_identifiers.call_count == 2  # noqa: PLR2004
 
 
-@patch("parma_analytics.bl.mining_module_manager.get_company_id_bll")
-@patch("parma_analytics.bl.mining_module_manager.call_discover_endpoint")
-@patch("parma_analytics.bl.mining_module_manager.process_discovery_response")
-@patch(
-    "parma_analytics.bl.mining_module_manager.MiningModuleManager._fetch_identifiers"
-)
+@patch("parma_analytics.bl.mining_module_manager.get_data_source_identifiers_bll")
+@patch("parma_analytics.bl.mining_module_manager.discover_identifiers")
 def test_create_payload_discovery_no_company(
-    mock_fetch_identifiers,
-    mock_process_discovery_response,
-    mock_call_discover_endpoint,
-    mock_get_company_id_bll,
-    caplog,
+    mock_discover_identifiers, mock_get_identifiers
 ):
     # Setup
-    mock_fetch_identifiers.side_effect = [None, {"some_key": ["identifier1"]}]
-    mock_get_company_id_bll.side_effect = [None, None]
-
-    task_id = 123
-    companies = [
-        CompanyDataSource(
-            id=1,
-            company_id=1,
-            data_source_id=1,
-            is_data_source_active=True,
-            health_status="UP",
-            created_at=datetime.now(),
-            modified_at=datetime.now(),
-        ),
-    ]
+    mock_get_identifiers.return_value = DataSourceIdentifiers(missing=[1])
+    mock_discover_identifiers.return_value = set()
+    companies = company_data_sources(1)
     data_source = DataSource(id=1, source_name="DataSource1")
 
     mining_module_manager = MiningModuleManager()
 
     # Run the test
-    with caplog.at_level(logging.INFO):
-        payload = mining_module_manager._create_payload(task_id, companies, data_source)
+    payload = mining_module_manager._create_payload(123, companies, data_source)
 
     # Assertions
-    log_messages = [record.message for record in caplog.records]
-    assert f"Company not found with id: {1}" in log_messages[0]
-    assert isinstance(payload, ScrapingPayloadModel)
-    assert payload.task_id == task_id
     assert payload.companies == {}
+    mock_discover_identifiers.assert_called_once()
+    # nothing was discovered, the identifiers are not loaded again
+    mock_get_identifiers.assert_called_once()
 
-    mock_fetch_identifiers.assert_called()
-    mock_get_company_id_bll.assert_called()
 
-
-@patch("parma_analytics.bl.mining_module_manager.get_company_id_bll")
-@patch("parma_analytics.bl.mining_module_manager.call_discover_endpoint")
-@patch("parma_analytics.bl.mining_module_manager.process_discovery_response")
-@patch(
-    "parma_analytics.bl.mining_module_manager.MiningModuleManager._fetch_identifiers"
-)
+@patch("parma_analytics.bl.mining_module_manager.get_data_source_identifiers_bll")
+@patch("parma_analytics.bl.mining_module_manager.discover_identifiers")
 def test_create_payload_discovery_first_none(
-    mock_fetch_identifiers,
-    mock_process_discovery_response,
-    mock_call_discover_endpoint,
-    mock_get_company_id_bll,
+    mock_discover_identifiers, mock_get_identifiers
 ):
     # Setup
     mock_identifiers = {"some_key": ["identifier1", "identifier2"]}
-    mock_fetch_identifiers.side_effect = [None, mock_identifiers, mock_identifiers]
-    company_entity_mock = MagicMock()
-    company_entity_mock.name = "Test Company Name"
-    mock_get_company_id_bll.return_value = company_entity_mock
-
-    task_id = 123
-    companies = [
-        CompanyDataSource(
-            id=1,
-            company_id=1,
-            data_source_id=1,
-            is_data_source_active=True,
-            health_status="Good",
-            created_at=datetime.now(),
-            modified_at=datetime.now(),
+    stale_identifiers = {"some_key": ["stale"]}
+    mock_get_identifiers.side_effect = [
+        DataSourceIdentifiers(
+            identifiers={2: mock_identifiers},
+            missing=[1],
+            expired=[3],
+            stale={3: stale_identifiers},
         ),
-        CompanyDataSource(
-            id=2,
-            company_id=2,
-            data_source_id=1,
-            is_data_source_active=True,
-            health_status="Good",
-            created_at=datetime.now(),
-            modified_at=datetime.now(),
+        DataSourceIdentifiers(
+            identifiers={1: mock_identifiers, 2: mock_identifiers},
+            expired=[3],
+            stale={3: stale_identifiers},
         ),
     ]
+    mock_discover_identifiers.return_value = {1}
+    companies = company_data_sources(1, 2, 3)
     data_source = DataSource(id=1, source_name="DataSource1")
 
     mining_module_manager = MiningModuleManager()
 
     # Run the test
-    payload = mining_module_manager._create_payload(task_id, companies, data_source)
+    payload = mining_module_manager._create_payload(123, companies, data_source)
 
     # Assertions
-    assert isinstance(payload, ScrapingPayloadModel)
-    assert payload.companies is not None
-    assert payload.task_id == task_id
-    assert all(str(company.company_id) in payload.companies for company in companies)
-    for company in companies:
-        assert payload.companies[str(company.company_id)] == mock_identifiers
-
-    mock_fetch_identifiers.assert_called()
-    mock_get_company_id_bll.assert_called()
-    mock_call_discover_endpoint.assert_called()
-    mock_process_discovery_response.assert_called()
+    assert payload.companies == {
+        "1": mock_identifiers,
+        "2": mock_identifiers,
+        "3": stale_identifiers,
+    }
+    # only missing companies are discovered, expired ones are refreshed in the
+    # background and their stale identifiers are used meanwhile
+    mock_discover_identifiers.assert_called_once_with(data_source, {1: 10})
 
 
 @pytest.mark.asyncio
-@patch("httpx.AsyncClient")
-async def test_trigger_success(mock_async_client_class, mining_module_manager):
+@patch("parma_analytics.bl.mining_module_manager.async_request")
+async def test_trigger_success(mock_async_request, mining_module_manager):
     # Setup
-    mock_async_client_instance = (
-        mock_async_client_class.return_value.__aenter__.return_value
-    )
-    mock_async_client_instance.post.return_value = AsyncMock(status_code=200)
+    mock_async_request.return_value = MagicMock(status_code=200)
     mock_data_source = MagicMock(spec=DataSource)
     mock_data_source.id = 1
     mock_data_source.name = "name"
@@ -341,11 +246,12 @@ async def test_trigger_success(mock_async_client_class, mining_module_manager):
     await mining_module_manager._trigger(mock_data_source, task_id)
 
     # Assertions
-    mock_async_client_instance.post.assert_awaited_once_with(
+    mock_async_request.assert_awaited_once_with(
+        "POST",
         invocation_endpoint,
+        verify=False,
         headers=ANY,
-        content='{"task_id":123,"companies":{}}',
-        timeout=None,
+        content='{"task_id":123,"companies":{},"shard_id":null}',
     )
 
 
@@ -373,19 +279,16 @@ async def test_trigger_success(mock_async_client_class, mining_module_manager):
         ),
     ],
 )
-@patch("httpx.AsyncClient")
+@patch("parma_analytics.bl.mining_module_manager.async_request")
 async def test_trigger_errors(
-    mock_async_client_class,
+    mock_async_request,
     mining_module_manager,
     caplog,
     exception,
     expected_error_log_substring,
 ):
     # Setup
-    mock_async_client_instance = (
-        mock_async_client_class.return_value.__aenter__.return_value
-    )
-    mock_async_client_instance.post.side_effect = exception
+    mock_async_request.side_effect = exception
     mock_data_source = MagicMock(spec=DataSource)
     mock_data_source.id = 1
     mock_data_source.name = "name"
@@ -434,137 +337,10 @@ async def test_trigger_with_invalid_endpoint(mock_ensure_scheme, caplog):
     assert any(expected_error_message in record.message for record in caplog.records)
 
 
-@patch(
-    "parma_analytics.bl.mining_module_manager.get_company_data_source_identifiers_bll"
-)
-def test_fetch_identifiers_success(mock_get_identifiers, mining_module_manager):
-    # Setup
-    company_id = 1
-    data_source = DataSource(id=2, source_name="TestDataSource")
-
-    mock_identifier = CompanyDataSourceIdentifier(
-        id=1,
-        company_data_source_id=1,
-        identifier_type="AUTOMATICALLY_DISCOVERED",
-        property="test_property",
-        value="test_value",
-        validity=datetime.now() + timedelta(days=1),
-    )
-
-    mock_get_identifiers.return_value = [mock_identifier]
-
-    # Run the test
-    result = mining_module_manager._fetch_identifiers(company_id, data_source)
-
-    # Assertions
-    assert isinstance(result, dict)
-    assert "test_property" in result
-    assert result["test_property"] == ["test_value"]
-    mock_get_identifiers.assert_called_once_with(company_id, data_source.id)
-
-
-@patch(
-    "parma_analytics.bl.mining_module_manager.get_company_data_source_identifiers_bll"
-)
-def test_fetch_identifiers_no_identifier(mock_get_identifiers, mining_module_manager):
-    # Setup
-    company_id = 1
-    data_source = DataSource(id=2, source_name="TestDataSource")
-
-    mock_get_identifiers.return_value = None
-
-    # Run the test
-    result = mining_module_manager._fetch_identifiers(company_id, data_source)
-
-    # Assertions
-    assert isinstance(result, dict)
-    assert result == {}
-    mock_get_identifiers.assert_called_once_with(company_id, data_source.id)
-
-
-@patch(
-    "parma_analytics.bl.mining_module_manager.get_company_data_source_identifiers_bll"
-)
-@patch("parma_analytics.bl.mining_module_manager.rediscover_identifiers")
-def test_fetch_identifiers_empty_identifier(
-    mock_rediscover_identifiers, mock_get_identifiers, mining_module_manager
-):
-    # Setup
-    company_id = 1
-    data_source = DataSource(id=2, source_name="TestDataSource")
-
-    mock_identifier = CompanyDataSourceIdentifier(
-        id=1,
-        company_data_source_id=1,
-        identifier_type="AUTOMATICALLY_DISCOVERED",
-        property="test_property",
-        value="test_value",
-        validity=datetime.now() + timedelta(days=1),
-    )
-
-    # First call to returns an empty list, triggering recursion
-    # Second call returns a non-empty list, ending the recursion
-    get_identifiers_return_array = [[], [mock_identifier]]
-    mock_get_identifiers.side_effect = get_identifiers_return_array
-
-    # Run the test
-    result = mining_module_manager._fetch_identifiers(company_id, data_source)
-
-    # Assertions
-    assert len(result) > 0
-    mock_rediscover_identifiers.assert_called_once_with(data_source, company_id)
-    assert mock_get_identifiers.call_count == len(get_identifiers_return_array)
-
-
-@patch(
-    "parma_analytics.bl.mining_module_manager.get_company_data_source_identifiers_bll"
-)
-@patch("parma_analytics.bl.mining_module_manager.rediscover_identifiers")
-def test_fetch_identifiers_with_expired_identifiers(
-    mock_rediscover_identifiers, mock_get_identifiers, mining_module_manager
-):
-    # Setup
-    company_id = 123
-    data_source = DataSource(id=456, source_name="TestDataSource")
-
-    # First call returns an expired identifier, second call returns a valid identifier
-    expired_identifier = CompanyDataSourceIdentifier(
-        id=1,
-        company_data_source_id=company_id,
-        identifier_type="AUTOMATICALLY_DISCOVERED",
-        property="test_property",
-        value="expired_value",
-        validity=datetime.now() - timedelta(days=1),
-    )
-
-    valid_identifier = CompanyDataSourceIdentifier(
-        id=2,
-        company_data_source_id=company_id,
-        identifier_type="AUTOMATICALLY_DISCOVERED",
-        property="test_property",
-        value="valid_value",
-        validity=datetime.now() + timedelta(days=1),
-    )
-
-    # First call with expired identifier
-    # Second call with valid identifier
-    get_identifiers_return_array = [[expired_identifier], [valid_identifier]]
-    mock_get_identifiers.side_effect = get_identifiers_return_array
-
-    # Run the test
-    result = mining_module_manager._fetch_identifiers(company_id, data_source)
-
-    # Assertions
-    assert len(result) > 0
-    assert result["test_property"] == ["valid_value"]
-    mock_rediscover_identifiers.assert_called_once_with(data_source, company_id)
-    assert mock_get_identifiers.call_count == len(get_identifiers_return_array)
-
-
-@patch("httpx.AsyncClient")
+@patch("parma_analytics.bl.mining_module_manager.async_request")
 @patch("parma_analytics.bl.mining_module_manager.MiningModuleManager._create_payload")
 async def test_trigger_no_payload(
-    mock_create_payload, mock_async_client_class, mining_module_manager, caplog
+    mock_create_payload, mock_async_request, mining_module_manager, caplog
 ):
     # Setup
     scraping_payload = ScrapingPayloadModel(task_id=123, companies={})
@@ -642,6 +418,225 @@ def test_set_task_status_success_with_id_failure_task_empty(
     mock_session.rollback.assert_called()
 
 
+@patch("parma_analytics.bl.mining_module_manager.create_company_retry_task")
+@patch("parma_analytics.bl.mining_module_manager.finish_task_companies")
+@patch("parma_analytics.bl.mining_module_manager.finish_task_shard")
+@patch(
+    "parma_analytics.bl.mining_module_manager.get_task_shard_status",
+    return_value="PENDING",
+)
+@patch("parma_analytics.bl.mining_module_manager.MiningModuleManager._manage_session")
+def test_set_task_status_success_with_shards(
+    mock_manage_session,
+    _mock_get_shard_status,
+    mock_finish_shard,
+    mock_finish_companies,
+    mock_create_retry,
+):
+    # Setup
+    mock_session = MagicMock()
+    mock_task = MagicMock(spec=ScheduledTask)
+    mock_task.task_id = 123
+    mock_task.status = "PROCESSING"
+    mock_query = mock_session.query.return_value.filter.return_value
+    mock_query.with_for_update.return_value.first.return_value = mock_task
+    mock_manage_session.return_value.__enter__.return_value = mock_session
+    mock_finish_shard.side_effect = [
+        None,
+        ['{"1": "error"}', None, '{"3": "error"}'],
+    ]
+
+    # Run the test, the task completes with its last shard
+    MiningModuleManager.set_task_status_success_with_id(123, None, shard_id=0)
+    assert mock_task.status == "PROCESSING"
+
+    mock_create_retry.assert_not_called()
+
+    MiningModuleManager.set_task_status_success_with_id(
+        123, '{"3": "error"}', 2, {3: ("Type", "error")}
+    )
+
+    # Assertions
+    mock_finish_shard.assert_called_with(mock_session, 123, 2, '{"3": "error"}')
+    mock_finish_companies.assert_called_with(
+        mock_session, 123, {3: ("Type", "error")}, 2
+    )
+    assert mock_task.status == "SUCCESS"
+    assert json.loads(mock_task.result_summary) == {"1": "error", "3": "error"}
+    # the failed companies are retried once the whole task finished
+    mock_create_retry.assert_called_once_with(mock_session, mock_task, ANY)
+
+
+@patch("parma_analytics.bl.mining_module_manager.create_company_retry_task")
+@patch("parma_analytics.bl.mining_module_manager.finish_task_companies")
+@patch(
+    "parma_analytics.bl.mining_module_manager.get_finished_shard_summaries",
+    return_value=['{"1": "error"}'],
+)
+@patch("parma_analytics.bl.mining_module_manager.MiningModuleManager._manage_session")
+def test_set_task_status_success_keeps_finished_shard_summaries(
+    mock_manage_session, _mock_get_summaries, _mock_finish_companies, _mock_retry
+):
+    # Setup
+    mock_session = MagicMock()
+    mock_task = MagicMock(spec=ScheduledTask)
+    mock_task.task_id = 123
+    mock_task.status = "PROCESSING"
+    mock_query = mock_session.query.return_value.filter.return_value
+    mock_query.with_for_update.return_value.first.return_value = mock_task
+    mock_manage_session.return_value.__enter__.return_value = mock_session
+
+    # Run the test, the task was dispatched unsharded after some shards finished
+    MiningModuleManager.set_task_status_success_with_id(123, '{"3": "error"}')
+
+    # Assertions
+    assert mock_task.status == "SUCCESS"
+    assert json.loads(mock_task.result_summary) == {"1": "error", "3": "error"}
+
+
+@pytest.mark.parametrize(
+    "task_status, shard_id, shard_status",
+    [
+        ("SUCCESS", None, None),
+        ("SUCCESS", 1, "FINISHED"),
+        ("PROCESSING", 1, "FINISHED"),
+    ],
+)
+@patch("parma_analytics.bl.mining_module_manager.finish_task_companies")
+@patch("parma_analytics.bl.mining_module_manager.MiningModuleManager._manage_session")
+def test_set_task_status_success_duplicate_callback(
+    mock_manage_session,
+    mock_finish_companies,
+    task_status,
+    shard_id,
+    shard_status,
+):
+    # Setup
+    mock_session = MagicMock()
+    mock_task = MagicMock(spec=ScheduledTask)
+    mock_task.task_id = 123
+    mock_task.status = task_status
+    mock_query = mock_session.query.return_value.filter.return_value
+    mock_query.with_for_update.return_value.first.return_value = mock_task
+    mock_manage_session.return_value.__enter__.return_value = mock_session
+
+    # Run the test, the callback of a finished task or shard is repeated
+    with patch(
+        "parma_analytics.bl.mining_module_manager.get_task_shard_status",
+        return_value=shard_status,
+    ), patch(
+        "parma_analytics.bl.mining_module_manager.finish_task_shard"
+    ) as mock_finish_shard, patch(
+        "parma_analytics.bl.mining_module_manager.create_company_retry_task"
+    ) as mock_create_retry:
+        MiningModuleManager.set_task_status_success_with_id(
+            123, '{"3": "error"}', shard_id, {3: ("Type", "error")}
+        )
+
+    # Assertions
+    assert mock_task.status == task_status
+    mock_finish_companies.assert_not_called()
+    mock_finish_shard.assert_not_called()
+    mock_create_retry.assert_not_called()
+
+
+@patch("parma_analytics.bl.mining_module_manager.PAYLOAD_SHARD_SIZE", 2)
+@patch("parma_analytics.bl.mining_module_manager.record_task_companies")
+@patch("parma_analytics.bl.mining_module_manager.create_task_shards", return_value=0)
+@patch("parma_analytics.bl.mining_module_manager.fail_undispatched_companies")
+@patch("parma_analytics.bl.mining_module_manager.get_session")
+def test_shard_payload(
+    mock_get_session, mock_fail_companies, mock_create_shards, mock_record_companies
+):
+    # Setup
+    companies = {str(i): {"name": [f"c{i}"]} for i in range(5)}
+    payload = ScrapingPayloadModel(task_id=123, companies=companies)
+
+    # Run the test
+    shards = [
+        json.loads(shard) for shard in MiningModuleManager()._shard_payload(payload)
+    ]
+
+    # Assertions
+    assert [shard["shard_id"] for shard in shards] == [0, 1, 2]
+    assert [list(shard["companies"]) for shard in shards] == [
+        ["0", "1"],
+        ["2", "3"],
+        ["4"],
+    ]
+    session = mock_get_session.return_value.__enter__.return_value
+    mock_fail_companies.assert_called_once_with(session, 123, [0, 1, 2, 3, 4])
+    mock_create_shards.assert_called_once_with(session, 123, [2, 2, 1])
+    # the companies are recorded with their shard
+    assert [call.args[2:] for call in mock_record_companies.call_args_list] == [
+        ([0, 1], 0),
+        ([2, 3], 1),
+        ([4], 2),
+    ]
+
+
+@patch("parma_analytics.bl.mining_module_manager.PAYLOAD_SHARD_SIZE", 2)
+@patch("parma_analytics.bl.mining_module_manager.record_task_companies")
+@patch("parma_analytics.bl.mining_module_manager.create_task_shards", return_value=2)
+@patch("parma_analytics.bl.mining_module_manager.fail_undispatched_companies")
+@patch("parma_analytics.bl.mining_module_manager.get_session")
+def test_shard_payload_after_finished_shards(
+    _mock_get_session, _mock_fail_companies, _mock_create_shards, mock_record_companies
+):
+    companies = {str(i): {} for i in range(3)}
+    payload = ScrapingPayloadModel(task_id=123, companies=companies)
+
+    shards = [
+        json.loads(shard) for shard in MiningModuleManager()._shard_payload(payload)
+    ]
+
+    # the shards that finished before the task timed out keep their ids
+    assert [shard["shard_id"] for shard in shards] == [2, 3]
+    assert [call.args[3] for call in mock_record_companies.call_args_list] == [2, 3]
+
+
+@patch("parma_analytics.bl.mining_module_manager.record_task_companies")
+@patch("parma_analytics.bl.mining_module_manager.create_task_shards", return_value=0)
+@patch("parma_analytics.bl.mining_module_manager.fail_undispatched_companies")
+@patch("parma_analytics.bl.mining_module_manager.get_session")
+def test_shard_payload_small_payload_is_not_sharded(
+    mock_get_session, mock_fail_companies, mock_create_shards, mock_record_companies
+):
+    payload = ScrapingPayloadModel(task_id=123, companies={"1": {}})
+
+    shards = MiningModuleManager()._shard_payload(payload)
+
+    session = mock_get_session.return_value.__enter__.return_value
+    assert shards == [payload.model_dump_json()]
+    # pending companies of the task that are left out of the payload are failed
+    mock_fail_companies.assert_called_once_with(session, 123, [1])
+    mock_create_shards.assert_called_once_with(session, 123, [])
+    mock_record_companies.assert_called_once_with(session, 123, [1], None)
+
+
+@patch("parma_analytics.bl.mining_module_manager.get_task_company_statuses")
+@patch("parma_analytics.bl.mining_module_manager.get_session")
+@patch("parma_analytics.bl.mining_module_manager.get_all_by_data_source_id_bll")
+def test_prepare_payload_retry_crawls_pending_companies(
+    mock_get_companies, _, mock_get_statuses
+):
+    # Setup
+    mock_get_companies.return_value = company_data_sources(1, 2, 3)
+    mock_get_statuses.return_value = {1: "SUCCESS", 2: "PENDING"}
+    data_source = DataSource(id=1, source_name="DataSource1")
+    mining_module_manager = MiningModuleManager()
+    mining_module_manager._create_payload = MagicMock()
+    mining_module_manager._shard_payload = MagicMock(return_value=["payload"])
+
+    # Run the test
+    payloads = mining_module_manager._prepare_payload(data_source, 123)
+
+    # Assertions
+    assert payloads == ["payload"]
+    companies = mining_module_manager._create_payload.call_args.args[1]
+    assert [company.company_id for company in companies] == [2]
+
+
 def test_schedule_task_success(mining_module_manager):
     # Setup
     mock_session = MagicMock()
@@ -857,3 +852,150 @@ def test_trigger_datasources_exception_handling(
     mock_loop.run_until_complete.assert_not_called()
     mock_loop.close.assert_called_once()
     mock_trigger.assert_not_called()
+
+
+@patch("parma_analytics.bl.mining_module_manager.async_request")
+@patch("parma_analytics.bl.mining_module_manager.JWTHandler.create_jwt")
+def test_trigger_prepares_payloads_concurrently(mock_create_jwt, mock_async_request):
+    # Setup
+    mock_create_jwt.return_value = "token"
+    mock_async_request.return_value = MagicMock(status_code=200)
+    data_sources = []
+    for source_id in (1, 2):
+        mock_data_source = MagicMock(spec=DataSource)
+        mock_data_source.id = source_id
+        mock_data_source.invocation_endpoint = f"http://module{source_id}.com"
+        data_sources.append(mock_data_source)
+
+    # both preparations have to run at the same time to pass the barrier
+    barrier = threading.Barrier(len(data_sources), timeout=5)
+
+    def prepare_payload(data_source, task_id):
+        barrier.wait()
+        return [ScrapingPayloadModel(task_id=task_id, companies={}).model_dump_json()]
+
+    mining_module_manager = MiningModuleManager()
+    mining_module_manager._prepare_payload = MagicMock(side_effect=prepare_payload)
+
+    async def trigger_all():
+        return await asyncio.gather(
+            *(mining_module_manager._trigger(ds, 123) for ds in data_sources)
+        )
+
+    # Run the Test
+    preparation_seconds = asyncio.run(trigger_all())
+
+    # Assertions
+    assert all(seconds is not None for seconds in preparation_seconds)
+    assert mock_async_request.await_count == len(data_sources)
+
+
+@patch("parma_analytics.bl.mining_module_manager.async_request")
+@patch("parma_analytics.bl.mining_module_manager.JWTHandler.create_jwt")
+def test_trigger_failing_preparation_does_not_stop_others(
+    mock_create_jwt, mock_async_request, caplog
+):
+    # Setup
+    mock_create_jwt.return_value = "token"
+    mock_async_request.return_value = MagicMock(status_code=200)
+    data_sources = []
+    for source_id in (1, 2):
+        mock_data_source = MagicMock(spec=DataSource)
+        mock_data_source.id = source_id
+        mock_data_source.invocation_endpoint = f"http://module{source_id}.com"
+        data_sources.append(mock_data_source)
+
+    def prepare_payload(data_source, task_id):
+        if data_source.id == 1:
+            raise RuntimeError("discovery down")
+        return [ScrapingPayloadModel(task_id=task_id, companies={}).model_dump_json()]
+
+    mining_module_manager = MiningModuleManager()
+    mining_module_manager._prepare_payload = MagicMock(side_effect=prepare_payload)
+
+    async def trigger_all():
+        return await asyncio.gather(
+            *(mining_module_manager._trigger(ds, 123) for ds in data_sources)
+        )
+
+    # Run the Test
+    with caplog.at_level(logging.ERROR):
+        preparation_seconds = asyncio.run(trigger_all())
+
+    # Assertions
+    assert preparation_seconds[0] is None
+    assert preparation_seconds[1] is not None
+    assert mock_async_request.await_count == 1
+    assert "discovery down" in caplog.text
+
+
+@patch(
+    "parma_analytics.bl.mining_module_manager.close_async_client",
+    new_callable=AsyncMock,
+)
+@patch(
+    "parma_analytics.bl.mining_module_manager.MiningModuleManager._trigger",
+    new_callable=AsyncMock,
+)
+def test_trigger_datasources_cleans_up_when_a_trigger_fails(
+    mock_trigger, mock_close_async_client, caplog
+):
+    # Setup
+    mock_trigger.side_effect = RuntimeError("unexpected")
+
+    mock_scheduled_task = MagicMock(spec=ScheduledTask)
+    mock_scheduled_task.task_id = 123
+    mock_scheduled_task.data_source = MagicMock(spec=DataSource, id=1)
+    mock_session = MagicMock()
+    (
+        mock_session.query.return_value.filter.return_value.with_for_update.return_value.first
+    ).return_value = mock_scheduled_task
+
+    mining_module_manager = MiningModuleManager()
+    mining_module_manager.session = mock_session
+
+    # Run the Test
+    with caplog.at_level(logging.ERROR):
+        mining_module_manager.trigger_datasources([123])
+
+    # Assertions
+    loop = asyncio.get_event_loop_policy().get_event_loop()
+    asyncio.set_event_loop(None)
+    mock_close_async_client.assert_awaited_once()
+    assert loop.is_closed()
+    assert "Error triggering mining module for data source 1: unexpected" in (
+        caplog.text
+    )
+
+
+@patch(
+    "parma_analytics.bl.mining_module_manager.MiningModuleManager._trigger",
+    new_callable=AsyncMock,
+)
+def test_trigger_datasources_passes_data_source_snapshot(mock_trigger):
+    # Setup
+    mock_trigger.return_value = None
+    data_source = DataSource(
+        id=1, source_name="name", invocation_endpoint="http://module.com"
+    )
+    mock_scheduled_task = MagicMock(spec=ScheduledTask)
+    mock_scheduled_task.task_id = 123
+    mock_scheduled_task.data_source = data_source
+    mock_session = MagicMock()
+    (
+        mock_session.query.return_value.filter.return_value.with_for_update.return_value.first
+    ).return_value = mock_scheduled_task
+
+    mining_module_manager = MiningModuleManager()
+    mining_module_manager.session = mock_session
+
+    # Run the Test
+    mining_module_manager.trigger_datasources([123])
+
+    # Assertions, the threads preparing the payload never see the ORM instance
+    assert mock_trigger.await_args.args == (
+        DataSourceSnapshot(
+            id=1, source_name="name", invocation_endpoint="http://module.com"
+        ),
+        123,
+    )
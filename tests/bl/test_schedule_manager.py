@@ -0,0 +1,50 @@
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from parma_analytics.bl.schedule_manager import ScheduleManager
+
+MODULE = "parma_analytics.bl.schedule_manager"
+
+
+@pytest.fixture
+def schedule_manager():
+    with patch(f"{MODULE}.Session"), patch(f"{MODULE}.MiningModuleManager"):
+        manager = ScheduleManager(MagicMock())
+    return manager
+
+
+def test_claimed_batches_are_triggered_until_exhausted(schedule_manager):
+    schedule_manager.session.execute.return_value.all.side_effect = [
+        [(1, True), (2, True)],
+        [(3, True), (4, False)],
+        [(5, True)],
+    ]
+    with patch(f"{MODULE}.SCHEDULING_BATCH_SIZE", 2):
+        schedule_manager._update_overdue_tasks()
+
+    trigger = schedule_manager.mining_module_manager.trigger_datasources
+    assert [c.args[0] for c in trigger.call_args_list] == [[1, 2], [3], [5]]
+    assert schedule_manager.session.commit.call_count == 3  # noqa: PLR2004
+    params = schedule_manager.session.execute.call_args.args[1]
+    assert params == {"batch_size": 2, "max_attempts": 3}
+
+
+def test_claim_query_skips_locked_tasks(schedule_manager):
+    schedule_manager.session.execute.return_value.all.return_value = []
+    schedule_manager._update_overdue_tasks()
+
+    statement = str(schedule_manager.session.execute.call_args.args[0])
+    assert "FOR UPDATE SKIP LOCKED" in statement
+    assert "RETURNING st.task_id" in statement
+    schedule_manager.mining_module_manager.trigger_datasources.assert_not_called()
+
+
+def test_upcoming_due_times(schedule_manager):
+    due_at = datetime(2024, 1, 1, 8)
+    schedule_manager.session.execute.return_value.all.return_value = [(due_at,)]
+
+    assert schedule_manager.upcoming_due_times(datetime(2024, 1, 1, 9)) == [due_at]
+    params = schedule_manager.session.execute.call_args.args[1]
+    assert params == {"until": datetime(2024, 1, 1, 9)}
@@ -0,0 +1,64 @@
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from parma_analytics.bl.scheduler_daemon import SchedulerDaemon
+
+MODULE = "parma_analytics.bl.scheduler_daemon"
+NOW = datetime(2024, 1, 1, 8)
+
+
+def daemon_with_lock(acquired: bool) -> tuple[SchedulerDaemon, MagicMock]:
+    engine = MagicMock()
+    connection = engine.connect.return_value
+    connection.execute.return_value.scalar.return_value = acquired
+    return SchedulerDaemon(engine, reconcile_seconds=300, lock_key=1), connection
+
+
+@patch(f"{MODULE}.ScheduleManager")
+def test_standby_daemon_does_not_dispatch(mock_schedule_manager):
+    daemon, connection = daemon_with_lock(False)
+
+    wait_seconds = daemon.run_once(NOW)
+
+    # another daemon holds the lock, try again on the next reconcile
+    assert wait_seconds == 300  # noqa: PLR2004
+    mock_schedule_manager.assert_not_called()
+    connection.close.assert_called_once()
+
+
+@patch(f"{MODULE}.ScheduleManager")
+def test_leader_dispatches_when_tasks_are_due(mock_schedule_manager):
+    daemon, _ = daemon_with_lock(True)
+    schedule_manager = mock_schedule_manager.return_value.__enter__.return_value
+    schedule_manager.upcoming_due_times.return_value = [
+        NOW - timedelta(minutes=1),
+        NOW + timedelta(seconds=30),
+    ]
+
+    wait_seconds = daemon.run_once(NOW)
+
+    schedule_manager.create_pending_tasks.assert_called_once()
+    schedule_manager.dispatch_due_tasks.assert_called_once()
+    # the daemon wakes exactly when the next task is due
+    assert wait_seconds == 30  # noqa: PLR2004
+
+    wait_seconds = daemon.run_once(NOW + timedelta(seconds=30))
+
+    assert schedule_manager.dispatch_due_tasks.call_count == 2  # noqa: PLR2004
+    schedule_manager.create_pending_tasks.assert_called_once()
+    # nothing is due anymore, wait for the next reconcile
+    assert wait_seconds == 270  # noqa: PLR2004
+
+
+@patch(f"{MODULE}.ScheduleManager")
+def test_lock_is_released_when_stopped(_):
+    daemon, connection = daemon_with_lock(True)
+    stop = threading.Event()
+    stop.wait = MagicMock(side_effect=lambda _: stop.set())
+
+    daemon.run(stop)
+
+    unlock = connection.execute.call_args_list[-1].args[0]
+    assert "pg_advisory_unlock" in str(unlock)
+    connection.close.assert_called_once()
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -8,9 +8,13 @@ from parma_analytics.bl.company_data_source_identifiers_bll import (
     IdentifierUpdateData,
 )
 from parma_analytics.db.prod.company_data_source_identifiers_query import (
+    ExpiringCompanyDataSource,
     create_company_data_source_identifier,
     delete_company_data_source_identifier,
     get_company_data_source_identifiers,
+    get_data_source_identifiers,
+    get_expiring_company_data_sources,
+    replace_discovered_identifiers,
     update_company_data_source_identifier,
 )
 from parma_analytics.db.prod.models.company_data_source import CompanyDataSource
@@ -37,6 +41,68 @@ def test_get_company_data_source_identifiers(mock_db):
     assert result is not None
 
 
+def test_get_data_source_identifiers(mock_db):
+    now = datetime(2024, 1, 1)
+    valid, expired = now + timedelta(days=1), now - timedelta(days=1)
+    mock_db.__enter__.return_value = mock_db
+    mock_db.execute.return_value = [
+        (1, "domain", "a.com", valid),
+        (1, "name", "A", valid),
+        (1, "name", "A Inc", valid),
+        (2, None, None, None),
+        (3, "domain", "c.com", valid),
+        (3, "name", "C", expired),
+    ]
+
+    result = get_data_source_identifiers(mock_db, 7, now=now)
+
+    assert result.identifiers == {1: {"domain": ["a.com"], "name": ["A", "A Inc"]}}
+    assert result.missing == [2]
+    assert result.expired == [3]
+    assert result.stale == {3: {"domain": ["c.com"], "name": ["C"]}}
+    mock_db.execute.assert_called_once()
+
+
+def test_get_expiring_company_data_sources(mock_db):
+    validity = datetime(2024, 1, 1)
+    mock_db.__enter__.return_value = mock_db
+    mock_db.execute.return_value = [(7, 1, 10, validity)]
+
+    result = get_expiring_company_data_sources(
+        mock_db, datetime(2024, 1, 2), 100, after=(validity, 5)
+    )
+
+    assert result == [
+        ExpiringCompanyDataSource(
+            data_source_id=7,
+            company_id=1,
+            company_data_source_id=10,
+            validity=validity,
+        )
+    ]
+    mock_db.execute.assert_called_once()
+
+
+def test_replace_discovered_identifiers_locks_company_data_sources(mock_db):
+    mock_db.__enter__.return_value = mock_db
+    identifier_data = IdentifierData(
+        company_data_source_id=2,
+        identifier_type="AUTOMATICALLY_DISCOVERED",
+        property="domain",
+        value="example.com",
+        validity=datetime.now(),
+    )
+
+    replace_discovered_identifiers(mock_db, [2, 1], [identifier_data])
+
+    lock, delete, insert = (c.args for c in mock_db.execute.call_args_list)
+    assert "ORDER BY company_data_source.id" in str(lock[0])
+    assert "FOR UPDATE" in str(lock[0])
+    assert "DELETE FROM company_data_source_identifier" in str(delete[0])
+    assert insert[1][0]["value"] == "example.com"
+    mock_db.commit.assert_called_once()
+
+
 def test_create_company_data_source_identifier(
     mock_db, mock_company_data_source_identifier
 ):
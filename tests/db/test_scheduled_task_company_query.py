@@ -0,0 +1,72 @@
+from unittest.mock import MagicMock
+
+from parma_analytics.db.prod.models.types import ScheduledTask
+from parma_analytics.db.prod.scheduled_task_company_query import (
+    create_company_retry_task,
+    fail_undispatched_companies,
+    finish_task_companies,
+    get_task_company_statuses,
+    record_task_companies,
+)
+
+
+def test_get_task_company_statuses():
+    session = MagicMock()
+    session.execute.return_value = [(1, "SUCCESS"), (2, "FAILED")]
+
+    assert get_task_company_statuses(session, 5) == {1: "SUCCESS", 2: "FAILED"}
+
+
+def test_record_task_companies():
+    session = MagicMock()
+
+    record_task_companies(session, 5, [1, 2], shard_id=0)
+
+    session.execute.assert_called_once()
+    session.commit.assert_called_once()
+
+
+def test_fail_undispatched_companies():
+    session = MagicMock()
+
+    fail_undispatched_companies(session, 5, [1, 2])
+
+    session.execute.assert_called_once()
+    session.commit.assert_called_once()
+
+
+def test_finish_task_companies():
+    session = MagicMock()
+
+    finish_task_companies(session, 5, {1: ("Type", "Description")}, shard_id=0)
+
+    # one update per failed company and one for the succeeded companies
+    assert session.execute.call_count == 2  # noqa: PLR2004
+    session.commit.assert_not_called()
+
+
+def test_create_company_retry_task():
+    session = MagicMock()
+    session.execute.side_effect = [
+        MagicMock(all=MagicMock(return_value=[(1, 1), (3, 2)])),
+        MagicMock(scalar_one=MagicMock(return_value=9)),
+        MagicMock(),
+    ]
+    task = ScheduledTask(task_id=5, data_source_id=2, max_run_seconds=60)
+
+    assert create_company_retry_task(session, task, 3) == 9  # noqa: PLR2004
+
+    rows = session.execute.call_args_list[2].args[1]
+    assert [(row["task_id"], row["company_id"], row["attempts"]) for row in rows] == [
+        (9, 1, 2),
+        (9, 3, 3),
+    ]
+
+
+def test_create_company_retry_task_without_failures():
+    session = MagicMock()
+    session.execute.return_value.all.return_value = []
+    task = ScheduledTask(task_id=5, data_source_id=2, max_run_seconds=60)
+
+    assert create_company_retry_task(session, task, 3) is None
+    session.execute.assert_called_once()
@@ -0,0 +1,78 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from parma_analytics.db.prod.scheduled_task_shard_query import (
+    create_task_shards,
+    finish_task_shard,
+    get_finished_shard_summaries,
+    get_task_shard_status,
+)
+
+
+def test_create_task_shards_replaces_shards():
+    session = MagicMock()
+    session.execute.return_value.scalar_one.return_value = 0
+
+    assert create_task_shards(session, 1, [2, 1]) == 0
+
+    # the unfinished shards of a previous dispatch are deleted before the new ones
+    # are inserted
+    assert session.execute.call_count == 3  # noqa: PLR2004
+    rows = session.execute.call_args_list[2].args[1]
+    assert [(row["shard_id"], row["company_count"]) for row in rows] == [(0, 2), (1, 1)]
+    assert all(row["status"] == "PENDING" for row in rows)
+    session.commit.assert_called_once()
+
+
+def test_create_task_shards_numbers_after_finished_shards():
+    session = MagicMock()
+    session.execute.return_value.scalar_one.return_value = 2
+
+    assert create_task_shards(session, 1, [1]) == 2  # noqa: PLR2004
+
+    rows = session.execute.call_args_list[2].args[1]
+    assert [row["shard_id"] for row in rows] == [2]
+
+
+def test_finish_task_shard_pending_shards():
+    session = MagicMock()
+    session.execute.side_effect = [
+        MagicMock(rowcount=1),
+        MagicMock(all=MagicMock(return_value=[("FINISHED", None), ("PENDING", None)])),
+    ]
+
+    assert finish_task_shard(session, 1, 0, None) is None
+    session.commit.assert_not_called()
+
+
+def test_finish_task_shard_last_shard():
+    session = MagicMock()
+    session.execute.side_effect = [
+        MagicMock(rowcount=1),
+        MagicMock(all=MagicMock(return_value=[("FINISHED", "a"), ("FINISHED", None)])),
+    ]
+
+    assert finish_task_shard(session, 1, 1, None) == ["a", None]
+
+
+def test_finish_task_shard_not_found():
+    session = MagicMock()
+    session.execute.return_value = MagicMock(rowcount=0)
+
+    with pytest.raises(Exception, match="Shard not found!"):
+        finish_task_shard(session, 1, 5, None)
+
+
+def test_get_task_shard_status():
+    session = MagicMock()
+    session.execute.return_value.scalar_one_or_none.return_value = "FINISHED"
+
+    assert get_task_shard_status(session, 1, 0) == "FINISHED"
+
+
+def test_get_finished_shard_summaries():
+    session = MagicMock()
+    session.execute.return_value.scalars.return_value = ["a", None]
+
+    assert get_finished_shard_summaries(session, 1) == ["a", None]
@@ -0,0 +1,101 @@
+from datetime import date, datetime
+from unittest.mock import MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from parma_analytics.db.prod.models.news import News
+from parma_analytics.db.prod.weekly_digest_query import (
+    append_to_digest,
+    backfill_weekly_digests,
+    is_funding_round,
+    week_start,
+)
+
+
+def compile_append(news: News):
+    session = MagicMock()
+    append_to_digest(session, news)
+    statement = session.execute.call_args.args[0]
+    return statement.compile(dialect=postgresql.dialect())
+
+
+def test_news_is_appended_to_the_digest_of_its_iso_week():
+    news = News(
+        id=1,
+        message="Revenue grew",
+        company_id=2,
+        timestamp=datetime(2024, 1, 3, 12),
+        source_measurement_id=4,
+    )
+
+    compiled = compile_append(news)
+
+    assert compiled.params["iso_year"] == 2024  # noqa: PLR2004
+    assert compiled.params["iso_week"] == 1
+    assert compiled.params["period_start"] == date(2024, 1, 1)
+    assert compiled.params["messages"] == [
+        {"news_id": 1, "message": "Revenue grew", "source_measurement_id": 4}
+    ]
+    assert compiled.params["has_funding_round"] is False
+    assert "ON CONFLICT (company_id, iso_year, iso_week) DO UPDATE" in str(compiled)
+    assert "weekly_digest.messages || excluded.messages" in str(compiled)
+
+
+def test_second_funding_round_of_a_week_is_not_appended():
+    news = News(
+        id=1,
+        message="New funding round",
+        company_id=2,
+        timestamp=datetime(2024, 1, 7),
+        source_measurement_id=4,
+    )
+
+    compiled = compile_append(news)
+
+    assert compiled.params["has_funding_round"] is True
+    assert (
+        "WHEN (excluded.has_funding_round AND weekly_digest.has_funding_round) "
+        "THEN weekly_digest.messages"
+    ) in str(compiled)
+
+
+def test_empty_news_is_not_appended():
+    session = MagicMock()
+    append_to_digest(session, News(id=1, message="", company_id=2))
+
+    session.execute.assert_not_called()
+
+
+def test_week_start_and_funding_round_detection():
+    assert week_start(datetime(2024, 1, 7, 23)) == date(2024, 1, 1)
+    assert week_start(date(2024, 1, 8)) == date(2024, 1, 8)
+    assert is_funding_round("Series A Funding Round closed")
+    assert not is_funding_round("New CEO")
+
+
+def test_complete_digests_are_not_rebuilt():
+    session = MagicMock()
+    session.execute.return_value.scalar.return_value = False
+
+    assert backfill_weekly_digests(session, date(2024, 1, 1)) == 0
+    session.query.assert_not_called()
+
+
+def test_digests_missing_news_are_rebuilt():
+    session = MagicMock()
+    session.execute.return_value.scalar.return_value = True
+    news = News(
+        id=1,
+        message="Revenue grew",
+        company_id=2,
+        timestamp=datetime(2024, 1, 3),
+        source_measurement_id=4,
+    )
+    query = session.query.return_value.filter.return_value
+    query.order_by.return_value.all.return_value = [news]
+
+    assert backfill_weekly_digests(session, date(2024, 1, 1)) == 1
+
+    statements = [str(c.args[0]) for c in session.execute.call_args_list]
+    assert "@>" in statements[0]
+    assert statements[1].startswith("DELETE FROM weekly_digest")
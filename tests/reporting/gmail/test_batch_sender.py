@@ -0,0 +1,84 @@
+import threading
+from unittest.mock import MagicMock
+
+from parma_analytics.reporting.gmail.batch_sender import (
+    BatchEmailSender,
+    EmailMessage,
+    group_messages,
+)
+
+
+def test_group_messages_by_template_and_data():
+    messages = [
+        EmailMessage("a@x.com", "report", {"message": "one"}),
+        EmailMessage("b@x.com", "report", {"message": "one"}),
+        EmailMessage("A@X.com", "report", {"message": "one"}),
+        EmailMessage("a@x.com", "report", {"message": "two"}),
+        EmailMessage("a@x.com", "notification", {"message": "one"}),
+    ]
+
+    batches = group_messages(messages)
+
+    assert [(b.template_id, b.recipients) for b in batches] == [
+        ("report", ["a@x.com", "b@x.com"]),
+        ("report", ["a@x.com"]),
+        ("notification", ["a@x.com"]),
+    ]
+
+
+def test_groups_are_split_into_batches():
+    messages = [EmailMessage(f"{i}@x.com", "t", {}) for i in range(2500)]
+
+    batches = group_messages(messages, batch_size=1000)
+
+    assert [len(b.recipients) for b in batches] == [1000, 1000, 500]
+
+
+def test_mail_has_a_personalization_per_recipient():
+    sender = BatchEmailSender(MagicMock(), "parma@x.com")
+    batch = group_messages(
+        [EmailMessage(e, "t", {"message": "hi"}) for e in ["a@x.com", "b@x.com"]]
+    )[0]
+
+    mail = sender.build_mail(batch).get()
+
+    assert mail["template_id"] == "t"
+    assert sorted(p["to"][0]["email"] for p in mail["personalizations"]) == [
+        "a@x.com",
+        "b@x.com",
+    ]
+    assert all(
+        p["dynamic_template_data"] == {"message": "hi"}
+        for p in mail["personalizations"]
+    )
+
+
+def test_failed_batches_are_reported():
+    lock = threading.Lock()
+    calls = []
+
+    def send(mail):
+        with lock:
+            calls.append(mail)
+            if len(calls) == 1:
+                raise RuntimeError("rate limited")
+
+    sg = MagicMock()
+    sg.send.side_effect = send
+    sender = BatchEmailSender(sg, "parma@x.com", batch_size=2, concurrency=1)
+
+    result = sender.send(EmailMessage(f"{i}@x.com", "t", {}) for i in range(5))
+
+    assert sg.send.call_count == 3  # noqa: PLR2004
+    assert result.sent_batches == 2  # noqa: PLR2004
+    assert result.sent_recipients == 3  # noqa: PLR2004
+    assert result.failed_recipients == ["0@x.com", "1@x.com"]
+
+
+def test_send_without_messages():
+    sg = MagicMock()
+
+    result = BatchEmailSender(sg, "parma@x.com").send([])
+
+    assert result.sent_batches == 0
+    sg.send.assert_not_called()
@@ -0,0 +1,64 @@
+from unittest.mock import MagicMock
+
+from parma_analytics.reporting.slack.channel_directory import (
+    PAGE_SIZE,
+    ChannelDirectory,
+    get_web_client,
+)
+
+
+def make_client(token: str, pages: list[list[tuple[str, str]]]) -> MagicMock:
+    client = MagicMock(token=token)
+    client.conversations_list.side_effect = lambda **_: iter(
+        [{"channels": [{"name": n, "id": i} for n, i in page]} for page in pages]
+    )
+    return client
+
+
+def test_one_scan_resolves_all_channels_of_a_workspace():
+    directory = ChannelDirectory()
+    client = make_client("token", [[("general", "C1")], [("random", "C2")]])
+
+    assert directory.get_channel_id(client, "general") == "C1"
+    assert directory.get_channel_id(client, "random") == "C2"
+    assert directory.get_channel_id(client, "general") == "C1"
+
+    client.conversations_list.assert_called_once_with(
+        limit=PAGE_SIZE, exclude_archived=True
+    )
+
+
+def test_workspaces_are_cached_separately():
+    directory = ChannelDirectory()
+    first = make_client("first", [[("general", "C1")]])
+    second = make_client("second", [[("general", "C9")]])
+
+    assert directory.get_channel_id(first, "general") == "C1"
+    assert directory.get_channel_id(second, "general") == "C9"
+
+
+def test_missing_channel_is_cached_negatively():
+    directory = ChannelDirectory()
+    client = make_client("token", [[("general", "C1")]])
+
+    assert directory.get_channel_id(client, "missing") is None
+    assert directory.get_channel_id(client, "missing") is None
+    client.conversations_list.assert_called_once()
+
+
+def test_invalidated_channel_is_rescanned():
+    directory = ChannelDirectory()
+    client = make_client("token", [[("general", "C1")]])
+    directory.get_channel_id(client, "general")
+
+    directory.invalidate(client, "general")
+    client.conversations_list.side_effect = lambda **_: iter(
+        [{"channels": [{"name": "general", "id": "C2"}]}]
+    )
+
+    assert directory.get_channel_id(client, "general") == "C2"
+
+
+def test_web_client_is_reused_per_token():
+    assert get_web_client("token-a") is get_web_client("token-a")
+    assert get_web_client("token-a") is not get_web_client("token-b")
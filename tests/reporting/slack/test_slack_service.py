@@ -2,6 +2,8 @@
 import unittest
 from unittest.mock import MagicMock, patch
 
+from slack_sdk.errors import SlackApiError
+
 from parma_analytics.reporting.slack.send_slack_messages import SlackService
 
 
@@ -45,3 +47,30 @@ class TestSlackService(unittest.TestCase):
                 mock_slack_service, user_id=1, content="test"
             )
             assert result is None
+
+    def test_post_message_raises_lookup_errors(self):
+        """Test that a failed channel lookup is not reported as a missing channel."""
+        client = MagicMock()
+        error = SlackApiError("ratelimited", {"error": "ratelimited"})
+        with patch(
+            "parma_analytics.reporting.slack.send_slack_messages.channel_directory"
+        ) as mock_directory:
+            mock_directory.get_channel_id.side_effect = error
+
+            with self.assertRaises(SlackApiError):
+                SlackService()._post_message(client, "general", "test", None)
+
+        client.chat_postMessage.assert_not_called()
+
+    def test_post_message_missing_channel(self):
+        """Test that a channel the workspace does not have is reported."""
+        client = MagicMock()
+        with patch(
+            "parma_analytics.reporting.slack.send_slack_messages.channel_directory"
+        ) as mock_directory:
+            mock_directory.get_channel_id.return_value = None
+
+            with self.assertRaisesRegex(ValueError, "not found"):
+                SlackService()._post_message(client, "general", "test", None)
+
+        client.chat_postMessage.assert_not_called()
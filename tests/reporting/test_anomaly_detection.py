@@ -0,0 +1,113 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from parma_analytics.reporting.anomaly_detection import (
+    AnomalyState,
+    score,
+    update_state,
+)
+from parma_analytics.reporting.news_comparison_engine import check_notification_rules
+
+ALPHA = 0.1
+THRESHOLD = 3.0
+
+MODULE = "parma_analytics.reporting.news_comparison_engine"
+
+
+def fold(values) -> AnomalyState:
+    state = AnomalyState()
+    for value in values:
+        state = update_state(state, float(value), ALPHA)
+    return state
+
+
+def test_welford_matches_batch_statistics():
+    values = np.random.default_rng(0).normal(50, 5, 500)
+
+    state = fold(values)
+
+    assert state.count == len(values)
+    assert state.mean == pytest.approx(values.mean())
+    assert state.std == pytest.approx(values.std(ddof=1))
+
+
+def test_spike_is_detected():
+    values = 100 + np.random.default_rng(1).normal(0, 1, 200)
+    state = fold(values)
+
+    assert not score(state, 101.0, ALPHA).exceeds(THRESHOLD)
+    assert score(state, 110.0, ALPHA).exceeds(THRESHOLD)
+
+
+def test_slow_drift_is_detected():
+    rng = np.random.default_rng(2)
+    state = fold(100 + rng.normal(0, 1, 200))
+
+    # every step changes less than 1 %, a percentage threshold would never fire
+    detected = []
+    for step in range(100):
+        value = 100 + 0.05 * step + rng.normal(0, 1)
+        detected.append(score(state, value, ALPHA).exceeds(THRESHOLD))
+        state = update_state(state, value, ALPHA)
+
+    assert not any(detected[:10])
+    assert any(detected)
+
+
+def test_no_variance_scores_zero():
+    state = fold([5, 5, 5])
+
+    anomaly = score(state, 500.0, ALPHA)
+
+    assert anomaly.z_score == anomaly.drift_z_score == 0
+
+
+@pytest.fixture
+def anomaly_mocks():
+    with patch(f"{MODULE}.get_engine"), patch(
+        f"{MODULE}.get_notification_rules_by_source_measurement_id"
+    ) as mock_get_rule, patch(f"{MODULE}.get_anomaly_state") as mock_get_state, patch(
+        f"{MODULE}.upsert_anomaly_state"
+    ) as mock_upsert:
+        mock_get_rule.return_value = MagicMock(
+            rule_type="ANOMALY",
+            threshold=THRESHOLD,
+            ewma_alpha=ALPHA,
+            min_observations=10,
+        )
+        yield mock_get_state, mock_upsert
+
+
+@pytest.mark.parametrize(
+    "count, value, satisfied",
+    [(50, 100.5, False), (50, 120.0, True), (5, 120.0, False)],
+)
+def test_check_notification_rules_anomaly(anomaly_mocks, count, value, satisfied):
+    mock_get_state, mock_upsert = anomaly_mocks
+    session = MagicMock()
+    mock_get_state.return_value = MagicMock(
+        count=count, mean=100.0, m2=(count - 1) * 4.0, ewma_mean=100.0
+    )
+
+    result = check_notification_rules(
+        session=session,
+        source_measurement_id=1,
+        value=value,
+        timestamp=MagicMock(),
+        measurement_type="float",
+        company_measurement=MagicMock(company_measurement_id=7),
+    )
+
+    assert result.is_rules_satisfied is satisfied
+    assert result.z_score == pytest.approx((value - 100.0) / 2.0)
+    ((_, company_measurement_id, state), _) = mock_upsert.call_args
+    assert company_measurement_id == 7  # noqa: PLR2004
+    assert state["count"] == count + 1
+    mock_get_state.assert_called_once_with(session, 7)
+    # the caller commits the state together with the value
+    session.commit.assert_not_called()
+    if satisfied:
+        assert result.previous_value == pytest.approx(100.0)
+        assert result.percentage_difference == pytest.approx(20.0)
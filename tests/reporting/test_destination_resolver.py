@@ -0,0 +1,78 @@
+from collections.abc import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from parma_analytics.reporting.destination_resolver import (
+    invalidate_destinations,
+    resolve_destinations,
+)
+from parma_analytics.reporting.notification_service_manager import (
+    NotificationServiceManager,
+)
+
+MODULE = "parma_analytics.reporting.destination_resolver"
+
+ROWS = [
+    (1, "EMAIL", "a@x.com", None),
+    (1, "EMAIL", "a@x.com", None),
+    (1, "SLACK", "general", "secret-1"),
+    (2, "SLACK", "random", "secret-2"),
+    (2, "SLACK", "no-secret", None),
+    (2, "WEBHOOK", "https://x.com", None),
+]
+
+
+@pytest.fixture
+def mock_fetch() -> Iterator[MagicMock]:
+    invalidate_destinations()
+    with patch(f"{MODULE}.get_engine"), patch(
+        f"{MODULE}.fetch_user_destinations", return_value=ROWS
+    ) as mock_fetch:
+        yield mock_fetch
+    invalidate_destinations()
+
+
+def test_destinations_are_grouped_per_user(mock_fetch: MagicMock):
+    destinations = resolve_destinations(user_ids=[1, 2, 3])
+
+    assert destinations == {
+        1: {"email": ["a@x.com"], "slack": [("general", "secret-1")]},
+        2: {"email": [], "slack": [("random", "secret-2")]},
+        3: {"email": [], "slack": []},
+    }
+    mock_fetch.assert_called_once()
+
+
+def test_only_uncached_users_are_fetched(mock_fetch: MagicMock):
+    resolve_destinations(user_ids=[1, 2])
+    mock_fetch.return_value = []
+
+    destinations = resolve_destinations(user_ids=[1, 2, 3])
+
+    assert destinations[1]["email"] == ["a@x.com"]
+    assert mock_fetch.call_args.kwargs["user_ids"] == [3]
+
+
+def test_company_destinations_are_cached(mock_fetch: MagicMock):
+    resolve_destinations(company_id=7)
+    resolve_destinations(company_id=7)
+    resolve_destinations(company_id=7, use_cache=False)
+
+    assert mock_fetch.call_count == 2  # noqa: PLR2004
+    assert mock_fetch.call_args.kwargs == {"company_id": 7}
+
+
+def test_resolve_requires_users_or_company():
+    with pytest.raises(ValueError):
+        resolve_destinations()
+
+
+def test_service_manager_reads_resolved_destinations(mock_fetch: MagicMock):
+    email = NotificationServiceManager(service_type="email", user_id=1)
+    slack = NotificationServiceManager(service_type="slack", user_id=1)
+
+    assert email.get_notification_destinations() == ["a@x.com"]
+    assert slack.get_notification_destinations() == ["general"]
+    assert slack.get_slack_key_and_destinations() == [("general", "secret-1")]
+    mock_fetch.assert_called_once()
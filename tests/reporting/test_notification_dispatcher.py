@@ -0,0 +1,134 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from parma_analytics.reporting.gmail.batch_sender import (
+    BatchFailure,
+    BatchResult,
+    EmailBatch,
+)
+from parma_analytics.reporting.notification_dispatcher import (
+    EMAIL,
+    SLACK,
+    NotificationDispatcher,
+)
+
+MODULE = "parma_analytics.reporting.notification_dispatcher"
+
+
+@pytest.fixture(autouse=True)
+def _prefetch_secrets():
+    with patch(f"{MODULE}.prefetch_secrets") as mock_prefetch:
+        yield mock_prefetch
+
+
+def make_email_service(failed: set[str] | None = None) -> MagicMock:
+    """Email service sending every address in a batch of its own."""
+
+    def send_bulk_email(emails, template_id, data, concurrency=None):
+        result = BatchResult()
+        for email in emails:
+            if email in (failed or set()):
+                batch = EmailBatch(template_id, data, [email])
+                result.failures.append(BatchFailure(batch, "bounced"))
+            else:
+                result.sent_batches += 1
+                result.sent_recipients += 1
+        return result
+
+    email_service = MagicMock(notification_template_id="tmpl")
+    email_service.send_bulk_email.side_effect = send_bulk_email
+    return email_service
+
+
+def make_dispatcher(email_service=None, slack_service=None, **kwargs):
+    email_service = email_service or make_email_service()
+    slack_service = slack_service or MagicMock()
+    return NotificationDispatcher(email_service, slack_service, **kwargs)
+
+
+@patch(f"{MODULE}.resolve_destinations")
+def test_dispatch_deduplicates_destinations(mock_resolve):
+    mock_resolve.return_value = {
+        1: {"email": ["a@example.com"], "slack": [("general", "secret-1")]},
+        2: {"email": ["A@Example.com "], "slack": [("general", "secret-1")]},
+        3: {"email": [], "slack": [("general", "secret-2")]},
+    }
+    dispatcher = make_dispatcher()
+
+    stats = dispatcher.dispatch(7, "hello")
+
+    dispatcher.email_service.send_bulk_email.assert_called_once_with(
+        ["a@example.com"],
+        "tmpl",
+        {"notification": "hello"},
+        concurrency=dispatcher.email_concurrency,
+    )
+    slack_calls = dispatcher.slack_service.send_message_to_channel.call_count
+    assert slack_calls == 2  # noqa: PLR2004
+    assert stats.sent == {EMAIL: 1, SLACK: 2}
+    assert stats.failures == []
+
+
+def test_failures_are_isolated_per_destination():
+    email_service = make_email_service(failed={"bad@x.com"})
+    slack_service = MagicMock()
+    slack_service.send_message_to_channel.side_effect = ValueError("no channel")
+    dispatcher = make_dispatcher(email_service, slack_service)
+
+    stats = dispatcher.send(
+        "hello", ["bad@x.com", "good@x.com"], [("missing", "secret")]
+    )
+
+    assert stats.sent == {EMAIL: 1, SLACK: 0}
+    assert stats.total_failed == 2  # noqa: PLR2004
+    assert {(f.provider, f.destination) for f in stats.failures} == {
+        (EMAIL, "bad@x.com"),
+        (SLACK, "missing"),
+    }
+
+
+def test_concurrency_is_limited_per_provider():
+    lock = threading.Lock()
+    active = {"current": 0, "peak": 0}
+
+    def slow_send(*_):
+        with lock:
+            active["current"] += 1
+            active["peak"] = max(active["peak"], active["current"])
+        time.sleep(0.02)
+        with lock:
+            active["current"] -= 1
+
+    slack_service = MagicMock()
+    slack_service.send_message_to_channel.side_effect = slow_send
+    dispatcher = make_dispatcher(slack_service=slack_service, slack_concurrency=3)
+
+    stats = dispatcher.send(
+        "hello", [], [(f"channel-{i}", "secret") for i in range(12)]
+    )
+
+    assert stats.sent[SLACK] == 12  # noqa: PLR2004
+    assert 1 < active["peak"] <= 3  # noqa: PLR2004
+
+
+def test_send_without_destinations():
+    dispatcher = make_dispatcher()
+
+    stats = dispatcher.send("hello", [], [])
+
+    assert stats.total_sent == 0
+    dispatcher.email_service.send_bulk_email.assert_not_called()
+
+
+def test_email_service_error_fails_all_addresses():
+    email_service = MagicMock(notification_template_id="tmpl")
+    email_service.send_bulk_email.side_effect = RuntimeError("unauthorized")
+    dispatcher = make_dispatcher(email_service)
+
+    stats = dispatcher.send("hello", ["a@x.com", "b@x.com"], [])
+
+    assert stats.sent[EMAIL] == 0
+    assert [f.destination for f in stats.failures] == ["a@x.com", "b@x.com"]
@@ -0,0 +1,86 @@
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from parma_analytics.reporting.report_data_loader import (
+    NewsMessage,
+    load_report_data,
+)
+from parma_analytics.reporting.send_reports import (
+    handle_funding_round,
+    summarize_company_news,
+)
+
+MODULE = "parma_analytics.reporting.report_data_loader"
+
+SUBSCRIPTIONS = [(1, 10), (1, 20), (2, 20), (3, 30), (4, None)]
+DIGESTS = [
+    (
+        10,
+        [
+            {"news_id": 1, "message": "Revenue grew", "source_measurement_id": 5},
+            {"news_id": 2, "message": "New CEO", "source_measurement_id": 6},
+        ],
+    ),
+    (20, [{"news_id": 3, "message": "Hiring spree", "source_measurement_id": 7}]),
+]
+NAMES = {10: "Acme", 20: "Globex"}
+
+
+def load(**kwargs):
+    with patch(f"{MODULE}.fetch_all_subscriptions", return_value=SUBSCRIPTIONS), patch(
+        f"{MODULE}.fetch_subscribed_digests", return_value=DIGESTS
+    ) as mock_digests, patch(
+        f"{MODULE}.get_company_names", return_value=NAMES
+    ) as mock_names:
+        return load_report_data(MagicMock(), **kwargs), mock_names, mock_digests
+
+
+def test_data_is_grouped_per_user_and_company():
+    data, mock_names, mock_digests = load(period_start=date(2024, 1, 8))
+
+    assert data.company_ids_by_user == {1: [10, 20], 2: [20], 3: [30]}
+    assert data.news_by_company_id[10] == [
+        NewsMessage("Revenue grew", 5),
+        NewsMessage("New CEO", 6),
+    ]
+    assert data.user_ids == [1, 2]
+    assert mock_names.call_args.args[1] == [10, 20]
+    # the report of a week covers the digests of the week before
+    assert mock_digests.call_args.args[1] == date(2024, 1, 1)
+
+
+def test_news_are_summarized_once_per_company():
+    data, _, _ = load()
+    summarize = MagicMock(side_effect=lambda _, news: [n.message for n in news])
+
+    messages = data.summarize(summarize)
+
+    assert summarize.call_count == 2  # noqa: PLR2004
+    assert messages == {10: ["Revenue grew", "New CEO"], 20: ["Hiring spree"]}
+
+
+@patch("parma_analytics.reporting.send_reports.handle_funding_round")
+def test_only_first_funding_round_is_reported(mock_handle_funding_round):
+    mock_handle_funding_round.return_value = "Funding round\n- Amount - 5M\n"
+    messages = [
+        NewsMessage("Funding round announced", 1),
+        NewsMessage("", 2),
+        NewsMessage("Another funding round", 1),
+        NewsMessage("New office", 3),
+    ]
+
+    summary = summarize_company_news(10, messages)
+
+    assert summary == ["Funding round\n- Amount - 5M\n", "New office"]
+    mock_handle_funding_round.assert_called_once_with(messages[0], 10)
+
+
+@patch("parma_analytics.reporting.send_reports.get_engine", MagicMock())
+@patch("parma_analytics.reporting.send_reports.fetch_latest_sibling_values")
+def test_funding_round_lists_latest_sibling_values(mock_fetch):
+    mock_fetch.return_value = {"Amount": 5000000.0, "Round": "Series A"}
+
+    summary = handle_funding_round(NewsMessage("Funding round closed", 3), 10)
+
+    assert summary == "Funding round closed\n- Amount - 5000000.0\n- Round - Series A\n"
+    assert mock_fetch.call_args.args[1:] == (10, 3)
@@ -0,0 +1,171 @@
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from parma_analytics.reporting.report_data_loader import ReportData, report_period_start
+from parma_analytics.reporting.report_job import (
+    get_report_job_progress,
+    run_report_job,
+)
+from parma_analytics.reporting.send_reports import (
+    ReportDeliveryError,
+    ReportDestinations,
+)
+
+MODULE = "parma_analytics.reporting.report_job"
+
+
+@pytest.fixture
+def job_mocks():
+    report_data = ReportData(
+        company_ids_by_user={1: [10], 2: [10], 3: [10]},
+        news_by_company_id={10: [MagicMock()]},
+        company_names={10: "Acme"},
+    )
+
+    @contextmanager
+    def session():
+        yield MagicMock()
+
+    return_values = {
+        "try_lock_report_job": True,
+        "backfill_weekly_digests": 0,
+        "prepare_reports": (report_data, {10: ["news"]}),
+        "get_report_job": MagicMock(period_start=date(2024, 1, 1)),
+        "get_finished_user_ids": {1},
+        "get_failed_destinations": {},
+    }
+    with ExitStack() as stack:
+        stack.enter_context(patch(f"{MODULE}.get_session", session))
+        stack.enter_context(patch(f"{MODULE}.get_engine"))
+        stack.enter_context(patch(f"{MODULE}.unlock_report_job"))
+        for name, return_value in return_values.items():
+            stack.enter_context(patch(f"{MODULE}.{name}", return_value=return_value))
+        mock_update = stack.enter_context(patch(f"{MODULE}.update_report_job"))
+        mock_record = stack.enter_context(patch(f"{MODULE}.record_report_user"))
+        mock_send = stack.enter_context(patch(f"{MODULE}.send_user_report"))
+        yield mock_send, mock_record, mock_update
+
+
+def test_run_resumes_and_isolates_failures(job_mocks):
+    mock_send, mock_record, mock_update = job_mocks
+
+    def send_user_report(user_id, report, destinations):
+        assert "Acme" in report.html
+        assert destinations is None
+        if user_id == 2:  # noqa: PLR2004
+            raise ReportDeliveryError(ReportDestinations(["a@b.c"], ["general"]))
+
+    mock_send.side_effect = send_user_report
+
+    run_report_job(7)
+
+    assert sorted(c.args[0] for c in mock_send.call_args_list) == [2, 3]
+    failed = {"emails": ["a@b.c"], "channels": ["general"]}
+    assert sorted(c.args[2:4] + c.args[5:] for c in mock_record.call_args_list) == [
+        (2, "FAILED", failed),
+        (3, "SENT", None),
+    ]
+    assert mock_update.call_args_list[0].kwargs["total_users"] == 3  # noqa: PLR2004
+    assert mock_update.call_args_list[0].kwargs["started"] is True
+    assert mock_update.call_args_list[-1].args[2] == "COMPLETED"
+
+
+def test_aborted_run_stays_running(job_mocks):
+    _, _, mock_update = job_mocks
+    with patch(f"{MODULE}.prepare_reports", side_effect=Exception("db down")):
+        run_report_job(7)
+
+    mock_update.assert_not_called()
+
+
+def test_report_period_starts_on_monday():
+    assert report_period_start(date(2024, 1, 4)) == date(2024, 1, 1)
+    assert report_period_start(date(2024, 1, 1)) == date(2024, 1, 1)
+
+
+def test_run_backfills_the_reported_digest_week(job_mocks):
+    with patch(f"{MODULE}.backfill_weekly_digests", return_value=2) as mock_backfill:
+        run_report_job(7)
+
+    # the report of the week of 2024-01-01 covers the week before
+    assert mock_backfill.call_args.args[1] == date(2023, 12, 25)
+
+
+def test_run_locked_by_another_process_does_nothing(job_mocks):
+    mock_send, _, mock_update = job_mocks
+    with patch(f"{MODULE}.try_lock_report_job", return_value=False), patch(
+        f"{MODULE}.unlock_report_job"
+    ) as mock_unlock:
+        run_report_job(7)
+
+    mock_send.assert_not_called()
+    mock_update.assert_not_called()
+    mock_unlock.assert_not_called()
+
+
+def test_missing_run_is_released(job_mocks):
+    mock_send, _, mock_update = job_mocks
+    with patch(f"{MODULE}.get_report_job", return_value=None), patch(
+        f"{MODULE}.unlock_report_job"
+    ) as mock_unlock:
+        run_report_job(7)
+
+    mock_send.assert_not_called()
+    mock_update.assert_not_called()
+    mock_unlock.assert_called_once()
+
+
+def test_user_without_report_is_skipped(job_mocks):
+    mock_send, mock_record, _ = job_mocks
+    with patch(f"{MODULE}.render_user_report", return_value=None):
+        run_report_job(7)
+
+    mock_send.assert_not_called()
+    assert sorted(c.args[2:4] for c in mock_record.call_args_list) == [
+        (2, "SKIPPED"),
+        (3, "SKIPPED"),
+    ]
+
+
+def test_failed_report_is_resent_to_failed_destinations_only(job_mocks):
+    mock_send, mock_record, _ = job_mocks
+    failed = {"emails": ["a@b.c"], "channels": []}
+    with patch(f"{MODULE}.get_finished_user_ids", return_value={1, 3, 4}), patch(
+        f"{MODULE}.get_failed_destinations", return_value={2: failed}
+    ):
+        run_report_job(7)
+
+    mock_send.assert_called_once()
+    assert mock_send.call_args.args[2] == ReportDestinations(["a@b.c"], [])
+    assert mock_record.call_args.args[2:4] == (2, "SENT")
+
+
+def test_progress_rate_counts_the_current_execution():
+    job = MagicMock(
+        id=7,
+        total_users=10,
+        started_at=datetime(2024, 1, 1, 8),
+        finished_at=datetime(2024, 1, 1, 8, 0, 2),
+    )
+
+    @contextmanager
+    def session():
+        yield MagicMock()
+
+    def count_report_users(session, job_id, since=None):
+        if since is None:
+            return {"SENT": 6, "FAILED": 1, "SKIPPED": 3}
+        return {"SENT": 4}
+
+    with patch(f"{MODULE}.get_session", session), patch(
+        f"{MODULE}.get_report_job", return_value=job
+    ), patch(f"{MODULE}.count_report_users", count_report_users), patch(
+        f"{MODULE}.get_report_failures", return_value=[]
+    ):
+        progress = get_report_job_progress(7)
+
+    assert progress.pending == 0
+    assert progress.users_per_second == 2.0  # noqa: PLR2004
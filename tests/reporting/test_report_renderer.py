@@ -0,0 +1,49 @@
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from parma_analytics.reporting.generate_html import environment
+from parma_analytics.reporting.report_renderer import (
+    clear_fragments,
+    render_company_fragment,
+    render_report,
+)
+
+WEEK = date(2024, 1, 1)
+
+
+@pytest.fixture(autouse=True)
+def _clear_fragments():
+    clear_fragments()
+    yield
+    clear_fragments()
+
+
+def test_fragment_is_rendered_once_per_company_and_week():
+    with patch(
+        "parma_analytics.reporting.report_renderer.environment.get_template",
+        wraps=environment.get_template,
+    ) as mock_get_template:
+        first = render_company_fragment(1, "Acme", ["News 1"], WEEK)
+        second = render_company_fragment(1, "Acme", ["News 1"], WEEK)
+        render_company_fragment(1, "Acme", ["News 1"], date(2024, 1, 8))
+
+    assert first is second
+    assert mock_get_template.call_count == 2  # noqa: PLR2004
+
+
+def test_report_contains_all_fragments():
+    news_by_company = {"Acme": ["News 1", "News 2"], "Globex": ["News 3"]}
+    fragments = [
+        render_company_fragment(i, name, news, WEEK)
+        for i, (name, news) in enumerate(news_by_company.items())
+    ]
+
+    report = render_report(fragments)
+
+    assert report.text == "Acme\n- News 1\n- News 2\nGlobex\n- News 3\n"
+    html = report.html.split()
+    assert html[:2] == ["<!DOCTYPE", "html>"]
+    assert [word for word in html if word in ("Acme", "Globex")] == ["Acme", "Globex"]
+    assert "<li>News 3</li>" in report.html
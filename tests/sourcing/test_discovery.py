@@ -6,7 +6,7 @@ import pytest
 from parma_analytics.db.prod.models.types import DataSource
 from parma_analytics.sourcing.discovery.discovery_manager import (
     call_discover_endpoint,
-    process_discovery_response,
+    discovered_identifiers,
 )
 from parma_analytics.sourcing.discovery.discovery_model import (
     DiscoveryQueryData,
@@ -29,7 +29,9 @@ mock_data_source = DataSource(
 
 @pytest.fixture
 def mock_requests_post():
-    with patch("requests.post") as mock_post:
+    with patch(
+        "parma_analytics.sourcing.discovery.discovery_manager.request"
+    ) as mock_post:
         yield mock_post
 
 
@@ -49,16 +51,22 @@ def test_call_discover_endpoint_success(mock_requests_post):
     assert result.validity == expected_validity
 
 
-@patch(
-    "parma_analytics.sourcing.discovery.discovery_manager.create_company_data_source_identifier_bll"
-)
-def test_process_discovery_response(mock_create_identifier):
+def test_discovered_identifiers():
     discovery_response = DiscoveryResponseModel(**mock_discovery_response)
 
     company_data_source_id = 1
 
-    process_discovery_response(discovery_response, company_data_source_id)
+    identifiers = discovered_identifiers(
+        company_data_source_id,
+        discovery_response.identifiers["1"],
+        discovery_response.validity,
+    )
 
-    assert mock_create_identifier.call_count == len(
-        discovery_response.identifiers["1"]["domain"]
-    ) + len(discovery_response.identifiers["1"]["name"])
+    assert len(identifiers) == len(discovery_response.identifiers["1"]["domain"]) + len(
+        discovery_response.identifiers["1"]["name"]
+    )
+    assert all(
+        identifier.identifier_type == "AUTOMATICALLY_DISCOVERED"
+        and identifier.company_data_source_id == company_data_source_id
+        for identifier in identifiers
+    )
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+from parma_analytics.db.prod.models.types import DataSource
+from parma_analytics.sourcing.discovery.discovery_coordinator import (
+    discover_all,
+    discover_identifiers,
+)
+from parma_analytics.sourcing.discovery.discovery_model import (
+    DiscoveryQueryData,
+    DiscoveryResponseModel,
+)
+
+MODULE = "parma_analytics.sourcing.discovery.discovery_coordinator"
+VALIDITY = datetime(2024, 1, 1)
+
+data_source = DataSource(id=1, invocation_endpoint="http://module.com")
+
+
+def query(*company_ids: int) -> list[DiscoveryQueryData]:
+    return [DiscoveryQueryData(company_id=str(i), name=f"c{i}") for i in company_ids]
+
+
+def test_companies_are_discovered_in_chunks():
+    def discover_chunk(_, chunk):
+        if chunk[0].company_id == "3":
+            raise ValueError("module down")
+        return DiscoveryResponseModel(
+            identifiers={q.company_id: {"name": [q.name]} for q in chunk},
+            validity=VALIDITY,
+        )
+
+    with patch(f"{MODULE}.discover_chunk", AsyncMock(side_effect=discover_chunk)):
+        responses = asyncio.run(
+            discover_all(data_source, query(1, 2, 3, 4, 5), chunk_size=2)
+        )
+
+    # the failing chunk is skipped
+    assert [list(r.identifiers) for r in responses] == [["1", "2"], ["5"]]
+
+
+@patch(f"{MODULE}.replace_discovered_identifiers_bll")
+@patch(f"{MODULE}.get_company_names", return_value={1: "Acme", 2: "Globex"})
+@patch(f"{MODULE}.get_engine")
+def test_identifiers_are_stored_per_company_data_source(_, __, mock_replace):
+    response = DiscoveryResponseModel(
+        identifiers={"1": {"domain": ["acme.com"]}, "2": {"name": ["Globex", "GX"]}},
+        validity=VALIDITY,
+    )
+    with patch(f"{MODULE}.discover_all", AsyncMock(return_value=[response])) as mock:
+        discovered = discover_identifiers(data_source, {1: 10, 2: 20, 3: 30})
+
+    assert discovered == {1, 2}
+    # company 3 does not exist and is not discovered
+    assert [q.company_id for q in mock.call_args.args[1]] == ["1", "2"]
+    replaced, identifiers = mock_replace.call_args.args
+    assert sorted(replaced) == [10, 20]
+    assert [(i.company_data_source_id, i.value) for i in identifiers] == [
+        (10, "acme.com"),
+        (20, "Globex"),
+        (20, "GX"),
+    ]
@@ -0,0 +1,70 @@
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from parma_analytics.db.prod.company_data_source_identifiers_query import (
+    ExpiringCompanyDataSource,
+)
+from parma_analytics.db.prod.models.types import DataSource
+from parma_analytics.sourcing.discovery import identifier_refresher
+from parma_analytics.sourcing.discovery.identifier_refresher import (
+    refresh_expiring_identifiers,
+)
+
+MODULE = "parma_analytics.sourcing.discovery.identifier_refresher"
+VALIDITY = datetime(2024, 1, 1)
+
+data_sources = [
+    DataSource(id=1, is_active=True),
+    DataSource(id=2, is_active=True),
+    DataSource(id=3, is_active=False),
+]
+
+
+def expiring(data_source_id: int, company_id: int) -> ExpiringCompanyDataSource:
+    return ExpiringCompanyDataSource(
+        data_source_id=data_source_id,
+        company_id=company_id,
+        company_data_source_id=company_id * 10,
+        validity=VALIDITY,
+    )
+
+
+@patch(f"{MODULE}.get_engine")
+@patch(f"{MODULE}.get_all_data_source", return_value=data_sources)
+@patch(f"{MODULE}.discover_identifiers")
+@patch(f"{MODULE}.get_expiring_company_data_sources_bll")
+def test_identifiers_are_refreshed_in_pages(
+    mock_get_expiring, mock_discover_identifiers, _, __
+):
+    mock_get_expiring.side_effect = [
+        [expiring(1, 1), expiring(2, 2)],
+        [expiring(1, 3), expiring(3, 4)],
+        [],
+    ]
+    mock_discover_identifiers.side_effect = [{1}, ValueError("module down"), {3}]
+    sleep = MagicMock()
+
+    refreshed = refresh_expiring_identifiers(
+        lead_seconds=60, batch_size=2, max_jitter_seconds=5, sleep=sleep
+    )
+
+    # the failing data source does not stop the others
+    assert refreshed == 2  # noqa: PLR2004
+    # the companies are rediscovered per data source, inactive ones are skipped
+    assert [
+        (call.args[0].id, call.args[1])
+        for call in mock_discover_identifiers.call_args_list
+    ] == [(1, {1: 10}), (2, {2: 20}), (1, {3: 30})]
+    # the next page continues after the last company data source of the previous
+    assert mock_get_expiring.call_args_list[1].args[2] == (VALIDITY, 20)
+    # a jittered pause spreads the pages over time
+    assert sleep.call_count == 2  # noqa: PLR2004
+    assert all(0 <= call.args[0] <= 5 for call in sleep.call_args_list)  # noqa: PLR2004
+
+
+@patch(f"{MODULE}.get_expiring_company_data_sources_bll")
+def test_refresh_is_not_run_twice(mock_get_expiring):
+    with identifier_refresher._refresh_lock:
+        assert refresh_expiring_identifiers() == 0
+
+    mock_get_expiring.assert_not_called()
@@ -0,0 +1,91 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from parma_analytics.utils import http_client
+from parma_analytics.utils.http_client import (
+    async_request,
+    close_async_client,
+    close_client,
+    get_async_client,
+    get_client,
+    request,
+)
+
+URL = "http://module.example.com/companies"
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"path": request.url.path})
+
+
+@pytest.fixture
+def mock_transport(monkeypatch):
+    options = http_client._client_options
+
+    def with_mock_transport(verify):
+        return {**options(verify), "transport": httpx.MockTransport(handler)}
+
+    monkeypatch.setattr(http_client, "_client_options", with_mock_transport)
+    close_client()
+    yield
+    close_client()
+
+
+def test_sync_client_is_shared(mock_transport):
+    assert get_client() is get_client()
+
+    response = request("GET", "http://module.example.com/initialize")
+
+    assert response.json() == {"path": "/initialize"}
+
+
+def test_client_has_finite_timeouts():
+    options = http_client._client_options(True)
+
+    assert options["timeout"].connect == http_client.CONNECT_TIMEOUT_SECONDS
+    assert options["timeout"].read == http_client.READ_TIMEOUT_SECONDS
+
+
+def test_async_client_is_shared_per_event_loop(mock_transport):
+    async def run():
+        client = get_async_client()
+        assert get_async_client() is client
+        responses = await asyncio.gather(
+            async_request("POST", URL), async_request("POST", URL)
+        )
+        await close_async_client()
+        return client, responses
+
+    first_client, responses = asyncio.run(run())
+    second_client, _ = asyncio.run(run())
+
+    assert [r.json() for r in responses] == [{"path": "/companies"}] * 2
+    assert first_client is not second_client
+    assert first_client.is_closed
+
+
+def test_sync_client_verifies_certificates():
+    close_client()
+    with patch.object(http_client.httpx, "Client") as mock_client:
+        get_client()
+    close_client()
+
+    assert mock_client.call_args.kwargs["verify"] is True
+
+
+def test_only_trigger_client_skips_verification(mock_transport):
+    async def run():
+        verifying = get_async_client()
+        trigger = get_async_client(verify=http_client.TRIGGER_VERIFY_TLS)
+        await close_async_client()
+        return verifying, trigger
+
+    verifying, trigger = asyncio.run(run())
+
+    assert http_client.VERIFY_TLS is True
+    assert http_client.TRIGGER_VERIFY_TLS is False
+    assert verifying is not trigger
+    assert verifying.is_closed and trigger.is_closed
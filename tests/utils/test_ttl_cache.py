@@ -0,0 +1,50 @@
+from parma_analytics.utils.ttl_cache import TTLCache
+
+
+class FakeTimer:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current fake time."""
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    timer = FakeTimer()
+    cache: TTLCache = TTLCache(ttl=10, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=30)
+
+    timer.now = 9.9
+    assert cache.get("a") == 1
+    timer.now = 10
+    assert cache.get("a") is None
+    assert cache.get("a", "default") == "default"
+    assert cache.get("b") == 2  # noqa: PLR2004
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache: TTLCache = TTLCache(ttl=10, max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert len(cache) == 2  # noqa: PLR2004
+
+
+def test_pop_and_clear():
+    cache: TTLCache = TTLCache(ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.pop("a")
+    cache.pop("missing")
+    assert cache.get("a") is None
+    cache.clear()
+    assert len(cache) == 0